@@ -0,0 +1,322 @@
+'''
+Incremental aggregate statistics over the calculation history
+- count, sum, mean and variance (Welford's algorithm), min and max
+- overall and per-operation breakdowns, updated in O(1) per calculation
+- removals of the oldest entry (ring-buffer eviction) are undone in O(1) too
+- queries never touch the history itself
+- history stores own their aggregates; calculators only count for plain lists
+'''
+from collections import deque  # Monotonic queues for windowed min/max.
+import math
+from typing import Dict, Optional
+
+from app.calculation import Calculation
+from app.history import operation_for_code
+from app.operations import as_double
+
+class RunningStats:
+    """
+    Running statistics over a stream of numbers.
+    With windowed=True, remove_oldest() can drop values in FIFO order and
+    min/max stay exact (monotonic deques, amortized O(1) per value).
+    Infinite and NaN values are counted apart from the finite ones: while any
+    are held, sum and mean follow float arithmetic (inf, -inf or NaN) and the
+    variance is NaN; once they are removed, the finite statistics are exact again.
+    """
+    __slots__ = ("count", "_finite", "_total", "_mean", "_m2", "_min", "_max", "_windowed",
+                 "_positive_inf", "_negative_inf", "_nan")
+
+    def __init__(self, windowed: bool = False):
+        """
+        Parameters:
+        - windowed (bool): Support remove_oldest(); costs extra memory for min/max candidates.
+        """
+        self._windowed = windowed
+        self.clear()
+
+    def clear(self):
+        """
+        Forgets every value.
+        """
+        self.count = 0
+        self._finite = 0  # Values counted by _total, _mean and _m2.
+        self._total = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0  # Sum of squared distances from the mean.
+        self._positive_inf = self._negative_inf = self._nan = 0
+        # Windowed: deques of min/max candidates. Otherwise: the plain extremes.
+        self._min = deque() if self._windowed else math.inf
+        self._max = deque() if self._windowed else -math.inf
+
+    def add(self, value: float):
+        """
+        Adds one value.
+        """
+        self.count += 1
+        if value - value == 0.0:  # Finite (inf - inf and NaN - NaN are NaN).
+            self._finite += 1
+            self._total += value
+            delta = value - self._mean
+            self._mean += delta / self._finite
+            self._m2 += delta * (value - self._mean)
+        elif value != value:
+            self._nan += 1
+            return  # NaN has no place in the min/max order.
+        elif value > 0:
+            self._positive_inf += 1
+        else:
+            self._negative_inf += 1
+        if self._windowed:
+            while self._min and self._min[-1] > value:
+                self._min.pop()
+            self._min.append(value)
+            while self._max and self._max[-1] < value:
+                self._max.pop()
+            self._max.append(value)
+        else:
+            if value < self._min:
+                self._min = value
+            if value > self._max:
+                self._max = value
+
+    def remove_oldest(self, value: float):
+        """
+        Removes the oldest value still counted (windowed stats only).
+        Parameters:
+        - value (float): That value, as it was passed to add().
+        """
+        if not self._windowed:
+            raise ValueError("remove_oldest() needs RunningStats(windowed=True).")
+        if self.count <= 1:
+            self.clear()
+            return
+        self.count -= 1
+        if value - value == 0.0:
+            self._finite -= 1
+            self._total -= value
+            if self._finite:
+                # Welford's update run backwards: no (mean * n - value) cancellation.
+                delta = value - self._mean
+                self._mean -= delta / self._finite
+                self._m2 = max(self._m2 - delta * (value - self._mean), 0.0)
+            else:
+                self._total = self._mean = self._m2 = 0.0
+        elif value != value:
+            self._nan -= 1
+            return
+        elif value > 0:
+            self._positive_inf -= 1
+        else:
+            self._negative_inf -= 1
+        if self._min and self._min[0] == value:
+            self._min.popleft()
+        if self._max and self._max[0] == value:
+            self._max.popleft()
+
+    def _non_finite(self) -> Optional[float]:
+        """
+        Returns what infinite or NaN values make of the sum and mean, or None if there are none.
+        """
+        if self._nan or (self._positive_inf and self._negative_inf):
+            return math.nan
+        if self._positive_inf:
+            return math.inf
+        return -math.inf if self._negative_inf else None
+
+    @property
+    def total(self) -> float:
+        """
+        Sum of the values.
+        """
+        special = self._non_finite()
+        return self._total if special is None else special
+
+    @property
+    def mean(self) -> float:
+        """
+        Mean of the values (0.0 when empty).
+        """
+        special = self._non_finite()
+        return self._mean if special is None else special
+
+    @property
+    def variance(self) -> float:
+        """
+        Population variance (0.0 for fewer than two values, NaN with infinite or NaN values).
+        """
+        if self._finite != self.count:
+            return math.nan
+        return self._m2 / self.count if self.count > 1 else 0.0
+
+    @property
+    def minimum(self) -> Optional[float]:
+        """
+        Smallest value, or None when empty (NaN if every value is NaN).
+        """
+        if not self.count:
+            return None
+        if self._nan == self.count:
+            return math.nan
+        return self._min[0] if self._windowed else self._min
+
+    @property
+    def maximum(self) -> Optional[float]:
+        """
+        Largest value, or None when empty (NaN if every value is NaN).
+        """
+        if not self.count:
+            return None
+        if self._nan == self.count:
+            return math.nan
+        return self._max[0] if self._windowed else self._max
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        """
+        Returns count, sum, mean, variance, stdev, min and max.
+        """
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.mean if self.count else None,
+            "variance": self.variance,
+            "stdev": math.sqrt(self.variance),
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+
+class HistoryAggregates:
+    """
+    Result statistics for a whole history and for each operation type.
+    Results are tracked as floats (Decimal, Fraction and big int results are
+    converted; those beyond the double range count as inf or -inf).
+    """
+    def __init__(self, windowed: bool = False):
+        """
+        Parameters:
+        - windowed (bool): Support remove() of the oldest entry, for ring-buffer histories.
+        """
+        self.windowed = windowed
+        self.overall = RunningStats(windowed)
+        self.by_operation: Dict[str, RunningStats] = {}
+
+    @classmethod
+    def from_history(cls, history, windowed: bool = False) -> "HistoryAggregates":
+        """
+        Builds aggregates for the entries already in a history (one O(n) pass).
+        """
+        aggregates = cls(windowed)
+        for calculation in history:
+            aggregates.add(calculation)
+        return aggregates
+
+    def add(self, calculation: Calculation, value: Optional[float] = None):
+        """
+        Counts a new calculation.
+        Parameters:
+        - calculation (Calculation): The calculation.
+        - value (float): Its result as a double, if the caller already converted it.
+        """
+        if value is None:
+            value = as_double(calculation.get_result())
+        name = type(calculation.operation).__name__
+        stats = self.by_operation.get(name)
+        if stats is None:
+            stats = self.by_operation[name] = RunningStats(self.windowed)
+        stats.add(value)
+        self.overall.add(value)
+
+    def add_columns(self, codes, results):
+        """
+        Counts a chunk of entries given as parallel columns (e.g. from a history import).
+        Parameters:
+        - codes: Operation codes (see app.history.operation_code).
+        - results: The result of each entry.
+        """
+        by_code = {}
+        for code in set(codes):
+            name = type(operation_for_code(code)).__name__
+            stats = self.by_operation.get(name)
+            if stats is None:
+                stats = self.by_operation[name] = RunningStats(self.windowed)
+            by_code[code] = stats.add
+        overall = self.overall.add
+        for code, result in zip(codes, results):
+            value = as_double(result)
+            by_code[code](value)
+            overall(value)
+
+    def remove(self, calculation: Calculation):
+        """
+        Un-counts the oldest calculation (e.g. one evicted by a BoundedHistory).
+        """
+        value = as_double(calculation.get_result())
+        name = type(calculation.operation).__name__
+        self.overall.remove_oldest(value)
+        stats = self.by_operation[name]
+        stats.remove_oldest(value)
+        if not stats.count:
+            del self.by_operation[name]
+
+    def clear(self):
+        """
+        Resets every statistic, e.g. after the history was cleared.
+        """
+        self.overall.clear()
+        self.by_operation.clear()
+
+    def summary(self) -> Dict:
+        """
+        Returns {"overall": {...}, "operations": {name: {...}}}; see RunningStats.as_dict.
+        """
+        return {
+            "overall": self.overall.as_dict(),
+            "operations": {
+                name: stats.as_dict() for name, stats in sorted(self.by_operation.items())
+            },
+        }
+
+def track_history(history) -> Optional[HistoryAggregates]:
+    """
+    Returns the aggregates a calculator must update itself for a history:
+    None for the history stores, which keep their own (history.aggregates,
+    maintained by every append, import and clear, whoever makes it), else
+    aggregates for the current entries of a plain sequence such as a list.
+    The class is checked, not the instance: reading history.aggregates would
+    build the store's statistics (a full pass) before anything asks for them.
+    """
+    if hasattr(type(history), "aggregates"):
+        return None
+    return HistoryAggregates.from_history(history)
+
+def history_summary(history, own: Optional[HistoryAggregates]) -> Dict:
+    """
+    Returns the summary() of a history's statistics: the calculator's own
+    aggregates (see track_history) if it has them, else the history's.
+    """
+    return (own if own is not None else history.aggregates).summary()
+
+def format_summary(summary: Dict) -> str:
+    """
+    Formats a summary() dictionary as text for the REPL.
+    """
+    overall = summary["overall"]
+    if not overall["count"]:
+        return "No calculations in history."
+    lines = ["Results:", _format_stats("all", overall)]
+    for name, stats in summary["operations"].items():
+        lines.append(_format_stats(name.lower(), stats))
+    return "\n".join(lines)
+
+def _format_stats(name: str, stats: Dict) -> str:
+    """
+    Formats one row of the summary table.
+    """
+    return (
+        f"  {name:<16} count={stats['count']} sum={stats['sum']:g} mean={stats['mean']:g} "
+        f"stdev={stats['stdev']:g} min={stats['min']:g} max={stats['max']:g}"
+    )
+
+# Why keep running aggregates?
+# - A summary costs the same for ten entries or ten million; nothing is re-read or recomputed.
+# - Welford's update stays numerically stable where sum-of-squares formulas cancel badly.
+# - Monotonic deques give exact min/max over a sliding window without rescanning it.
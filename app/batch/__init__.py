@@ -0,0 +1,140 @@
+'''
+Batch (script) mode for the calculator
+- streams "<operation> <num1> <num2>" lines from any iterable (file, stdin)
+- parses lines lazily through a generator pipeline, a chunk at a time
+- groups each chunk by operation and evaluates every group with calculate_many
+- writes one output line per command, reporting errors in place
+- a group that fails as a whole is re-run line by line, so one bad line never stops the run
+'''
+import logging
+from array import array
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+
+from app.operation_factory import OperationFactory
+from app.operations import Division
+
+# Number of command lines parsed and evaluated together.
+DEFAULT_CHUNK_SIZE = 4096
+
+def parse_command(text: str) -> Tuple:
+    """
+    Parses one "<operation> <num1> <num2>" command.
+    Returns:
+    - (operation, num1, num2)
+    Raises a ValueError describing what is wrong with the command.
+    """
+    parts = text.split()
+    if len(parts) != 3:
+        raise ValueError("expected an operation and two numbers")
+    operation = OperationFactory.create_operation(parts[0])
+    if operation is None:
+        raise ValueError(f"unknown operation '{parts[0]}'")
+    try:
+        return operation, float(parts[1]), float(parts[2])
+    except ValueError:
+        raise ValueError("invalid number") from None
+
+def parse_lines(lines: Iterable[str]) -> Iterator[Tuple]:
+    """
+    Parses command lines one at a time.
+    Blank lines and lines starting with '#' are skipped.
+    Yields:
+    - (line_number, operation, num1, num2) for valid commands, or
+    - (line_number, error_message) for lines that cannot be parsed.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        try:
+            yield (line_number, *parse_command(stripped))
+        except ValueError as error:
+            yield (line_number, str(error))
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    """
+    Splits an iterable into lists of at most `size` items without reading ahead.
+    """
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def evaluate_chunk(chunk: List[Tuple]) -> Tuple[List[str], int]:
+    """
+    Evaluates a chunk of parsed lines, one calculate_many call per operation.
+    Returns:
+    - One output line per parsed line, in input order, and the number of errors.
+    """
+    output = [""] * len(chunk)
+    errors = 0
+    groups = {}  # operation -> (positions, first operands, second operands)
+    for position, row in enumerate(chunk):
+        if len(row) == 2:
+            output[position] = f"Error (line {row[0]}): {row[1]}\n"
+            errors += 1
+            continue
+        line_number, operation, num1, num2 = row
+        if num2 == 0 and isinstance(operation, Division):
+            output[position] = f"Error (line {line_number}): Division by zero is not allowed.\n"
+            errors += 1
+            continue
+        positions, a_seq, b_seq = groups.setdefault(operation, ([], array("d"), array("d")))
+        positions.append(position)
+        a_seq.append(num1)
+        b_seq.append(num2)
+    for operation, (positions, a_seq, b_seq) in groups.items():
+        try:
+            results = operation.calculate_many(a_seq, b_seq)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Some row failed (e.g. a plugin error): redo the group line by line to find it.
+            errors += _evaluate_rows(operation, chunk, positions, output)
+            continue
+        for position, result in zip(positions, results):
+            output[position] = f"{result}\n"
+    return output, errors
+
+def _evaluate_rows(operation, chunk: List[Tuple], positions: List[int], output: List[str]) -> int:
+    """
+    Evaluates some parsed lines of a chunk one at a time, writing each result
+    or error into output at the same position.
+    Returns:
+    - The number of lines that failed.
+    """
+    errors = 0
+    for position in positions:
+        line_number, _, num1, num2 = chunk[position]
+        try:
+            output[position] = f"{operation.calculate(num1, num2)}\n"
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            output[position] = f"Error (line {line_number}): {error}\n"
+            errors += 1
+    return errors
+
+def run_batch(lines: Iterable[str], out, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[int, int]:
+    """
+    Runs every command in `lines` and writes the results to `out`.
+    Memory use is bounded by chunk_size, whatever the input size.
+    Parameters:
+    - lines (Iterable[str]): Command lines, e.g. an open file or sys.stdin.
+    - out: A text stream; each chunk is written with a single write() call.
+    - chunk_size (int): Number of lines evaluated together.
+    Returns:
+    - (number of results, number of errors)
+    """
+    results = errors = 0
+    for chunk in chunked(parse_lines(lines), chunk_size):
+        output, failed = evaluate_chunk(chunk)
+        errors += failed
+        results += len(output) - failed
+        out.write("".join(output))
+    logging.info("Batch run finished: %d results, %d errors", results, errors)
+    return results, errors
+
+# Why a generator pipeline?
+# - Lines are read, parsed and evaluated a chunk at a time, so memory stays
+#   bounded no matter how large the command file is.
+# - Grouping a chunk by operation lets each group run through one vectorized call.
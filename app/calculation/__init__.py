@@ -5,21 +5,37 @@ Calculation class
 - Returns repr and strings for calculations.
 """
 # Provides a decorator and functions for automatically adding special methods to classes.
-from dataclasses import dataclass
-from typing import List  # Provides support for type hints.
+from dataclasses import dataclass, field
+from typing import List, Optional  # Provides support for type hints.
 
 from app.operations import TemplateOperation
 
-@dataclass  # Decorator to automatically generate special methods like __init__.
+# Decorator to automatically generate special methods like __init__.
+# frozen + slots keeps each history entry small and immutable.
+@dataclass(frozen=True, slots=True)
 class Calculation:
     """
     Represents a single calculation using the Strategy Pattern.
     
-    Holds the operation (strategy) and operands.
+    Holds the operation (strategy), operands and the computed result.
+    The result is computed at most once: pass it in when it is already known,
+    otherwise it is calculated on first use and cached.
     """
     operation: TemplateOperation  # The operation to execute (strategy).
     operand1: float  # The first operand.
     operand2: float  # The second operand.
+    result: Optional[float] = field(default=None, compare=False)  # Cached result.
+
+    def get_result(self) -> float:
+        """
+        Returns the result of the calculation, computing and caching it on first use.
+        """
+        if self.result is None:
+            # The dataclass is frozen, so bypass __setattr__ to fill the cache.
+            object.__setattr__(
+                self, "result", self.operation.calculate(self.operand1, self.operand2)
+            )
+        return self.result
 
     def __repr__(self) -> str:
         """
@@ -37,10 +53,9 @@ class Calculation:
         """
         User-friendly string representation of the calculation and result.
         """
-        result = self.operation.calculate(self.operand1, self.operand2)  # Perform the calculation.
         return (
             f"{self.operand1} {self.operation.__class__.__name__.lower()} "
-            f"{self.operand2} = {result}"
+            f"{self.operand2} = {self.get_result()}"
         )
 
 # Why use the Strategy Pattern?
@@ -0,0 +1,182 @@
+'''
+Expression engine for infix formulas
+- tokenizes and parses expressions like "(a + 2) * b / 4" with the usual precedence
+- compiles the parse tree once into nested closures over the factory's operations
+- compiled expressions are cached and can be evaluated many times with new bindings
+'''
+from functools import lru_cache
+import re
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Tuple
+
+from app.operation_factory import OperationFactory
+
+# One token per match: a number, a name, or a single-character symbol.
+_TOKEN = re.compile(
+    r"\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<name>[A-Za-z_]\w*)|(?P<symbol>\S))"
+)
+
+# Binary operators and their precedence (higher binds tighter).
+_PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """
+    Splits an expression into (kind, value) tokens.
+    Raises a ValueError for characters that are not part of the grammar.
+    """
+    tokens = []
+    for match in _TOKEN.finditer(text.strip()):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "symbol" and value not in _PRECEDENCE and value not in "()":
+            raise ValueError(f"Unexpected character '{value}' in expression.")
+        tokens.append((kind, value))
+    return tokens
+
+class _Parser:
+    """
+    Recursive-descent (precedence climbing) parser producing a tuple-based tree:
+    ("num", value), ("var", name), ("neg", node) or ("bin", symbol, left, right).
+    """
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Tuple[str, str]:
+        """Returns the next token without consuming it."""
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return ("end", "")
+
+    def take(self) -> Tuple[str, str]:
+        """Consumes and returns the next token."""
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        """Parses a whole expression and checks nothing is left over."""
+        if not self.tokens:
+            raise ValueError("Empty expression.")
+        node = self.binary(1)
+        if self.peek()[0] != "end":
+            raise ValueError(f"Unexpected '{self.peek()[1]}' in expression.")
+        return node
+
+    def binary(self, min_precedence: int):
+        """Parses operators whose precedence is at least min_precedence."""
+        left = self.unary()
+        while True:
+            kind, value = self.peek()
+            precedence = _PRECEDENCE.get(value, 0) if kind == "symbol" else 0
+            if precedence < min_precedence:
+                return left
+            self.take()
+            right = self.binary(precedence + 1)  # Left-associative.
+            left = ("bin", value, left, right)
+
+    def unary(self):
+        """Parses unary signs, numbers, names and parenthesized groups."""
+        kind, value = self.take()
+        if kind == "number":
+            return ("num", float(value))
+        if kind == "name":
+            return ("var", value)
+        if value == "-":
+            return ("neg", self.unary())
+        if value == "+":
+            return self.unary()
+        if value == "(":
+            node = self.binary(1)
+            if self.take()[1] != ")":
+                raise ValueError("Missing ')' in expression.")
+            return node
+        raise ValueError(f"Unexpected '{value or 'end of input'}' in expression.")
+
+def _variables(node) -> FrozenSet[str]:
+    """Returns the variable names used in a parse tree."""
+    if node[0] == "var":
+        return frozenset([node[1]])
+    if node[0] == "num":
+        return frozenset()
+    return frozenset().union(*(_variables(child) for child in node[1:] if isinstance(child, tuple)))
+
+def _compile(node) -> Callable[[Dict[str, float]], float]:
+    """
+    Turns a parse tree into a closure taking a bindings dict.
+    Constant sub-expressions are folded at compile time.
+    """
+    kind = node[0]
+    if kind == "num":
+        value = node[1]
+        return lambda env: value
+    if kind == "var":
+        name = node[1]
+        return lambda env: env[name]
+    if kind == "neg":
+        operand = _compile(node[1])
+        return lambda env: -operand(env)
+    _, symbol, left_node, right_node = node
+    left, right = _compile(left_node), _compile(right_node)
+    execute = OperationFactory.create_operation(symbol).execute  # Same Operation classes.
+    if not _variables(node):
+        try:
+            value = execute(left({}), right({}))
+            return lambda env: value
+        except ValueError:
+            pass  # e.g. a constant division by zero: raise when evaluated, not compiled.
+    return lambda env: execute(left(env), right(env))
+
+class CompiledExpression:
+    """
+    An expression parsed and compiled once, ready to evaluate with any bindings.
+    """
+    def __init__(self, source: str):
+        """
+        Parameters:
+        - source (str): The infix expression, e.g. "(a + 2) * b".
+        """
+        tree = _Parser(tokenize(source)).parse()
+        self.source = source
+        self.variables: FrozenSet[str] = _variables(tree)  # Names that must be bound.
+        self._function = _compile(tree)
+
+    def evaluate(self, **bindings: float) -> float:
+        """
+        Evaluates the expression with the given variable values.
+        Raises a ValueError for missing or non-numeric bindings.
+        """
+        missing = self.variables.difference(bindings)
+        if missing:
+            raise ValueError(f"Missing value for: {', '.join(sorted(missing))}")
+        for name in self.variables:
+            if not isinstance(bindings[name], (int, float)):
+                raise ValueError("Both inputs must be numbers.")
+        return self._function(bindings)
+
+    def evaluate_many(self, rows: Iterable[Dict[str, float]]) -> Iterator[float]:
+        """
+        Lazily evaluates the expression once per bindings dict.
+        """
+        for row in rows:
+            yield self.evaluate(**row)
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.source!r})"
+
+@lru_cache(maxsize=256)
+def compile_expression(source: str) -> CompiledExpression:
+    """
+    Returns the compiled form of an expression, reusing it for repeated formulas.
+    """
+    return CompiledExpression(source)
+
+def evaluate(source: str, **bindings: float) -> float:
+    """
+    Compiles (or reuses) an expression and evaluates it once.
+    """
+    return compile_expression(source).evaluate(**bindings)
+
+# Why compile to closures?
+# - Parsing happens once per formula; each evaluation is just nested function calls.
+# - The arithmetic still runs through the factory's Operation classes.
@@ -0,0 +1,1036 @@
+'''
+Columnar history store for calculations
+- keeps operation codes, operands and results in typed parallel arrays
+- materializes Calculation objects only when an entry is read
+- same list-like surface as the plain history list (append, index, slice, iterate, clear)
+- a bounded ring-buffer variant can spill evicted entries to a segment file
+- a memory-mapped variant persists fixed-size records to a file that reopens instantly
+- a sharded variant gives each thread its own buffer and merges them on read
+- a shared variant lets several processes append to one SQLite (WAL) file in batches
+- every store keeps its own running result statistics (aggregates), so appends,
+  imports and clears from any caller keep them correct
+'''
+from abc import abstractmethod
+from array import array  # Typed, compact buffers.
+import atexit
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Sequence  # Gives index(), count(), __contains__ and __reversed__.
+import functools
+from itertools import count, islice
+import logging
+import mmap  # Memory-mapped, shareable history files.
+from multiprocessing import util as mp_util
+import os
+import struct  # Fixed-size binary records for segment and history files.
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import weakref
+
+from app.operations import (
+    TemplateOperation, Addition, Subtraction, Multiplication, Division, as_double,
+)
+from app.calculation import Calculation
+
+# Bytes stored per entry: 1 operation code + 3 doubles (operand1, operand2, result).
+ENTRY_SIZE = 1 + 3 * 8
+
+# Record layout of spill segment files: code, operand1, operand2, result.
+SEGMENT_RECORD = struct.Struct("<Bddd")
+
+# Header of memory-mapped history files: magic bytes and the number of records written.
+MAPPED_MAGIC = b"CALCHIS1"
+MAPPED_HEADER = struct.Struct("<8sQ")
+
+# Record layout of memory-mapped history files:
+# code, padding (keeps the doubles aligned), operand1, operand2, result, timestamp.
+MAPPED_RECORD = struct.Struct("<B7xdddd")
+
+# Minimum number of records the mapped file grows by.
+_MAPPED_GROWTH = 1024
+
+# Number of records read per chunk when iterating a segment file.
+_SEGMENT_CHUNK = 4096
+
+# Largest integer magnitude a double holds exactly.
+_MAX_EXACT_INT = 2 ** 53
+
+# First code handed out to operation classes without a fixed `code` attribute.
+_FIRST_DYNAMIC_CODE = 64
+
+# Process-wide code tables shared by every history store.
+_code_by_class: Dict[type, int] = {}  # Operation class -> code.
+_operation_by_code: List[TemplateOperation] = [None] * 256  # Code -> operation instance.
+
+def operation_code(operation: TemplateOperation) -> int:
+    """
+    Returns the numeric code used to store an operation in a columnar history.
+    Built-in operations use their fixed `code`; other classes get the next free
+    dynamic code the first time they are seen in this process.
+    Parameters:
+    - operation (TemplateOperation): The operation to encode.
+    """
+    cls = type(operation)
+    code = _code_by_class.get(cls)
+    if code is None:
+        # Only a class's own `code` counts: subclasses of built-ins get dynamic codes.
+        code = cls.__dict__.get("code") or _FIRST_DYNAMIC_CODE + sum(
+            1 for c in _code_by_class if not c.__dict__.get("code")
+        )
+        if code > 255:
+            raise ValueError("Too many operation types for a columnar history.")
+        _code_by_class[cls] = code
+        _operation_by_code[code] = operation  # Operations are stateless, so any instance will do.
+    return code
+
+def operation_codes(kind: type) -> List[int]:
+    """
+    Returns the codes of every operation class registered in this process that
+    is `kind` or a subclass of it, e.g. DecimalAddition's code for Addition.
+    """
+    return sorted(code for cls, code in _code_by_class.items() if issubclass(cls, kind))
+
+def operation_for_code(code: int) -> TemplateOperation:
+    """
+    Returns the operation instance registered for a code.
+    Raises a ValueError for codes that were never registered in this process.
+    """
+    operation = _operation_by_code[code]
+    if operation is None:
+        raise ValueError(f"Unknown operation code {code}.")
+    return operation
+
+def operation_name(code: int) -> str:
+    """
+    Returns the lower-case class name stored for a code, e.g. 'addition'.
+    This is the name used by Calculation.__str__ and by history exports.
+    """
+    return type(operation_for_code(code)).__name__.lower()
+
+def code_for_name(name: str) -> int:
+    """
+    Returns the code of the registered operation class with this (case-insensitive) name.
+    Raises a ValueError if no such operation has been registered in this process.
+    """
+    lowered = name.lower()
+    for cls, code in _code_by_class.items():
+        if cls.__name__.lower() == lowered:
+            return code
+    raise ValueError(f"Unknown operation '{name}'.")
+
+# Register the built-in operations up front so stored codes always decode,
+# even in a process that has not performed any calculation yet.
+for _builtin in (Addition, Subtraction, Multiplication, Division):
+    operation_code(_builtin())
+
+def _new_aggregates(history, windowed: bool = False):
+    """
+    Builds running statistics for a store's current entries (one O(n) pass).
+    """
+    from app.aggregates import HistoryAggregates  # pylint: disable=import-outside-toplevel
+    return HistoryAggregates.from_history(history, windowed)  # (It imports this module.)
+
+def _is_plain(value) -> bool:
+    """
+    Returns True if a value survives a round trip through a double unchanged.
+    """
+    kind = type(value)
+    return kind is float or (kind is int and -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT)
+
+def _require_plain(calculation: Calculation):
+    """
+    Raises a TypeError for calculations whose values would lose precision as doubles
+    (Decimal, Fraction, big int), instead of silently rounding them.
+    """
+    if not (_is_plain(calculation.operand1) and _is_plain(calculation.operand2)
+            and _is_plain(calculation.get_result())):
+        raise TypeError("This history stores doubles only; use ColumnarHistory for exact values.")
+
+class _ArrayHistory(Sequence):
+    """
+    Shared list-like read surface for the array-backed stores.
+    Subclasses implement __len__ and _materialize(index), and update
+    _aggregates (when created) in every method that adds or removes entries.
+    """
+    _aggregates = None  # HistoryAggregates, created by the first `aggregates` read.
+    _windowed = False  # True for stores that evict their oldest entries.
+
+    @property
+    def aggregates(self):
+        """
+        Running result statistics (app.aggregates.HistoryAggregates) for the
+        entries; built on first use, then kept up to date by the store itself.
+        """
+        with self._lock:
+            if self._aggregates is None:
+                self._aggregates = _new_aggregates(self, self._windowed)
+            return self._aggregates
+    @abstractmethod
+    def _materialize(self, index: int) -> Calculation:
+        """
+        Builds a Calculation view of the entry at a logical, non-negative index.
+        """
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._materialize(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._materialize(index)
+
+class ColumnarHistory(_ArrayHistory):
+    """
+    Calculation history stored as typed parallel arrays.
+    Each entry takes ENTRY_SIZE bytes instead of a full Calculation object.
+    Entries holding exact values (Decimal, Fraction, big int) that a double
+    cannot represent are kept whole in a side table, so nothing is rounded.
+    """
+    def __init__(self):
+        self._codes = array("B")  # Operation codes.
+        self._operand1 = array("d")  # First operands.
+        self._operand2 = array("d")  # Second operands.
+        self._results = array("d")  # Results.
+        self._exact: Dict[int, Calculation] = {}  # Index -> entry with exact values.
+        # Makes each append atomic across threads (reentrant, so subclasses can
+        # hold it around their own bookkeeping).
+        self._lock = threading.RLock()
+
+    def append(self, calculation: Calculation):
+        """
+        Adds a calculation to the end of the history. Safe to call from several threads.
+        Parameters:
+        - calculation (Calculation): The calculation to store.
+        """
+        operand1, operand2 = calculation.operand1, calculation.operand2
+        result = calculation.get_result()
+        code = operation_code(calculation.operation)
+        exact = not (_is_plain(operand1) and _is_plain(operand2) and _is_plain(result))
+        value = result
+        if exact:
+            # Converted before any column changes, so a failure cannot leave a partial entry.
+            value = as_double(result)
+            operand1 = operand2 = result = float("nan")  # Placeholders in the columns.
+        with self._lock:
+            if exact:
+                self._exact[len(self._codes)] = calculation
+            self._operand1.append(operand1)
+            self._operand2.append(operand2)
+            self._results.append(result)
+            self._codes.append(code)  # Last: len() only counts complete entries.
+            if self._aggregates is not None:
+                self._aggregates.add(calculation, value)
+
+    @property
+    def has_exact(self) -> bool:
+        """
+        Returns True if some entries are stored in the exact-value side table.
+        """
+        return bool(self._exact)
+
+    def extend_columns(self, codes, operand1, operand2, results):
+        """
+        Appends many entries at once from parallel columns (arrays or sequences).
+        Parameters:
+        - codes: Operation codes (see operation_code()).
+        - operand1, operand2, results: Values for each entry.
+        """
+        if not len(codes) == len(operand1) == len(operand2) == len(results):
+            raise ValueError("History columns must have the same length.")
+        with self._lock:
+            self._operand1.extend(operand1)
+            self._operand2.extend(operand2)
+            self._results.extend(results)
+            self._codes.extend(codes)
+            if self._aggregates is not None:
+                self._aggregates.add_columns(codes, results)
+
+    def column_chunks(self, chunk_rows: int):
+        """
+        Yields (codes, operand1, operand2, results) array slices of at most chunk_rows
+        entries, for streaming exports. Exact-value entries hold NaN placeholders.
+        """
+        for start in range(0, len(self._codes), chunk_rows):
+            stop = start + chunk_rows
+            yield (self._codes[start:stop], self._operand1[start:stop],
+                   self._operand2[start:stop], self._results[start:stop])
+
+    def raw_rows(self, stop: Optional[int] = None, start: int = 0):
+        """
+        Returns an iterator of (code, operand1, operand2, result) tuples for
+        entries start..stop-1 (all by default), without building Calculations.
+        Exact-value entries appear with NaN placeholders (see has_exact).
+        """
+        return zip(self._codes[start:stop], self._operand1[start:stop],
+                   self._operand2[start:stop], self._results[start:stop])
+
+    def clear(self):
+        """
+        Removes every entry and releases the array buffers.
+        """
+        with self._lock:
+            for column in (self._codes, self._operand1, self._operand2, self._results):
+                del column[:]
+            self._exact.clear()
+            if self._aggregates is not None:
+                self._aggregates.clear()
+
+    def _materialize(self, index: int) -> Calculation:
+        """
+        Builds a Calculation view of the entry at a non-negative index.
+        """
+        if self._exact and index in self._exact:
+            return self._exact[index]
+        return Calculation(
+            operation_for_code(self._codes[index]),
+            self._operand1[index],
+            self._operand2[index],
+            self._results[index],
+        )
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __iter__(self):
+        if self._exact:
+            for index in range(len(self)):
+                yield self._materialize(index)
+            return
+        for code, operand1, operand2, result in zip(
+            self._codes, self._operand1, self._operand2, self._results
+        ):
+            yield Calculation(operation_for_code(code), operand1, operand2, result)
+
+    def __repr__(self) -> str:
+        return f"ColumnarHistory({len(self)} entries)"
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the number of bytes used by the stored entries.
+        """
+        return len(self) * ENTRY_SIZE
+
+class BoundedHistory(_ArrayHistory):
+    """
+    Ring-buffer history that keeps only the most recent entries.
+    Memory stays flat: the arrays are allocated once for the full capacity.
+    When full, the oldest entry is evicted and, if spill_path is set, appended
+    to a segment file that can still be read back with spilled(). Functions
+    in eviction_hooks are called with each evicted Calculation.
+    Its aggregates describe the entries currently held, not the evicted ones.
+    """
+    _windowed = True
+    stores_exact = False  # Doubles only (see _require_plain).
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 spill_path: Optional[str] = None):
+        """
+        Parameters:
+        - max_entries (int): Maximum number of entries kept in memory.
+        - max_bytes (int): Memory budget; converted to entries with ENTRY_SIZE.
+        - spill_path (str): Optional segment file that receives evicted entries.
+        """
+        if max_entries is None and max_bytes is None:
+            raise ValueError("BoundedHistory needs max_entries or max_bytes.")
+        capacity = max_entries if max_entries is not None else max_bytes // ENTRY_SIZE
+        if capacity < 1:
+            raise ValueError("BoundedHistory capacity must be at least one entry.")
+        self.capacity = capacity
+        self._codes = array("B", bytes(capacity))  # Preallocated ring buffers.
+        self._operand1 = array("d", bytes(8 * capacity))
+        self._operand2 = array("d", bytes(8 * capacity))
+        self._results = array("d", bytes(8 * capacity))
+        self._start = 0  # Slot of the oldest entry.
+        self._size = 0  # Number of entries currently held.
+        self.evicted = 0  # Total number of entries evicted so far.
+        self.spill_path = spill_path
+        self._spill_file = None  # Opened on the first eviction.
+        # Callbacks receiving each evicted Calculation (e.g. to update aggregates).
+        self.eviction_hooks: List[Callable[[Calculation], None]] = []
+        self._lock = threading.Lock()  # Makes each append (and its eviction) atomic.
+
+    def append(self, calculation: Calculation):
+        """
+        Adds a calculation, evicting the oldest entry when the buffer is full.
+        Safe to call from several threads.
+        Parameters:
+        - calculation (Calculation): The calculation to store.
+        """
+        _require_plain(calculation)
+        code = operation_code(calculation.operation)
+        with self._lock:
+            if self._size == self.capacity:
+                self._evict(self._start)
+                slot = self._start
+                self._start = (self._start + 1) % self.capacity
+            else:
+                slot = (self._start + self._size) % self.capacity
+                self._size += 1
+            self._codes[slot] = code
+            self._operand1[slot] = calculation.operand1
+            self._operand2[slot] = calculation.operand2
+            self._results[slot] = calculation.get_result()
+            if self._aggregates is not None:
+                self._aggregates.add(calculation)
+
+    def _evict(self, slot: int):
+        """
+        Spills the entry in a slot to the segment file, or warns that it is dropped.
+        """
+        if self.evicted == 0 and self.spill_path is None:
+            logging.warning(
+                "BoundedHistory is full (%d entries); oldest entries are being dropped.",
+                self.capacity,
+            )
+        self.evicted += 1
+        if self.eviction_hooks or self._aggregates is not None:
+            evicted = self._materialize(0)  # The slot being evicted is the oldest entry.
+            if self._aggregates is not None:
+                self._aggregates.remove(evicted)
+            for hook in self.eviction_hooks:
+                hook(evicted)
+        if self.spill_path is not None:
+            if self._spill_file is None:
+                self._spill_file = open(self.spill_path, "ab")  # pylint: disable=consider-using-with
+            self._spill_file.write(SEGMENT_RECORD.pack(
+                self._codes[slot], self._operand1[slot], self._operand2[slot], self._results[slot]
+            ))
+
+    def spilled(self):
+        """
+        Yields every evicted Calculation stored in the segment file, oldest first.
+        """
+        if self.spill_path is None:
+            return
+        if self._spill_file is not None:
+            self._spill_file.flush()  # Make buffered records visible to the reader.
+        yield from read_segment(self.spill_path)
+
+    def close(self):
+        """
+        Flushes and closes the segment file, if one is open.
+        """
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def clear(self):
+        """
+        Removes every in-memory entry. Spilled entries stay in the segment file.
+        """
+        with self._lock:
+            self._start = 0
+            self._size = 0
+            if self._aggregates is not None:
+                self._aggregates.clear()
+
+    def _materialize(self, index: int) -> Calculation:
+        """
+        Builds a Calculation view of the entry at a logical, non-negative index.
+        """
+        slot = (self._start + index) % self.capacity
+        return Calculation(
+            operation_for_code(self._codes[slot]),
+            self._operand1[slot],
+            self._operand2[slot],
+            self._results[slot],
+        )
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self._materialize(index)
+
+    def __repr__(self) -> str:
+        return f"BoundedHistory({len(self)}/{self.capacity} entries, {self.evicted} evicted)"
+
+def read_segment(path: str):
+    """
+    Yields the Calculations stored in a spill segment file, reading it in chunks.
+    Parameters:
+    - path (str): The segment file written by BoundedHistory.
+    """
+    with open(path, "rb") as segment:
+        while True:
+            chunk = segment.read(SEGMENT_RECORD.size * _SEGMENT_CHUNK)
+            if not chunk:
+                return
+            for code, operand1, operand2, result in SEGMENT_RECORD.iter_unpack(chunk):
+                yield Calculation(operation_for_code(code), operand1, operand2, result)
+
+class MappedHistory(_ArrayHistory):
+    """
+    Persistent history stored as fixed-size records in a memory-mapped file.
+    Opening an existing file maps it without parsing, so reads of millions of
+    past calculations start instantly and only touch the pages they need.
+    Several processes can open the same file read-only while one process writes.
+    Built-in operations always reload correctly; operation classes with dynamic
+    codes must be used in the reading process before their entries can be read.
+    """
+    stores_exact = False  # Doubles only (see _require_plain).
+
+    def __init__(self, path: str, readonly: bool = False):
+        """
+        Parameters:
+        - path (str): The history file; created if missing (unless read-only).
+        - readonly (bool): Map the file read-only so it can be shared safely.
+        """
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self._file = open(path, "rb")  # pylint: disable=consider-using-with
+        else:
+            # Open for update without truncating, creating the file if needed.
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._file = os.fdopen(fd, "r+b")
+            if os.fstat(fd).st_size == 0:
+                self._file.write(MAPPED_HEADER.pack(MAPPED_MAGIC, 0))
+                self._file.truncate(MAPPED_HEADER.size + MAPPED_RECORD.size * _MAPPED_GROWTH)
+                self._file.flush()
+        self._map = None
+        self._lock = threading.Lock()  # Keeps concurrent appends from claiming the same record.
+        self._remap()
+        magic, _ = MAPPED_HEADER.unpack_from(self._map, 0)
+        if magic != MAPPED_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a calculator history file.")
+
+    def _remap(self):
+        """
+        (Re)maps the whole file, e.g. after it has grown.
+        """
+        if self._map is not None:
+            self._map.close()
+        access = mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE
+        self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+
+    def _capacity(self) -> int:
+        """
+        Returns how many records fit in the currently mapped region.
+        """
+        return (len(self._map) - MAPPED_HEADER.size) // MAPPED_RECORD.size
+
+    def __len__(self) -> int:
+        # Read the count from the header each time so readers see new appends.
+        count = MAPPED_HEADER.unpack_from(self._map, 0)[1]
+        if count > self._capacity():
+            self._remap()  # Another process grew the file.
+        return count
+
+    def append(self, calculation: Calculation):
+        """
+        Writes a calculation as a new record and publishes it in the header.
+        Parameters:
+        - calculation (Calculation): The calculation to store.
+        """
+        self._check_writable()
+        _require_plain(calculation)
+        code = operation_code(calculation.operation)
+        with self._lock:
+            count = len(self)
+            if count == self._capacity():
+                growth = MAPPED_RECORD.size * max(count, _MAPPED_GROWTH)
+                self._file.truncate(len(self._map) + growth)
+                self._remap()
+            MAPPED_RECORD.pack_into(
+                self._map, MAPPED_HEADER.size + count * MAPPED_RECORD.size,
+                code, calculation.operand1, calculation.operand2,
+                calculation.get_result(), time.time(),
+            )
+            # Update the count last, so readers never see a half-written record.
+            MAPPED_HEADER.pack_into(self._map, 0, MAPPED_MAGIC, count + 1)
+            if self._aggregates is not None:
+                self._aggregates.add(calculation)
+
+    def clear(self):
+        """
+        Marks the file as empty. The space is kept and reused by later appends.
+        """
+        self._check_writable()
+        with self._lock:
+            MAPPED_HEADER.pack_into(self._map, 0, MAPPED_MAGIC, 0)
+            if self._aggregates is not None:
+                self._aggregates.clear()
+
+    def _check_writable(self):
+        """
+        Raises a ValueError if the history was opened read-only.
+        """
+        if self.readonly:
+            raise ValueError("History file is opened read-only.")
+
+    def _materialize(self, index: int) -> Calculation:
+        """
+        Builds a Calculation view of the record at a non-negative index.
+        """
+        code, operand1, operand2, result, _ = MAPPED_RECORD.unpack_from(
+            self._map, MAPPED_HEADER.size + index * MAPPED_RECORD.size
+        )
+        return Calculation(operation_for_code(code), operand1, operand2, result)
+
+    def timestamp(self, index: int) -> float:
+        """
+        Returns the time.time() value recorded when the entry at index was appended.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return MAPPED_RECORD.unpack_from(
+            self._map, MAPPED_HEADER.size + index * MAPPED_RECORD.size
+        )[4]
+
+    def __iter__(self):
+        # Copy one chunk of records at a time so the map can still grow while iterating.
+        chunk_bytes = MAPPED_RECORD.size * _SEGMENT_CHUNK
+        offset = MAPPED_HEADER.size
+        end = offset + len(self) * MAPPED_RECORD.size
+        while offset < end:
+            chunk = self._map[offset:min(offset + chunk_bytes, end)]
+            offset += len(chunk)
+            for code, operand1, operand2, result, _ in MAPPED_RECORD.iter_unpack(chunk):
+                yield Calculation(operation_for_code(code), operand1, operand2, result)
+
+    def flush(self):
+        """
+        Flushes written records to disk.
+        """
+        if not self.readonly:
+            self._map.flush()
+
+    def close(self):
+        """
+        Flushes and unmaps the file.
+        """
+        self.flush()
+        self._map.close()
+        self._file.close()
+
+    def __repr__(self) -> str:
+        mode = "read-only" if self.readonly else "read-write"
+        return f"MappedHistory({self.path!r}, {len(self)} entries, {mode})"
+
+class _Shard:  # pylint: disable=too-few-public-methods
+    """
+    One thread's private slice of a ShardedHistory.
+    """
+    def __init__(self, generation: int):
+        self.sequence = array("Q")  # Global order of each entry (increasing).
+        self.history = ColumnarHistory()
+        self.generation = generation  # The ShardedHistory generation it belongs to.
+        self.pending: Optional[int] = None  # Sequence number being stored (-1: being taken).
+        self.merged = 0  # Entries already copied into the merged snapshot.
+
+class ShardedHistory(Sequence):
+    """
+    History for multi-threaded use: every thread appends to its own shard
+    without taking a lock, and reads merge the shards in global append order.
+    The merged snapshot is extended incrementally: each read only merges the
+    entries appended since the previous one, and only up to the first entry
+    still being written, so it is always a consistent prefix of the history.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()  # Guards shard registration and clear.
+        self._merge_lock = threading.Lock()  # Serializes snapshot merges.
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._sequence = count()  # next() is atomic, giving a global order.
+        self._generation = 0  # Bumped by clear() so threads register new shards.
+        self._merged = (0, ColumnarHistory())  # (generation, merged entries)
+
+    def append(self, calculation: Calculation):
+        """
+        Adds a calculation to the calling thread's shard.
+        Parameters:
+        - calculation (Calculation): The calculation to store.
+        """
+        shard = getattr(self._local, "shard", None)
+        if shard is None or shard.generation != self._generation:
+            shard = self._register_shard()  # First append, or the history was cleared.
+        # Readers wait for pending entries below their snapshot point, so they
+        # never see a sequence number without every earlier one.
+        shard.pending = -1
+        try:
+            sequence = shard.pending = next(self._sequence)
+            shard.history.append(calculation)
+            shard.sequence.append(sequence)
+        finally:
+            shard.pending = None
+
+    def _register_shard(self) -> _Shard:
+        """
+        Creates and registers the calling thread's shard (once per thread and generation).
+        """
+        with self._lock:
+            shard = _Shard(self._generation)
+            self._shards.append(shard)
+        self._local.shard = shard
+        return shard
+
+    def clear(self):
+        """
+        Drops every shard; threads start new shards on their next append.
+        An append racing with clear() may land on either side of it.
+        """
+        with self._lock:
+            self._shards = []
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self.snapshot())
+
+    def snapshot(self) -> ColumnarHistory:
+        """
+        Returns the merged entries in append order. The same store is returned
+        and extended by later calls (until clear()), so each call only merges
+        new entries. Writers are never blocked; a reader waits only for
+        appends already in progress.
+        """
+        with self._merge_lock:
+            with self._lock:
+                shards = list(self._shards)
+                generation = self._generation
+            if self._merged[0] != generation:
+                self._merged = (generation, ColumnarHistory())
+            merged = self._merged[1]
+            limit = next(self._sequence)  # Every later append sorts after this point.
+            stops = []
+            for shard in shards:
+                while shard.pending is not None and shard.pending < limit:
+                    time.sleep(0)  # An earlier append is still being stored.
+                stops.append(bisect_left(shard.sequence, limit))
+            if any(stop > shard.merged for shard, stop in zip(shards, stops)):
+                _merge_shards(merged, shards, stops)
+            return merged
+
+    @property
+    def aggregates(self):
+        """
+        Running result statistics, kept by the merged snapshot as it is extended.
+        """
+        return self.snapshot().aggregates
+
+    def __getitem__(self, index):
+        return self.snapshot()[index]
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __repr__(self) -> str:
+        return f"ShardedHistory({len(self)} entries, {len(self._shards)} shards)"
+
+def _merge_shards(merged: ColumnarHistory, shards: List[_Shard], stops: List[int]):
+    """
+    Appends each shard's entries from its merged watermark up to its stop to
+    merged, in sequence order, and advances the watermarks.
+    """
+    if any(shard.history.has_exact for shard in shards):
+        # Slow path: merge whole Calculations so exact values are kept.
+        entries = sorted(
+            (shard.sequence[index], shard_index, index)
+            for shard_index, (shard, stop) in enumerate(zip(shards, stops))
+            for index in range(shard.merged, stop)
+        )
+        for _, shard_index, index in entries:
+            merged.append(shards[shard_index].history[index])
+    else:
+        rows = []
+        for shard, stop in zip(shards, stops):
+            rows.extend(
+                (sequence, *row) for sequence, row in zip(
+                    shard.sequence[shard.merged:stop], shard.history.raw_rows(stop, shard.merged)
+                )
+            )
+        rows.sort()
+        _, codes, operand1, operand2, results = zip(*rows)
+        merged.extend_columns(codes, operand1, operand2, results)
+    for shard, stop in zip(shards, stops):
+        shard.merged = stop
+
+# Schema of shared history files: one row per committed batch, each column
+# packed as a little-endian array. `names` maps the writer's operation codes
+# to class names ("1 addition 64 power"), since dynamic codes differ between processes.
+_SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    names TEXT NOT NULL,
+    codes BLOB NOT NULL,
+    operand1 BLOB NOT NULL,
+    operand2 BLOB NOT NULL,
+    results BLOB NOT NULL,
+    timestamps BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO history_meta VALUES ('generation', 0);
+"""
+
+# Shared history files are little-endian whatever the host byte order.
+_SWAP = sys.byteorder != "little"
+
+class SharedHistory(Sequence):
+    """
+    History shared by every process that opens the same SQLite file.
+    append() only queues the entry in memory; a background thread commits the
+    queue as one packed batch, so the cross-process write lock is taken once
+    per batch instead of once per calculation. Reads see a consistent
+    snapshot: every batch committed by any process, in commit order, plus
+    this process's own queued entries. Like MappedHistory, it stores doubles
+    only, and operation classes that are not built in must be known to the
+    reading process.
+    """
+    stores_exact = False  # Doubles only (see _require_plain).
+
+    def __init__(self, path: str, batch_size: int = 4096, flush_interval: float = 0.05,
+                 timeout: float = 30.0):
+        """
+        Parameters:
+        - path (str): The SQLite database file; created if missing.
+        - batch_size (int): Queued entries that trigger an early commit.
+        - flush_interval (float): Longest time, in seconds, an entry waits in the queue.
+        - timeout (float): Seconds to wait for another process's write lock.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self._start()
+        # A forked child gets its own connection, queue and flusher thread.
+        os.register_at_fork(after_in_child=functools.partial(_restart_shared, weakref.ref(self)))
+        atexit.register(self.close)  # Commit what is still queued when the process exits.
+        self._finalize_on_exit()
+        # Child processes drop inherited finalizers when they start; register again after that.
+        mp_util.register_after_fork(self, SharedHistory._finalize_on_exit)
+
+    def _finalize_on_exit(self):
+        """
+        Commits the queue when a multiprocessing child exits. Pool workers
+        started with fork or forkserver leave through os._exit, which skips
+        atexit but first runs multiprocessing's finalizers.
+        """
+        if not self._closed:
+            self._finalizer = mp_util.Finalize(None, self.close, exitpriority=10)
+
+    def _start(self):
+        """
+        Opens the connection and starts the flusher thread (also after a fork).
+        """
+        import sqlite3  # pylint: disable=import-outside-toplevel
+        # Autocommit mode: transactions are started explicitly below.
+        self._connection = sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")  # Readers never block writers.
+        self._connection.execute("PRAGMA synchronous=NORMAL")  # fsync per checkpoint, not per commit.
+        self._connection.executescript(_SHARED_SCHEMA)
+        self._pending = deque()  # (code, operand1, operand2, result, time) rows; lock-free appends.
+        self._lock = threading.Lock()  # Serializes this process's use of the connection.
+        self._commits = 0  # Commits made through this connection (data_version ignores them).
+        self._snapshot = (None, None, 0, ColumnarHistory())  # (version, generation, last id, entries)
+        self._aggregates = None  # Created by the first `aggregates` read; see snapshot().
+        self._closed = False
+        self._wake = threading.Event()
+        self._flusher = threading.Thread(target=self._run, name="shared-history", daemon=True)
+        self._flusher.start()
+
+    def append(self, calculation: Calculation):
+        """
+        Queues a calculation for the next batch commit.
+        Parameters:
+        - calculation (Calculation): The calculation to store.
+        """
+        if self._closed:
+            raise ValueError("Shared history is closed.")
+        _require_plain(calculation)
+        pending = self._pending
+        pending.append((
+            operation_code(calculation.operation), calculation.operand1,
+            calculation.operand2, calculation.result, time.time(),
+        ))
+        if len(pending) >= self.batch_size:
+            self._wake.set()  # Commit early; the caller does not wait for it.
+
+    def _run(self):
+        """
+        Flusher thread: commits the queue every flush_interval seconds, or sooner when woken.
+        """
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-except
+                # Keep the thread alive; the rows stay queued for the next attempt.
+                logging.exception("Shared history commit failed.")
+
+    def flush(self):
+        """
+        Commits every queued entry as one batch, in one transaction.
+        """
+        with self._lock:
+            pending = self._pending
+            size = len(pending)
+            if not size:
+                return
+            codes, operand1, operand2, results, timestamps = zip(*islice(pending, size))
+            names = " ".join(f"{code} {operation_name(code)}" for code in set(codes))
+            columns = [array("B", codes)] + [
+                array("d", column) for column in (operand1, operand2, results, timestamps)
+            ]
+            if _SWAP:
+                for column in columns[1:]:
+                    column.byteswap()
+            self._connection.execute("BEGIN IMMEDIATE")  # Take the write lock up front.
+            try:
+                self._connection.execute(
+                    "INSERT INTO batches (pid, names, codes, operand1, operand2, results,"
+                    " timestamps) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (os.getpid(), names, *(column.tobytes() for column in columns)),
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            for _ in range(size):
+                pending.popleft()  # Only now, so a failed commit loses nothing.
+            self._commits += 1
+
+    def snapshot(self) -> ColumnarHistory:
+        """
+        Returns every committed entry, in commit order, as of one point in time,
+        followed by this process's queued entries (which are committed first).
+        Only batches committed since the previous snapshot are read from the file.
+        """
+        self.flush()  # Read-your-writes: commit our own queue first.
+        with self._lock:
+            version, generation, last_id, entries = self._snapshot
+            connection = self._connection
+            current = (connection.execute("PRAGMA data_version").fetchone()[0], self._commits)
+            if current == version:
+                return entries
+            connection.execute("BEGIN")  # One read transaction = one consistent WAL snapshot.
+            try:
+                current_generation = connection.execute(
+                    "SELECT value FROM history_meta WHERE key = 'generation'"
+                ).fetchone()[0]
+                if current_generation != generation:
+                    last_id, entries = 0, ColumnarHistory()  # Cleared since the last snapshot.
+                    if self._aggregates is not None:
+                        self._aggregates.clear()
+                batches = connection.execute(
+                    "SELECT id, names, codes, operand1, operand2, results FROM batches"
+                    " WHERE id > ? ORDER BY id", (last_id,),
+                ).fetchall()
+            finally:
+                connection.execute("COMMIT")
+            if batches:
+                merged = ColumnarHistory()  # A new object: earlier snapshots stay unchanged.
+                for columns in entries.column_chunks(len(entries) or 1):
+                    merged.extend_columns(*columns)
+                for batch in batches:
+                    columns = _decode_batch(*batch[1:])
+                    merged.extend_columns(*columns)
+                    if self._aggregates is not None:
+                        self._aggregates.add_columns(columns[0], columns[3])  # Codes, results.
+                last_id, entries = batches[-1][0], merged
+            self._snapshot = (current, current_generation, last_id, entries)
+            return entries
+
+    def clear(self):
+        """
+        Removes every entry, for all processes, including this process's queue.
+        """
+        with self._lock:
+            self._pending.clear()
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute("DELETE FROM batches")
+            self._connection.execute(
+                "UPDATE history_meta SET value = value + 1 WHERE key = 'generation'"
+            )
+            self._connection.execute("COMMIT")
+            self._commits += 1
+
+    def close(self):
+        """
+        Commits the queue, stops the flusher thread and closes the connection.
+        """
+        if self._closed:
+            return
+        atexit.unregister(self.close)
+        self._finalizer.cancel()
+        self.flush()
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        self._connection.close()
+
+    @property
+    def aggregates(self):
+        """
+        Running result statistics for every process's entries. Each read counts
+        only the batches committed since the previous snapshot.
+        """
+        with self._lock:
+            if self._aggregates is None:
+                self._aggregates = _new_aggregates(self._snapshot[3])  # The entries read so far.
+        self.snapshot()
+        return self._aggregates
+
+    def __len__(self) -> int:
+        return len(self.snapshot())
+
+    def __getitem__(self, index):
+        return self.snapshot()[index]
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __reduce__(self):
+        # Pickles as "open the same file", e.g. for multiprocessing workers.
+        return type(self), (self.path, self.batch_size, self.flush_interval, self.timeout)
+
+    def __repr__(self) -> str:
+        return f"SharedHistory({self.path!r}, {len(self._pending)} queued)"
+
+def _decode_batch(names: str, codes: bytes, *columns: bytes) -> tuple:
+    """
+    Turns one stored batch into (codes, operand1, operand2, results) columns
+    using this process's operation codes.
+    """
+    table = bytearray(range(256))
+    fields = names.split()
+    for code, name in zip(fields[::2], fields[1::2]):
+        table[int(code)] = code_for_name(name)
+    decoded = [codes.translate(table)]
+    for column in columns:
+        values = array("d")
+        values.frombytes(column)
+        if _SWAP:
+            values.byteswap()
+        decoded.append(values)
+    return tuple(decoded)
+
+def _restart_shared(reference: weakref.ref):
+    """
+    Fork handler: the child must not use the parent's connection or commit its queue.
+    """
+    history = reference()
+    if history is not None and not history._closed:  # pylint: disable=protected-access
+        history._inherited = history._connection  # pylint: disable=protected-access,attribute-defined-outside-init
+        history._start()  # pylint: disable=protected-access
+        atexit.register(history.close)
+
+# Why store history in columns?
+# - A Calculation object costs hundreds of bytes; four array slots cost ENTRY_SIZE bytes.
+# - Entries are only turned back into objects when someone actually reads them.
+# - A fixed-size ring buffer keeps long-running processes at a flat memory footprint.
+# - Exact values (Decimal, Fraction, big int) sit in a side table, so the common float path stays compact.
+# - A shared store queues appends and commits them in batches: one cross-process lock per batch, not per call.
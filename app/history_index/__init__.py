@@ -0,0 +1,493 @@
+'''
+Indexed history store and queries
+- IndexedHistory is a ColumnarHistory that also timestamps every entry and keeps
+  secondary indexes: per-operation posting lists and sorted value indexes
+- a query starts from its most selective index and checks the other conditions entry by entry
+- matches are lazy: they are found and materialized page by page, as they are read
+- parse_query reads the REPL syntax, e.g. "divide result>1000 since=10m"
+'''
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+import functools
+import heapq
+from itertools import compress, islice
+import math
+import operator
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.calculation import Calculation
+from app.history import ColumnarHistory, operation_code, operation_codes
+from app.operation_factory import OperationFactory
+from app.operations import as_double
+
+# Columns a query can filter on, and the names the REPL accepts for them.
+FIELDS = ("operand1", "operand2", "result")
+FIELD_ALIASES = {"a": "operand1", "b": "operand2", "r": "result"}
+
+# Comparison operators, longest first so "<=" is not read as "<".
+COMPARATORS = ("<=", ">=", "<", ">", "=")
+
+# Duration suffixes accepted by since= and until=, in seconds.
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Smallest unsorted tail merged into a sorted index (bigger tails: sqrt of the index size).
+_MIN_TAIL = 1024
+_RANGE_COST = 4  # Relative cost per range candidate (see IndexedHistory.query).
+
+class _SortedIndex:  # pylint: disable=too-few-public-methods
+    """
+    Entry numbers ordered by one column's value: a sorted run (keys, ids) plus
+    an unsorted tail of recent appends. Appends only touch the tail; queries
+    merge it into the run once it grows past about sqrt(len) entries.
+    """
+    __slots__ = ("keys", "ids", "tail")
+
+    def __init__(self):
+        self.keys = array("d")  # Sorted values (NaN never enters the run).
+        self.ids = array("Q")  # Entry number of each key.
+        self.tail = array("Q")  # Entries appended since the last merge.
+
+@dataclass
+class Query:
+    """
+    Conditions on history entries; every condition given must hold.
+    - operation: Only entries of this operation (an instance, e.g. Division()),
+      including its subclasses such as the numeric backends' DecimalDivision.
+    - conditions: (field, comparator, value) triples, e.g. ("result", ">", 1000.0).
+    - since / until: time.time() bounds on when the entry was appended.
+    """
+    operation: Optional[object] = None
+    conditions: List[Tuple[str, str, float]] = field(default_factory=list)
+    since: Optional[float] = None
+    until: Optional[float] = None
+
+    def ranges(self) -> Dict[str, Tuple[float, bool, float, bool]]:
+        """
+        Folds the conditions into one (low, low_inclusive, high, high_inclusive) range per field.
+        """
+        ranges = {}
+        for name, comparator, value in self.conditions:
+            low, high = ranges.get(name, ((-math.inf, True), (math.inf, True)))
+            if comparator in (">", ">=", "="):
+                low = max(low, (value, comparator != ">"), key=_lower_bound_order)
+            if comparator in ("<", "<=", "="):
+                high = min(high, (value, comparator != "<"), key=_upper_bound_order)
+            ranges[name] = (low, high)
+        return {name: (*low, *high) for name, (low, high) in ranges.items()}
+
+def _lower_bound_order(bound: Tuple[float, bool]) -> Tuple[float, bool]:
+    """
+    Sort key for lower bounds: at equal values, the exclusive one is tighter.
+    """
+    return bound[0], not bound[1]
+
+def _upper_bound_order(bound: Tuple[float, bool]) -> Tuple[float, bool]:
+    """
+    Sort key for upper bounds: at equal values, the exclusive one is tighter.
+    """
+    return bound[0], bound[1]
+
+class QueryResult:
+    """
+    The matches of a query, in history (append) order.
+    Nothing is computed up front: entries are checked and materialized as
+    they are iterated, so reading the first page of a huge result is cheap.
+    """
+    def __init__(self, history, candidates: Callable[[], Iterable[int]],
+                 check: Callable[[int], bool], plan: str):
+        """
+        Parameters:
+        - history: The store the entry numbers refer to.
+        - candidates: Returns the entry numbers to check from a given one on, in ascending order.
+        - check: Returns True for entry numbers that satisfy the whole query.
+        - plan (str): The index the candidates come from, e.g. "operation index".
+        """
+        self._history = history
+        self._candidates = candidates
+        self._check = check
+        self.plan = plan
+
+    def indexes(self, after: int = -1) -> Iterator[int]:
+        """
+        Yields the entry number of each match, starting past entry `after`.
+        """
+        return filter(self._check, self._candidates(after + 1))
+
+    def __iter__(self) -> Iterator[Calculation]:
+        history = self._history
+        for index in self.indexes():
+            yield history[index]
+
+    def slice(self, start: int, stop: int) -> List[Calculation]:
+        """
+        Returns matches start..stop-1 (0-based), checking no entry past the last one returned.
+        """
+        return list(islice(iter(self), start, stop))
+
+    def page(self, number: int, size: int = 20) -> List[Calculation]:
+        """
+        Returns page `number` (1-based) of `size` matches. Every call counts
+        from the first match; use page_after() to read pages in turn.
+        """
+        return self.slice((number - 1) * size, number * size)
+
+    def page_after(self, after: int = -1,
+                   size: int = 20) -> Tuple[List[Calculation], Optional[int]]:
+        """
+        Returns the next `size` matches past entry number `after`, without
+        checking the entries before it again.
+        Returns:
+        - (matches, cursor): cursor is the entry number to pass as `after` for
+          the next page, or None if no match follows. It is the entry just
+          before the next match, so the entries between pages are not checked twice.
+        """
+        indexes = self.indexes(after)
+        entries = list(islice(indexes, size))
+        following = next(indexes, None)
+        history = self._history
+        return ([history[index] for index in entries],
+                None if following is None else following - 1)
+
+    def count(self) -> int:
+        """
+        Counts every match (reads all candidates, but materializes none).
+        """
+        return sum(1 for _ in self.indexes())
+
+class IndexedHistory(ColumnarHistory):
+    """
+    ColumnarHistory with a timestamp per entry and secondary indexes for query().
+    - timestamps never decrease, so a time range is a range of entry numbers (bisect)
+    - each operation code has a posting list of its entry numbers, in order
+    - each field in `indexed` has a sorted value index (result only, by default)
+    Appends stay O(1); a query costs O(log n) plus the entries its best index yields.
+    """
+    def __init__(self, indexed: Iterable[str] = ("result",)):
+        """
+        Parameters:
+        - indexed (Iterable[str]): Fields with a sorted index ('operand1', 'operand2', 'result').
+        """
+        super().__init__()
+        unknown = set(indexed) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown history field(s): {', '.join(sorted(unknown))}.")
+        self._timestamps = array("d")
+        self._postings: Dict[int, array] = {}  # Operation code -> entry numbers.
+        self._sorted = {name: _SortedIndex() for name in indexed}
+        self._columns = {"operand1": self._operand1, "operand2": self._operand2,
+                         "result": self._results}
+
+    def append(self, calculation: Calculation):
+        """
+        Adds a calculation, stamped with the current time, and indexes it.
+        Parameters:
+        - calculation (Calculation): The calculation to store.
+        """
+        with self._lock:  # Reentrant: held across the store and its indexes.
+            index = len(self._codes)
+            super().append(calculation)
+            self._stamp(1)
+            code = self._codes[index]
+            posting = self._postings.get(code)
+            if posting is None:
+                posting = self._postings[code] = array("Q")
+            posting.append(index)
+            for sorted_index in self._sorted.values():
+                sorted_index.tail.append(index)
+
+    def extend_columns(self, codes, operand1, operand2, results):
+        """
+        Appends many entries at once (e.g. an import), all stamped with the current time.
+        """
+        with self._lock:
+            start = len(self._codes)
+            super().extend_columns(codes, operand1, operand2, results)
+            self._stamp(len(codes))
+            postings = self._postings
+            for index, code in enumerate(codes, start):
+                posting = postings.get(code)
+                if posting is None:
+                    posting = postings[code] = array("Q")
+                posting.append(index)
+            for sorted_index in self._sorted.values():
+                sorted_index.tail.extend(range(start, len(self._codes)))
+
+    def _stamp(self, count: int):
+        """
+        Records the append time of `count` new entries, never going backwards
+        (so a clock step back cannot break the time ordering).
+        """
+        now = time.time()
+        timestamps = self._timestamps
+        if timestamps and timestamps[-1] > now:
+            now = timestamps[-1]
+        timestamps.extend([now] * count)
+
+    def timestamp(self, index: int) -> float:
+        """
+        Returns the time.time() value recorded when the entry at index was appended.
+        """
+        return self._timestamps[index]
+
+    def clear(self):
+        """
+        Removes every entry and every index.
+        """
+        with self._lock:
+            super().clear()
+            del self._timestamps[:]
+            self._postings.clear()
+            self._sorted = {name: _SortedIndex() for name in self._sorted}
+
+    def value(self, name: str, index: int) -> float:
+        """
+        Returns a field of an entry as a float (exact values are converted,
+        with those beyond the double range read as inf or -inf).
+        """
+        value = self._columns[name][index]
+        if value != value and index in self._exact:  # NaN placeholder of an exact entry.
+            calculation = self._exact[index]
+            value = as_double(
+                calculation.get_result() if name == "result" else getattr(calculation, name))
+        return value
+
+    def _keys(self, name: str, entries) -> list:
+        """
+        Returns a field's value for each entry number (a C-level loop unless exact values exist).
+        """
+        if self._exact:
+            return [self.value(name, entry) for entry in entries]
+        return list(map(self._columns[name].__getitem__, entries))
+
+    def _merge(self, name: str) -> _SortedIndex:
+        """
+        Sorts a field's tail into its run, if the tail has outgrown scanning.
+        """
+        index = self._sorted[name]
+        if len(index.tail) <= max(_MIN_TAIL, math.isqrt(len(index.keys))):
+            return index
+        tail_keys = self._keys(name, index.tail)
+        keep = list(map(operator.eq, tail_keys, tail_keys))  # NaN matches no range; leave it out.
+        tail_ids = index.tail.tolist()
+        if not all(keep):
+            tail_ids, tail_keys = list(compress(tail_ids, keep)), list(compress(tail_keys, keep))
+        if len(tail_ids) > len(index.keys) // 8:
+            # Large tail (e.g. after an import): one key-sort of everything.
+            all_keys = index.keys.tolist() + tail_keys
+            all_ids = index.ids.tolist() + tail_ids
+            order = sorted(range(len(all_keys)), key=all_keys.__getitem__)
+            keys = array("d", [all_keys[position] for position in order])
+            ids = array("Q", [all_ids[position] for position in order])
+        else:
+            # Small tail: copy the run between insertion points in C-level slices.
+            keys, ids = array("d"), array("Q")
+            start = 0
+            for position in sorted(range(len(tail_keys)), key=tail_keys.__getitem__):
+                key = tail_keys[position]
+                end = bisect_right(index.keys, key, start)
+                keys.extend(index.keys[start:end])
+                ids.extend(index.ids[start:end])
+                keys.append(key)
+                ids.append(tail_ids[position])
+                start = end
+            keys.extend(index.keys[start:])
+            ids.extend(index.ids[start:])
+        index.keys, index.ids, index.tail = keys, ids, array("Q")
+        return index
+
+    def query(self, query: Query) -> QueryResult:
+        """
+        Finds the entries matching a query, using the most selective index:
+        the time range, the operation's posting list, or a sorted value index.
+        Index sizes are compared with bisect before any candidate is read.
+        Returns:
+        - A lazy QueryResult in append order.
+        """
+        ranges = query.ranges()
+        timestamps = self._timestamps
+        first = 0 if query.since is None else bisect_left(timestamps, query.since)
+        stop = len(timestamps) if query.until is None else bisect_right(timestamps, query.until)
+        stop = max(stop, first)
+        codes = None
+        if query.operation is not None:
+            operation_code(query.operation)  # Registers the class if it is new.
+            codes = frozenset(operation_codes(type(query.operation)))
+
+        # Candidate sources: (size, plan, candidates); the smallest wins.
+        timed = first > 0 or stop < len(timestamps)
+        options = [(stop - first, "time index" if timed else "scan",
+                    lambda start: range(max(first, start), stop))]
+        if codes is not None:
+            spans = []  # (posting list, low, high) per code, e.g. Addition and DecimalAddition.
+            for code in codes:
+                posting = self._postings.get(code)
+                if posting is not None:
+                    spans.append((posting, bisect_left(posting, first), bisect_left(posting, stop)))
+            options.append((sum(high - low for _, low, high in spans), "operation index",
+                            functools.partial(_posting_entries, spans)))
+        for name in sorted(ranges.keys() & self._sorted.keys()):
+            index = self._merge(name)
+            start, end = _key_span(index.keys, ranges[name])
+            # Range candidates are materialized and sorted up front, so they
+            # must be much smaller than a lazily read stream to win.
+            options.append((
+                (end - start + len(index.tail)) * _RANGE_COST, f"{name} index",
+                functools.partial(self._range_entries, name, ranges[name], first, stop),
+            ))
+        _, plan, candidates = min(options, key=lambda option: option[0])
+        return QueryResult(self, candidates, self._checker(codes, ranges), plan)
+
+    def _checker(self, codes: Optional[frozenset], ranges) -> Callable[[int], bool]:
+        """
+        Builds the per-entry test for the conditions (the time range comes from the candidates).
+        """
+        entry_codes = self._codes
+        if self._exact:
+            value = self.value
+            columns = [(functools.partial(value, name), bounds) for name, bounds in ranges.items()]
+        else:
+            columns = [(self._columns[name].__getitem__, bounds) for name, bounds in ranges.items()]
+
+        def check(index: int) -> bool:
+            if codes is not None and entry_codes[index] not in codes:
+                return False
+            for read, bounds in columns:
+                if not _in_range(read(index), bounds):
+                    return False
+            return True
+
+        return check
+
+    def _range_entries(self, name: str, bounds, first: int, stop: int, start: int = 0) -> array:
+        """
+        Returns the entry numbers (ascending, within first..stop-1 and from
+        start on) whose field is in bounds.
+        """
+        first = max(first, start)
+        index = self._sorted[name]
+        start, end = _key_span(index.keys, bounds)
+        matches = [entry for entry in index.ids[start:end] if first <= entry < stop]
+        tail = [entry for entry in index.tail if first <= entry < stop]
+        matches.extend(compress(tail, (_in_range(key, bounds) for key in self._keys(name, tail))))
+        matches.sort()
+        return array("Q", matches)
+
+    def __repr__(self) -> str:
+        return f"IndexedHistory({len(self)} entries, indexed on {', '.join(self._sorted)})"
+
+def _posting_entries(spans, start: int) -> Iterator[int]:
+    """
+    Yields the entry numbers from `start` on in the posting list spans, in ascending order.
+    """
+    streams = [map(posting.__getitem__, range(max(low, bisect_left(posting, start)), high))
+               for posting, low, high in spans]
+    return streams[0] if len(streams) == 1 else heapq.merge(*streams)
+
+def _key_span(keys: array, bounds) -> Tuple[int, int]:
+    """
+    Returns the slice of a sorted key array that lies within bounds.
+    """
+    low, low_inclusive, high, high_inclusive = bounds
+    start = (bisect_left if low_inclusive else bisect_right)(keys, low)
+    end = (bisect_right if high_inclusive else bisect_left)(keys, high)
+    return start, max(start, end)
+
+def _in_range(value: float, bounds) -> bool:
+    """
+    Returns True if a value lies within (low, low_inclusive, high, high_inclusive).
+    """
+    low, low_inclusive, high, high_inclusive = bounds
+    if value < low or (value == low and not low_inclusive):
+        return False
+    return value < high or (value == high and high_inclusive)
+
+def query_history(history, query: Query) -> QueryResult:
+    """
+    Runs a query on any history store: IndexedHistory uses its indexes, other
+    stores are scanned entry by entry (still lazily). Time bounds need a store
+    that records timestamps (IndexedHistory or MappedHistory). Stores shared
+    between threads or processes are read through one snapshot, so the scan
+    does not merge or commit again for every entry it checks.
+    """
+    if isinstance(history, IndexedHistory):
+        return history.query(query)
+    snapshot = getattr(history, "snapshot", None)
+    if snapshot is not None:
+        history = snapshot()
+    timestamp = getattr(history, "timestamp", None)
+    if timestamp is None and (query.since is not None or query.until is not None):
+        raise ValueError("This history has no timestamps; since= and until= need an indexed "
+                         "or memory-mapped history.")
+    ranges = query.ranges()
+    kind = None if query.operation is None else type(query.operation)
+    since = -math.inf if query.since is None else query.since
+    until = math.inf if query.until is None else query.until
+
+    def check(index: int) -> bool:
+        calculation = history[index]
+        if kind is not None and not isinstance(calculation.operation, kind):
+            return False
+        if timestamp is not None and not since <= timestamp(index) <= until:
+            return False
+        return all(
+            _in_range(as_double(calculation.get_result() if name == "result"
+                                else getattr(calculation, name)), bounds)
+            for name, bounds in ranges.items()
+        )
+
+    return QueryResult(history, lambda start: range(start, len(history)), check, "scan")
+
+def parse_duration(text: str) -> float:
+    """
+    Parses a duration such as '90s', '10m', '2h', '1d' or '30' (seconds).
+    """
+    scale = DURATION_UNITS.get(text[-1:].lower())
+    number = text[:-1] if scale else text
+    try:
+        seconds = float(number) * (scale or 1)
+    except ValueError:
+        raise ValueError(f"invalid duration '{text}'") from None
+    if not seconds >= 0:
+        raise ValueError(f"invalid duration '{text}'")
+    return seconds
+
+def parse_query(text: str, now: Optional[float] = None) -> Query:
+    """
+    Parses the REPL query syntax: an optional operation name, then any of
+    <field><comparator><number> (fields: operand1/a, operand2/b, result/r;
+    comparators: < <= > >= =), since=<duration> and until=<duration>
+    (durations count back from now, e.g. 10m).
+    Raises a ValueError describing the first token that cannot be read.
+    """
+    now = time.time() if now is None else now
+    query = Query()
+    for position, token in enumerate(text.split()):
+        lowered = token.lower()
+        key, equals, argument = lowered.partition("=")
+        if equals and key in ("since", "until"):
+            setattr(query, key, now - parse_duration(argument))
+            continue
+        comparator = next((c for c in COMPARATORS if c in lowered), None)
+        if comparator is None:
+            operation = OperationFactory.create_operation(lowered) if position == 0 else None
+            if operation is None:
+                raise ValueError(f"unknown operation or condition '{token}'")
+            query.operation = operation
+            continue
+        name, _, number = lowered.partition(comparator)
+        name = FIELD_ALIASES.get(name, name)
+        if name not in FIELDS:
+            raise ValueError(f"unknown field '{name}' (use operand1, operand2 or result)")
+        try:
+            query.conditions.append((name, comparator, float(number)))
+        except ValueError:
+            raise ValueError(f"invalid number in '{token}'") from None
+    return query
+
+# Why index the history?
+# - "Divisions over 1000 in the last hour" should cost the matches, not the whole history.
+# - Monotonic timestamps turn time windows into entry-number ranges, so no time index is needed.
+# - Posting lists and sorted runs are plain typed arrays: compact, and bisect works on them directly.
+# - The sorted run absorbs appends in batches, so appending never pays for keeping it sorted.
@@ -0,0 +1,491 @@
+'''
+Streaming history export and import
+- CSV, JSON Lines and a compact binary columnar format
+- exports are generators of bounded chunks, so memory stays flat for any history size
+- imports hand whole chunks to ColumnarHistory.extend_columns; binary blocks load at disk speed
+- operations are stored by name ('addition'), so files move between processes
+- exact values keep their type: JSONL stores Decimal and Fraction text (CSV:
+  Fractions and big ints), and imports parse that text back into the same types
+- an import reads and validates the whole file before storing any entry,
+  staging parsed chunks in a temporary file so memory stays flat there too
+'''
+from array import array
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+from itertools import islice
+import json
+import math
+from operator import itemgetter
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from typing import Iterator, Optional, Tuple
+
+from app.calculation import Calculation
+from app.history import code_for_name, operation_code, operation_for_code, operation_name
+
+# Rows per chunk: bounds the text or bytes held in memory at any time.
+DEFAULT_CHUNK_ROWS = 65536
+
+FORMATS = ("csv", "jsonl", "binary")
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".bin": "binary"}
+
+CSV_HEADER = "operation,operand1,operand2,result\n"
+
+# Binary columnar layout (little-endian):
+#   magic, then blocks of: BLOCK_HEADER (rows, names), names x (NAME_ENTRY + name bytes),
+#   codes (rows bytes), operand1, operand2, results (rows doubles each).
+COLUMNAR_MAGIC = b"CALCCOL1"
+BLOCK_HEADER = struct.Struct("<IB")
+NAME_ENTRY = struct.Struct("<BB")  # Code, name length.
+_SWAP = sys.byteorder != "little"  # Big-endian hosts byte-swap each column.
+
+# Largest integer magnitude a double holds exactly.
+_MAX_EXACT_INT = 2 ** 53
+_is_big = float(_MAX_EXACT_INT).__le__  # Called on abs() values; False for NaN.
+
+# Quote characters in one JSONL row without exact (string) values.
+_JSONL_ROW_QUOTES = 10
+
+# (codes, operand1, operand2, results). The value columns are array('d'), or
+# lists when the chunk holds exact values (Decimal, Fraction, big int).
+Columns = Tuple[array, array, array, array]
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Returns the export format: `fmt` if given, otherwise one chosen by file extension.
+    Raises a ValueError for unknown formats or extensions.
+    """
+    if fmt is None:
+        fmt = _EXTENSIONS.get(os.path.splitext(str(path))[1].lower())
+        if fmt is None:
+            raise ValueError(f"Cannot tell the format of '{path}'; use .csv, .jsonl or .bin.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown history format '{fmt}'.")
+    return fmt
+
+def column_chunks(history, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[tuple]:
+    """
+    Yields the history as (codes, operand1, operand2, results) chunks of at most chunk_rows.
+    ColumnarHistory yields array slices directly; other stores are read entry by entry.
+    """
+    chunks = getattr(history, "column_chunks", None)
+    if chunks is not None and not getattr(history, "has_exact", False):
+        yield from chunks(chunk_rows)
+        return
+    columns = ([], [], [], [])
+    for calculation in history:
+        columns[0].append(operation_code(calculation.operation))
+        columns[1].append(calculation.operand1)
+        columns[2].append(calculation.operand2)
+        columns[3].append(calculation.get_result())
+        if len(columns[0]) == chunk_rows:
+            yield columns
+            columns = ([], [], [], [])
+    if columns[0]:
+        yield columns
+
+def _names(codes) -> list:
+    """
+    Returns a code -> operation name list covering every code in a chunk.
+    """
+    names = [None] * 256
+    for code in set(codes):
+        names[code] = operation_name(code)
+    return names
+
+def _exact_text(value) -> str:
+    """
+    Returns the text of a value; Fractions are always written as 'n/d', so
+    imports can tell them from Decimals and ints.
+    """
+    if type(value) is Fraction:
+        return f"{value.numerator}/{value.denominator}"
+    return str(value)
+
+def iter_csv(history, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Yields the history as CSV text, one chunk of rows at a time.
+    Fractions are written as 'n/d' and big ints in full, so they import exactly.
+    Raises a TypeError for Decimal values: CSV text cannot tell them from
+    floats (export them as JSON Lines).
+    """
+    yield CSV_HEADER
+    for codes, operand1, operand2, results in column_chunks(history, chunk_rows):
+        names = _names(codes)
+        if isinstance(results, array):  # Doubles only: str() is their exact text.
+            yield "".join([
+                f"{names[code]},{a},{b},{result}\n"
+                for code, a, b, result in zip(codes, operand1, operand2, results)
+            ])
+            continue
+        if any(type(value) is Decimal for column in (operand1, operand2, results)
+               for value in column):
+            raise TypeError("CSV cannot mark Decimal values as exact; export them as JSONL.")
+        yield "".join([
+            f"{names[code]},{_exact_text(a)},{_exact_text(b)},{_exact_text(result)}\n"
+            for code, a, b, result in zip(codes, operand1, operand2, results)
+        ])
+
+def _json_number(value) -> str:
+    """
+    Returns the JSON text for one value (NaN/Infinity as Python's json writes them,
+    Decimals and Fractions as strings, see _exact_text).
+    """
+    kind = type(value)
+    if kind is int or (kind is float and math.isfinite(value)):
+        return str(value)
+    return json.dumps(value if kind is float else _exact_text(value))
+
+def iter_jsonl(history, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Yields the history as JSON Lines text, one chunk of rows at a time.
+    """
+    for codes, operand1, operand2, results in column_chunks(history, chunk_rows):
+        names = _names(codes)
+        yield "".join([
+            f'{{"operation": "{names[code]}", "operand1": {_json_number(a)}, '
+            f'"operand2": {_json_number(b)}, "result": {_json_number(result)}}}\n'
+            for code, a, b, result in zip(codes, operand1, operand2, results)
+        ])
+
+def _double_column(values) -> array:
+    """
+    Returns values as a little-endian array('d'), refusing values a double would round.
+    """
+    if not isinstance(values, array):
+        for value in values:
+            if not (type(value) is float or (type(value) is int and float(value) == value)):
+                raise TypeError(
+                    "The binary format stores doubles only; export exact values as CSV or JSONL."
+                )
+        values = array("d", values)
+    if _SWAP:
+        values = array("d", values)  # Copy: never swap a history's own column.
+        values.byteswap()
+    return values
+
+def iter_binary(history, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Yields the history in the binary columnar format, one block per chunk.
+    """
+    yield COLUMNAR_MAGIC
+    for codes, operand1, operand2, results in column_chunks(history, chunk_rows):
+        names = _names(codes)
+        used = [(code, name.encode("utf-8")) for code, name in enumerate(names) if name]
+        parts = [BLOCK_HEADER.pack(len(codes), len(used))]
+        for code, name in used:
+            parts.append(NAME_ENTRY.pack(code, len(name)) + name)
+        parts.append(bytes(codes))
+        parts.extend(_double_column(column).tobytes() for column in (operand1, operand2, results))
+        yield b"".join(parts)
+
+_WRITERS = {"csv": iter_csv, "jsonl": iter_jsonl, "binary": iter_binary}
+
+def export_history(history, path: str, fmt: Optional[str] = None,
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+    """
+    Writes a history to a file, streaming it chunk by chunk.
+    Parameters:
+    - history: Any history store (or list of Calculations).
+    - path (str): The output file.
+    - fmt (str): 'csv', 'jsonl' or 'binary'; defaults to the file extension.
+    - chunk_rows (int): Rows per chunk held in memory.
+    Returns:
+    - The number of entries written.
+    """
+    fmt = detect_format(path, fmt)
+    if fmt == "binary":
+        out = open(path, "wb")  # pylint: disable=consider-using-with
+    else:
+        out = open(path, "w", encoding="utf-8", newline="")  # pylint: disable=consider-using-with
+    with out:
+        for chunk in _WRITERS[fmt](history, chunk_rows):
+            out.write(chunk)
+    return len(history)
+
+class _Decoder:
+    """
+    Turns operation names into this process's codes, with a per-import cache.
+    """
+    def __init__(self):
+        self._codes = {}
+
+    def code(self, name: str, where: str) -> int:
+        """
+        Returns the code for a name, or raises a ValueError mentioning `where`.
+        """
+        code = self._codes.get(name)
+        if code is None:
+            try:
+                code = self._codes[name] = code_for_name(name)
+            except ValueError:
+                raise ValueError(f"Unknown operation '{name}' ({where}).") from None
+        return code
+
+def _new_columns() -> Columns:
+    """
+    Returns empty (codes, operand1, operand2, results) arrays for one chunk.
+    """
+    return array("B"), array("d"), array("d"), array("d")
+
+def _is_exact(value) -> bool:
+    """
+    Returns True if a double would round the value.
+    """
+    kind = type(value)
+    return not (kind is float or (kind is int and -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT))
+
+def _may_round(columns: Columns) -> bool:
+    """
+    Returns True if converted value columns hold magnitudes of 2**53 or more,
+    which float() may have rounded from integer text (the chunk is then re-read exactly).
+    """
+    return any(any(map(_is_big, map(abs, column))) for column in columns[1:])
+
+def _columns_from_rows(rows) -> Columns:
+    """
+    Builds a chunk from parsed (code, operand1, operand2, result) rows, with
+    list value columns if some value is exact.
+    """
+    if not rows:
+        return _new_columns()
+    codes, *values = zip(*rows)
+    if any(_is_exact(value) for column in values for value in column):
+        return (array("B", codes), *map(list, values))
+    return (array("B", codes), *(array("d", column) for column in values))
+
+def _csv_number(text: str):
+    """
+    Parses a CSV field: 'n/d' as a Fraction, digits as an int, anything else as a float.
+    """
+    if "/" in text:
+        try:
+            return Fraction(text)
+        except ZeroDivisionError:
+            raise ValueError(text) from None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def _parse_csv_row(line: str, lineno: int, decoder: _Decoder) -> tuple:
+    """
+    Parses one CSV row into (code, operand1, operand2, result).
+    Raises a ValueError naming the line if the row is malformed.
+    """
+    try:
+        name, a, b, result = line.rstrip("\n").split(",")
+        values = _csv_number(a), _csv_number(b), _csv_number(result)
+    except ValueError:
+        raise ValueError(f"Invalid history row (line {lineno}).") from None
+    return (decoder.code(name, f"line {lineno}"), *values)
+
+def read_csv(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Columns]:
+    """
+    Yields (codes, operand1, operand2, results) chunks from a CSV export.
+    Each chunk is split and converted column by column; if that fails, or the
+    chunk may hold exact values, it is re-read row by row (reporting the line
+    of the first malformed row).
+    """
+    decoder = _Decoder()
+    with open(path, encoding="utf-8", newline="") as source:
+        if source.readline() != CSV_HEADER:
+            raise ValueError(f"'{path}' is not a calculator history CSV file.")
+        lineno = 2  # Line number of the first row in the chunk.
+        while True:
+            lines = list(islice(source, chunk_rows))
+            if not lines:
+                return
+            text = "".join(lines)
+            try:
+                if "/" in text:
+                    raise ValueError("fractions")
+                # One split for the whole chunk; a row with the wrong number of
+                # fields shifts a name into a number column (or back) and fails.
+                fields = text.replace("\n", ",").split(",")
+                if len(fields) != 4 * len(lines) + 1:
+                    raise ValueError("wrong number of fields")
+                columns = (
+                    array("B", [decoder.code(name, "") for name in fields[0:-1:4]]),
+                    array("d", map(float, fields[1::4])),
+                    array("d", map(float, fields[2::4])),
+                    array("d", map(float, fields[3:-1:4])),
+                )
+                if _may_round(columns):
+                    raise ValueError("big values")
+            except ValueError:
+                columns = _columns_from_rows([
+                    _parse_csv_row(line, lineno + offset, decoder)
+                    for offset, line in enumerate(lines)
+                ])
+            lineno += len(lines)
+            yield columns
+
+def _parse_jsonl_row(line: str, lineno: int, decoder: _Decoder) -> tuple:
+    """
+    Parses one JSON Lines row into (code, operand1, operand2, result).
+    Raises a ValueError naming the line if the row is malformed.
+    """
+    try:
+        row = json.loads(line)
+        name = row["operation"]
+        values = tuple(_json_value(row[field]) for field in ("operand1", "operand2", "result"))
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid history row (line {lineno}).") from None
+    return (decoder.code(name, f"line {lineno}"), *values)
+
+def _json_value(value):
+    """
+    Converts a decoded JSON value: numbers stay as they are (big ints exact),
+    'n/d' strings become Fractions and other strings Decimals.
+    Raises a ValueError or TypeError for anything else.
+    """
+    kind = type(value)
+    if kind is float or kind is int:
+        return value
+    if kind is not str:
+        raise TypeError(f"not a number: {value!r}")
+    try:
+        return Fraction(value) if "/" in value else Decimal(value)
+    except (ZeroDivisionError, InvalidOperation):
+        raise ValueError(f"invalid number {value!r}") from None
+
+def read_jsonl(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Columns]:
+    """
+    Yields (codes, operand1, operand2, results) chunks from a JSON Lines export.
+    Each chunk is decoded as one JSON array; if that fails, or the chunk may
+    hold exact values, it is re-read row by row (skipping blank lines, and
+    reporting the line of the first malformed row).
+    """
+    decoder = _Decoder()
+    with open(path, encoding="utf-8") as source:
+        lineno = 1  # Line number of the first row in the chunk.
+        while True:
+            lines = list(islice(source, chunk_rows))
+            if not lines:
+                return
+            try:
+                text = ",".join(lines)
+                rows = json.loads("[" + text + "]")
+                if text.count('"') != _JSONL_ROW_QUOTES * len(rows):
+                    raise ValueError("exact values")  # Decimal or Fraction strings.
+                columns = (
+                    array("B", [decoder.code(row["operation"], "") for row in rows]),
+                    array("d", map(float, map(itemgetter("operand1"), rows))),
+                    array("d", map(float, map(itemgetter("operand2"), rows))),
+                    array("d", map(float, map(itemgetter("result"), rows))),
+                )
+                if _may_round(columns):
+                    raise ValueError("big values")
+            except (ValueError, KeyError, TypeError):
+                columns = _columns_from_rows([
+                    _parse_jsonl_row(line, lineno + offset, decoder)
+                    for offset, line in enumerate(lines) if line.strip()
+                ])
+            lineno += len(lines)
+            yield columns
+
+def _read_exact(source, size: int) -> bytes:
+    """
+    Reads exactly `size` bytes or raises a ValueError for a truncated file.
+    """
+    data = source.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated binary history file.")
+    return data
+
+def read_binary(path: str, chunk_rows: Optional[int] = None) -> Iterator[Columns]:  # pylint: disable=unused-argument
+    """
+    Yields (codes, operand1, operand2, results) array chunks, one per block of a
+    binary columnar export. Columns are loaded with array.frombytes (no per-row work).
+    chunk_rows is accepted for symmetry; blocks keep the size they were written with.
+    """
+    decoder = _Decoder()
+    with open(path, "rb") as source:
+        if source.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"'{path}' is not a calculator binary history file.")
+        block = 0
+        while True:
+            header = source.read(BLOCK_HEADER.size)
+            if not header:
+                return  # Clean end of file.
+            if len(header) != BLOCK_HEADER.size:
+                raise ValueError("Truncated binary history file.")
+            block += 1
+            rows, name_count = BLOCK_HEADER.unpack(header)
+            translate = bytearray(range(256))  # File code -> this process's code.
+            named = bytearray()
+            for _ in range(name_count):
+                code, length = NAME_ENTRY.unpack(_read_exact(source, NAME_ENTRY.size))
+                name = _read_exact(source, length).decode("utf-8")
+                translate[code] = decoder.code(name, f"block {block}")
+                named.append(code)
+            raw_codes = _read_exact(source, rows)
+            unnamed = raw_codes.translate(None, named)  # Codes missing from the name table.
+            if unnamed:
+                raise ValueError(f"Operation code {unnamed[0]} has no name (block {block}).")
+            codes = array("B", raw_codes.translate(translate))
+            columns = [codes]
+            for _ in range(3):
+                column = array("d")
+                column.frombytes(_read_exact(source, 8 * rows))
+                if _SWAP:
+                    column.byteswap()
+                columns.append(column)
+            yield tuple(columns)
+
+_READERS = {"csv": read_csv, "jsonl": read_jsonl, "binary": read_binary}
+
+def import_history(history, path: str, fmt: Optional[str] = None,
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS, on_chunk=None) -> int:
+    """
+    Appends every entry of an exported file to a history.
+    The whole file is read and validated first, so a malformed row anywhere
+    leaves the history unchanged; parsed chunks wait in a temporary file
+    meanwhile, one chunk in memory at a time. Uses history.extend_columns when available
+    (ColumnarHistory), else append(); chunks with exact values are appended
+    entry by entry.
+    Parameters:
+    - history: The store to load into.
+    - path (str): The exported file.
+    - fmt (str): 'csv', 'jsonl' or 'binary'; defaults to the file extension.
+    - chunk_rows (int): Rows per chunk for the text formats.
+    - on_chunk: Optional callback receiving each (codes, operand1, operand2, results)
+      chunk just before it is stored.
+    Returns:
+    - The number of entries imported.
+    Raises a ValueError for malformed files, and a TypeError for exact values
+    and a history that stores doubles only; in both cases nothing is stored.
+    """
+    fmt = detect_format(path, fmt)
+    doubles_only = not getattr(history, "stores_exact", True)
+    chunks = count = 0
+    with tempfile.TemporaryFile() as staged:
+        for columns in _READERS[fmt](path, chunk_rows):
+            if doubles_only and not isinstance(columns[3], array):
+                raise TypeError(
+                    "This history stores doubles only; use ColumnarHistory for exact values.")
+            pickle.dump(columns, staged, pickle.HIGHEST_PROTOCOL)  # Arrays pickle as raw bytes.
+            chunks += 1
+            count += len(columns[0])
+        staged.seek(0)
+        extend_columns = getattr(history, "extend_columns", None)
+        for _ in range(chunks):
+            columns = pickle.load(staged)
+            if on_chunk is not None:
+                on_chunk(columns)  # E.g. statistics for a history that does not keep its own.
+            if extend_columns is not None and isinstance(columns[3], array):
+                extend_columns(*columns)
+            else:
+                for code, a, b, result in zip(*columns):
+                    history.append(Calculation(operation_for_code(code), a, b, result))
+    return count
+
+# Why columns and chunks?
+# - Chunks keep export memory flat: at most chunk_rows rows of text or bytes exist at once.
+# - The binary format writes the history's own arrays with tobytes() and reads them back
+#   with frombytes(), so an import costs little more than reading the file.
+# - Storing names instead of codes keeps files valid in processes that number plugins differently.
@@ -1,27 +1,161 @@
 """
 Logging Configuration
 - Sets up logging configuration.
+- Optionally moves file writes to a background thread (QueueHandler/QueueListener).
+- Per-calculation ("hot path") logs go through their own logger so they can be
+  sampled or silenced without touching error logs.
+- The log file is opened on the first record, not at setup, to keep startup fast.
 """
 
+import atexit
 import logging
 
+# Format used for every log line.
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 
-def setup_logging():
+# Logger used for the per-calculation INFO/DEBUG messages (results, observers, history).
+HOT_PATH_LOGGER = "calculator.hotpath"
+hot_path_logger = logging.getLogger(HOT_PATH_LOGGER)
+
+# Background QueueListener and QueueHandler used by the queued logging mode.
+# logging.handlers (socket, pickle, ...) and typing are not imported here:
+# this module is on the one-shot startup path.
+_listener = None
+_queue_handler = None
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    File handler that flushes every `flush_every` records instead of after each one.
+    Records at ERROR level or above are flushed immediately.
+    """
+    def __init__(self, filename: str, flush_every: int = 100, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.flush_every = flush_every
+        self._pending = 0  # Records written since the last flush.
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending += 1
+            if self._pending >= self.flush_every or record.levelno >= logging.ERROR:
+                self.flush()
+                self._pending = 0
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.handleError(record)
+
+
+class HotPathSampler(logging.Filter):  # pylint: disable=too-few-public-methods
+    """
+    Filter that lets one in every `every` hot-path records through.
+    """
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = every
+        self._seen = 0
+
+    def filter(self, record) -> bool:
+        keep = self._seen % self.every == 0  # Keeps the first record of every group.
+        self._seen += 1
+        return keep
+
+
+def setup_logging(level: int = logging.DEBUG, queued: bool = False, hot_path: str = "all",
+                  sample_every: int = 100, filename: str = 'calculator.log'):
     """
     Set up the logging configuration.
 
     This function configures the logging settings for the application, 
     including the log file name, logging level, and message format.
     
-    Logs are written to 'calculator.log' and the logging level is set 
+    Logs are written to 'calculator.log' and the logging level defaults
     to DEBUG to capture all levels of log messages.
+
+    Parameters:
+    - level (int): Root logging level.
+    - queued (bool): Hand records to a background thread that writes them with
+      a BufferedFileHandler, so logging never blocks on disk I/O.
+    - hot_path (str): Per-calculation logs: "all", "sample" or "off" (see configure_hot_path).
+    - sample_every (int): Keep one in this many hot-path records when sampling.
+    - filename (str): The log file.
+    """
+    if queued:
+        _setup_queued_logging(level, filename)
+    else:
+        logging.basicConfig(
+            # delay=True: the file is only created when the first record arrives.
+            handlers=[logging.FileHandler(filename, delay=True)],
+            level=level,  # Sets the logging level; DEBUG captures all levels.
+            format=LOG_FORMAT  # Formats log messages.
+            # Format placeholders:
+            # %(asctime)s - Timestamp of the log entry.
+            # %(levelname)s - Severity level of the log message.
+            # %(message)s - The actual log message.
+        )
+    configure_hot_path(hot_path, sample_every)
+
+
+def _setup_queued_logging(level: int, filename: str):
+    """
+    Installs a QueueHandler on the root logger and starts the background listener.
+    """
+    global _listener, _queue_handler  # pylint: disable=global-statement
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return  # Already running.
+    # pylint: disable=import-outside-toplevel
+    from logging.handlers import QueueHandler, QueueListener
+    import queue
+
+    class _LazyQueueHandler(QueueHandler):
+        """
+        QueueHandler that leaves message formatting to the listener thread.
+        Safe here because the calculator only logs immutable values as arguments.
+        """
+        def prepare(self, record):
+            return record
+
+    file_handler = BufferedFileHandler(filename, delay=True)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _LazyQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    root.addHandler(_queue_handler)
+    atexit.register(shutdown_logging)
+
+
+def configure_hot_path(mode: str = "all", sample_every: int = 100):
+    """
+    Controls the per-calculation logs without affecting warnings and errors.
+    Parameters:
+    - mode (str): "all" logs every calculation, "sample" keeps one in
+      `sample_every`, "off" drops hot-path records below WARNING.
+    - sample_every (int): Sampling interval for the "sample" mode.
+    """
+    if mode not in ("all", "sample", "off"):
+        raise ValueError(f"Unknown hot path logging mode '{mode}'.")
+    for existing in list(hot_path_logger.filters):
+        hot_path_logger.removeFilter(existing)
+    # "off" raises the level so disabled calls return after a cached level check.
+    hot_path_logger.setLevel(logging.WARNING if mode == "off" else logging.NOTSET)
+    if mode == "sample":
+        hot_path_logger.addFilter(HotPathSampler(sample_every))
+
+
+def shutdown_logging():
+    """
+    Stops the queued logging listener, writing out every pending record.
     """
-    logging.basicConfig(
-        filename='calculator.log',  # Specifies the file to write log messages to.
-        level=logging.DEBUG,  # Sets the logging level to DEBUG; captures all levels.
-        format='%(asctime)s - %(levelname)s - %(message)s'  # Formats log messages.
-        # Format placeholders:
-        # %(asctime)s - Timestamp of the log entry.
-        # %(levelname)s - Severity level of the log message.
-        # %(message)s - The actual log message.
-    )
+    global _listener, _queue_handler  # pylint: disable=global-statement
+    if _listener is None:
+        return
+    _listener.stop()  # Processes the records still in the queue.
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
@@ -0,0 +1,114 @@
+'''
+Memoization cache for operation results
+- opt-in layer in front of TemplateOperation.calculate
+- keyed on (operation type, a, b), with -0.0 / 0.0 and NaN kept distinct
+- bounded LRU eviction with an optional time-to-live
+- errors (e.g. division by zero) are cached too and re-raised on every hit
+'''
+from collections import OrderedDict  # Remembers insertion order for LRU eviction.
+from decimal import Decimal
+import time
+from typing import Callable, Dict, Optional
+
+from app.operations import TemplateOperation
+
+def _key_part(value):
+    """
+    Returns a hashable, exact key for one operand.
+    Zeros and NaN are keyed by their repr: 0.0 == -0.0 and NaN != NaN would
+    otherwise merge distinct inputs or never match. Decimals are keyed by their
+    string too, since Decimal('1.0') == Decimal('1.00') but the results differ.
+    """
+    if type(value) is Decimal or value != value or value == 0:  # pylint: disable=comparison-with-itself
+        return (type(value), repr(value))
+    return (type(value), value)
+
+class MemoCache:
+    """
+    Bounded LRU/TTL cache of calculation results.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Parameters:
+        - maxsize (int): Maximum number of cached results.
+        - ttl (float): Seconds a result stays valid; None keeps it until evicted.
+        - clock (Callable): Time source, replaceable in tests.
+        """
+        if maxsize < 1:
+            raise ValueError("MemoCache maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()  # key -> (value, is_error, stored_at)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def calculate(self, operation: TemplateOperation, a: float, b: float) -> float:
+        """
+        Returns operation.calculate(a, b), reusing a cached result when possible.
+        Cache hits skip validation, execution and logging.
+        Parameters:
+        - operation (TemplateOperation): The operation to perform.
+        - a (float): The first operand.
+        - b (float): The second operand.
+        """
+        try:
+            # memo_key separates operations that share a class but not a configuration
+            # (e.g. decimal operations bound to different contexts).
+            key = (getattr(operation, "memo_key", type(operation)), _key_part(a), _key_part(b))
+            entry = self._entries.get(key)
+        except TypeError:
+            return operation.calculate(a, b)  # Unhashable input: let validation report it.
+        if entry is not None:
+            value, is_error, stored_at = entry
+            if self.ttl is None or self._clock() - stored_at < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)  # Mark as most recently used.
+                if is_error:
+                    raise ValueError(*value)
+                return value
+            del self._entries[key]  # Expired.
+            self.evictions += 1
+        self.misses += 1
+        try:
+            result = operation.calculate(a, b)
+        except ValueError as error:
+            self._store(key, error.args, True)
+            raise
+        self._store(key, result, False)
+        return result
+
+    def _store(self, key, value, is_error: bool):
+        """
+        Adds an entry, evicting the least recently used one when full.
+        """
+        self._entries[key] = (value, is_error, self._clock())
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Drops every cached result. Counters are kept.
+        """
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit, miss and eviction counters and the current size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Why memoize?
+# - Repeated (operation, a, b) triples are answered with one dict lookup
+#   instead of the full validate / execute / log template.
@@ -0,0 +1,378 @@
+'''
+Numeric backends for exact and arbitrary-precision arithmetic
+- a backend maps the built-in operations to versions for its number type
+- float is the default and hands back the built-in operations unchanged
+- decimal, fraction and int backends use specialized execute methods (no per-call type dispatch)
+- select a backend per calculator or per call, and parse operands with backend.parse
+- invalid operands and results raise ValueError in every backend (never ArithmeticError)
+'''
+from abc import ABC, abstractmethod
+from decimal import Context, Decimal, DecimalException, InvalidOperation, getcontext
+from fractions import Fraction
+import functools
+import itertools
+import logging
+from typing import Dict, Optional
+
+from app.operations import TemplateOperation, Addition, Subtraction, Multiplication, Division
+from app.operation_factory import OperationFactory
+
+class _ExactOperation:
+    """
+    Mixin for operations over an exact number type.
+    Put it first in the bases so it overrides the float batch path.
+    """
+    numeric_types = (int,)  # Accepted operand types; set by each backend family.
+    type_names = "int"  # Used in the validation error message.
+
+    def validate_inputs(self, a, b):
+        """
+        Ensures both operands are of the backend's number types.
+        Floats are rejected: they already carry binary rounding error.
+        """
+        numeric_types = self.numeric_types
+        if not isinstance(a, numeric_types) or not isinstance(b, numeric_types):
+            logging.error("Invalid input: %s, %s (Inputs must be %s)", a, b, self.type_names)
+            raise ValueError(f"Both inputs must be {self.type_names}.")
+
+    def validate_many(self, a_seq, b_seq):
+        """
+        Validates two operand sequences for a batch calculation.
+        """
+        if len(a_seq) != len(b_seq):
+            logging.error("Invalid batch: %d and %d operands", len(a_seq), len(b_seq))
+            raise ValueError("Operand sequences must have the same length.")
+        for a, b in zip(a_seq, b_seq):
+            self.validate_inputs(a, b)
+
+    def execute_many(self, a_seq, b_seq) -> list:
+        """
+        Returns a list of exact results (array('d') would round them to floats).
+        """
+        return list(map(self.execute, a_seq, b_seq))
+
+    def execute_reduce(self, stream) -> tuple:
+        """
+        Folds with execute; exact types need no compensated summation.
+        """
+        prefix = functools.reduce(self.execute, stream.head())
+        return prefix, self.execute(prefix, stream.last)
+
+    def execute_accumulate(self, values) -> list:
+        """
+        Returns a list of exact running results.
+        """
+        return list(itertools.accumulate(values, self.execute))
+
+class _ExactDivision(_ExactOperation):
+    """
+    Division mixin: checks for zero divisors, then calls _divide.
+    """
+    def execute(self, a, b):
+        """
+        Returns the quotient of two numbers.
+        Raises a ValueError if attempting to divide by zero.
+        """
+        if b == 0:
+            logging.error("Attempted to divide by zero.")
+            raise ValueError("Division by zero is not allowed.")
+        return self._divide(a, b)
+
+    def execute_many(self, a_seq, b_seq, zero_division: str = "raise") -> list:
+        """
+        Returns a list of exact quotients.
+        Parameters:
+        - zero_division (str): "raise" or "nan", as for Division.execute_many.
+        """
+        if zero_division not in ("raise", "nan"):
+            raise ValueError(f"Unknown zero_division policy '{zero_division}'.")
+        if 0 in b_seq:
+            if zero_division == "raise":
+                row = list(b_seq).index(0)
+                logging.error("Attempted to divide by zero in batch row %d.", row)
+                raise ValueError(f"Division by zero is not allowed (row {row}).")
+            nan = float("nan")
+            return [self._divide(a, b) if b != 0 else nan for a, b in zip(a_seq, b_seq)]
+        return list(map(self._divide, a_seq, b_seq))
+
+# Decimal operations: each call goes straight to the bound context's C method.
+
+class _DecimalOperation(_ExactOperation):
+    """
+    Mixin holding the decimal context used for rounding.
+    """
+    numeric_types = (int, Decimal)
+    type_names = "int or Decimal"
+
+    def __init__(self, context: Context):
+        self.context = context
+        self.memo_key = (type(self), context)  # Different contexts must not share cache entries.
+
+    def _apply(self, method, a, b):
+        """
+        Calls a context method. Signals the context traps (e.g. Infinity - Infinity)
+        are raised as ValueError, like every other invalid calculation.
+        """
+        try:
+            return method(a, b)
+        except DecimalException as error:
+            logging.error("Invalid decimal operation: %s, %s (%s)", a, b, type(error).__name__)
+            raise ValueError(f"Invalid decimal operation ({type(error).__name__}).") from None
+
+class DecimalAddition(_DecimalOperation, Addition):
+    """
+    Decimal addition rounded to the backend's context.
+    """
+    def execute(self, a, b):
+        return self._apply(self.context.add, a, b)
+
+class DecimalSubtraction(_DecimalOperation, Subtraction):
+    """
+    Decimal subtraction rounded to the backend's context.
+    """
+    def execute(self, a, b):
+        return self._apply(self.context.subtract, a, b)
+
+class DecimalMultiplication(_DecimalOperation, Multiplication):
+    """
+    Decimal multiplication rounded to the backend's context.
+    """
+    def execute(self, a, b):
+        return self._apply(self.context.multiply, a, b)
+
+class DecimalDivision(_ExactDivision, _DecimalOperation, Division):
+    """
+    Decimal division rounded to the backend's context.
+    """
+    def _divide(self, a, b):
+        return self._apply(self.context.divide, a, b)
+
+# Fraction operations: always exact, never rounded.
+
+class _FractionOperation(_ExactOperation):
+    """
+    Mixin accepting ints and Fractions.
+    """
+    numeric_types = (int, Fraction)
+    type_names = "int or Fraction"
+
+class FractionAddition(_FractionOperation, Addition):
+    """
+    Exact rational addition.
+    """
+    def execute(self, a, b):
+        return Fraction(a) + b
+
+class FractionSubtraction(_FractionOperation, Subtraction):
+    """
+    Exact rational subtraction.
+    """
+    def execute(self, a, b):
+        return Fraction(a) - b
+
+class FractionMultiplication(_FractionOperation, Multiplication):
+    """
+    Exact rational multiplication.
+    """
+    def execute(self, a, b):
+        return Fraction(a) * b
+
+class FractionDivision(_ExactDivision, _FractionOperation, Division):
+    """
+    Exact rational division.
+    """
+    def _divide(self, a, b):
+        return Fraction(a, b)
+
+# Integer operations: unbounded ints, no float conversion.
+
+class IntegerAddition(_ExactOperation, Addition):
+    """
+    Big-integer addition.
+    """
+    def execute(self, a, b):
+        return a + b
+
+class IntegerSubtraction(_ExactOperation, Subtraction):
+    """
+    Big-integer subtraction.
+    """
+    def execute(self, a, b):
+        return a - b
+
+class IntegerMultiplication(_ExactOperation, Multiplication):
+    """
+    Big-integer multiplication.
+    """
+    def execute(self, a, b):
+        return a * b
+
+class IntegerDivision(_ExactDivision, Division):
+    """
+    Big-integer division. Only exact quotients are allowed; anything else
+    raises instead of silently truncating (use the fraction backend for those).
+    """
+    def _divide(self, a, b):
+        quotient, remainder = divmod(a, b)
+        if remainder:
+            logging.error("Inexact integer division: %s / %s", a, b)
+            raise ValueError(f"{a} is not divisible by {b}; use the fraction backend.")
+        return quotient
+
+class NumericBackend(ABC):
+    """
+    Base backend: parses operands and maps built-in operations to its own versions.
+    """
+    name = ""
+
+    def __init__(self, operations: Dict[type, TemplateOperation]):
+        """
+        Parameters:
+        - operations (Dict[type, TemplateOperation]): Built-in class -> backend operation.
+        """
+        self._operations = operations
+
+    def operation(self, operation) -> TemplateOperation:
+        """
+        Returns this backend's version of an operation.
+        Parameters:
+        - operation: An operation instance, or a name/alias known to OperationFactory.
+        Raises a ValueError for unknown names or operations the backend cannot run.
+        """
+        if isinstance(operation, str):
+            name = operation
+            operation = OperationFactory.create_operation(name)
+            if operation is None:
+                raise ValueError(f"Unknown operation '{name}'.")
+        found = self._operations.get(type(operation))
+        if found is not None:
+            return found
+        if isinstance(operation, _ExactOperation):
+            # Another backend's version: map it through its built-in base class.
+            for base in type(operation).__mro__:
+                if base in self._operations:
+                    return self._operations[base]
+        raise ValueError(f"{type(operation).__name__} is not supported by the {self.name} backend.")
+
+    @abstractmethod
+    def parse(self, text: str):
+        """
+        Converts an operand string to the backend's number type.
+        Raises a ValueError for text that is not a valid number.
+        """
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+class FloatBackend(NumericBackend):
+    """
+    The default: built-in operations and float() parsing, with no extra cost.
+    """
+    name = "float"
+
+    def __init__(self):
+        super().__init__({cls: cls() for cls in (Addition, Subtraction, Multiplication, Division)})
+
+    def operation(self, operation) -> TemplateOperation:
+        """
+        Returns float operations unchanged; other backends' versions map back
+        to the built-ins, and names are looked up in OperationFactory.
+        """
+        if isinstance(operation, (str, _ExactOperation)):
+            return super().operation(operation)
+        return operation
+
+    def parse(self, text: str) -> float:
+        return float(text)
+
+class DecimalBackend(NumericBackend):
+    """
+    Decimal arithmetic with a configurable context (precision, rounding, traps).
+    """
+    name = "decimal"
+
+    def __init__(self, context: Optional[Context] = None):
+        """
+        Parameters:
+        - context (decimal.Context): Rounding rules; defaults to a copy of the
+          current thread's context at construction time.
+        """
+        self.context = context if context is not None else getcontext().copy()
+        super().__init__({
+            Addition: DecimalAddition(self.context),
+            Subtraction: DecimalSubtraction(self.context),
+            Multiplication: DecimalMultiplication(self.context),
+            Division: DecimalDivision(self.context),
+        })
+
+    def parse(self, text: str) -> Decimal:
+        try:
+            return self.context.create_decimal(text.strip())
+        except InvalidOperation:
+            raise ValueError(f"invalid number '{text}'") from None
+
+    def __repr__(self) -> str:
+        return f"DecimalBackend(prec={self.context.prec}, rounding={self.context.rounding})"
+
+class FractionBackend(NumericBackend):
+    """
+    Exact rational arithmetic; accepts '1/3', '0.1' and '1e-3' style operands.
+    """
+    name = "fraction"
+
+    def __init__(self):
+        super().__init__({
+            Addition: FractionAddition(),
+            Subtraction: FractionSubtraction(),
+            Multiplication: FractionMultiplication(),
+            Division: FractionDivision(),
+        })
+
+    def parse(self, text: str) -> Fraction:
+        try:
+            return Fraction(text.strip())
+        except ZeroDivisionError:  # '1/0'
+            raise ValueError(f"invalid number '{text}'") from None
+
+class IntegerBackend(NumericBackend):
+    """
+    Unbounded integer arithmetic; division must be exact.
+    """
+    name = "int"
+
+    def __init__(self):
+        super().__init__({
+            Addition: IntegerAddition(),
+            Subtraction: IntegerSubtraction(),
+            Multiplication: IntegerMultiplication(),
+            Division: IntegerDivision(),
+        })
+
+    def parse(self, text: str) -> int:
+        return int(text)
+
+# Backend name -> class, as accepted by get_backend() and main.py --numeric.
+BACKENDS = {
+    "float": FloatBackend,
+    "decimal": DecimalBackend,
+    "fraction": FractionBackend,
+    "int": IntegerBackend,
+}
+
+def get_backend(name: str, **options) -> NumericBackend:
+    """
+    Creates a backend by name.
+    Parameters:
+    - name (str): One of BACKENDS ('float', 'decimal', 'fraction', 'int').
+    - options: Passed to the backend, e.g. context= for 'decimal'.
+    """
+    try:
+        backend_class = BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown numeric backend '{name}'.") from None
+    return backend_class(**options)
+
+# Why one operation class per backend and operator?
+# - The number type is decided once, when the backend is chosen, not on every call.
+# - The float path keeps using the built-in operations, so it pays nothing for the option.
+# - Each class still follows the TemplateOperation steps (validate, execute, log).
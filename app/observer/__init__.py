@@ -3,12 +3,19 @@ Observer pattern for tracking history
 - HistoryObserrver and CalculatorWithObserver classes
 - observers are notified of changes in calculation history
 - logs whenever a new calculation is performed
+- observers can be notified synchronously or in batches from a background thread
 '''
 import logging
-from typing import List  # Provides support for type hints.
+import queue  # Bounded, thread-safe queue for background dispatch.
+import threading
+from typing import List, Optional  # Provides support for type hints.
 
-from app.operations import TemplateOperation
+from app.aggregates import history_summary, track_history
+from app.log_config import hot_path_logger
+from app.operations import TemplateOperation, calculate_trusted
 from app.calculation import Calculation
+from app.history import ColumnarHistory
+from app.history_io import DEFAULT_CHUNK_ROWS, export_history, import_history
 
 class HistoryObserver:
     """
@@ -22,16 +29,129 @@ class HistoryObserver:
         - calculation (Calculation): The calculation object that was added.
         """
         # Log the notification at INFO level.
-        logging.info("Observer: New calculation added -> %s", calculation)
+        hot_path_logger.info("Observer: New calculation added -> %s", calculation)
+
+    def update_batch(self, calculations):
+        """
+        Called with several new calculations at once by a BatchDispatcher.
+        The default implementation falls back to update() for each item.
+        Parameters:
+        - calculations (List[Calculation]): The calculations, oldest first.
+        """
+        for calculation in calculations:
+            self.update(calculation)
+
+# Sentinel that tells the dispatcher thread to stop.
+_STOP = object()
+
+class BatchDispatcher:
+    """
+    Delivers calculations to observers in batches from a background thread.
+    perform_operation only enqueues, so its latency no longer depends on how
+    many observers are attached or how slow they are.
+    """
+    def __init__(self, observers: List[HistoryObserver], max_queue: int = 10000,
+                 batch_size: int = 256, policy: str = "block"):
+        """
+        Parameters:
+        - observers (List[HistoryObserver]): The observer list to deliver to (shared, not copied).
+        - max_queue (int): Maximum number of queued calculations (backpressure).
+        - batch_size (int): Maximum number of calculations per update_batch call.
+        - policy (str): "block" waits for room when the queue is full,
+          "drop" discards the calculation and counts it in `dropped`.
+        """
+        if policy not in ("block", "drop"):
+            raise ValueError(f"Unknown dispatch policy '{policy}'.")
+        self._observers = observers
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.policy = policy
+        self.dropped = 0  # Calculations discarded by the "drop" policy.
+        self._thread = threading.Thread(target=self._run, name="observer-dispatch", daemon=True)
+        self._thread.start()
+
+    def submit(self, calculation):
+        """
+        Queues a calculation for delivery, applying the backpressure policy.
+        """
+        if self.policy == "block":
+            self._queue.put(calculation)
+            return
+        try:
+            self._queue.put_nowait(calculation)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        """
+        Background loop: collects up to batch_size queued calculations and delivers them.
+        """
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if any(item is _STOP for item in batch):
+                stopping = True
+            self._deliver([item for item in batch if item is not _STOP])
+            for _ in batch:
+                self._queue.task_done()
+
+    def _deliver(self, batch):
+        """
+        Hands a batch to every observer, using update() when update_batch() is missing.
+        """
+        if not batch:
+            return
+        for observer in self._observers:
+            try:
+                update_batch = getattr(observer, "update_batch", None)
+                if update_batch is not None:
+                    update_batch(batch)
+                else:
+                    for calculation in batch:
+                        observer.update(calculation)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # Keep delivering to the other observers; the error is logged, not lost.
+                logging.exception("Observer %s failed to handle a batch.", observer)
+
+    def flush(self):
+        """
+        Blocks until every queued calculation has been delivered.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Delivers everything still queued, then stops the background thread.
+        """
+        self._queue.put(_STOP)
+        self._thread.join()
 
 class CalculatorWithObserver:
     """
     Calculator class with observer support for tracking calculation history.
     Maintains a list of observers and notifies them of changes.
     """
-    def __init__(self):
-        self._history: List[Calculation] = []  # List to store calculation history.
+    def __init__(self, history=None, memo=None, backend=None):
+        """
+        Parameters:
+        - history: Optional history store to record into (for example the
+          SingletonCalculator's history). Defaults to a new ColumnarHistory.
+        - memo (MemoCache): Optional cache that answers repeated calculations.
+        - backend (NumericBackend): Optional number type (Decimal, Fraction, int);
+          None keeps the plain float operations.
+        """
+        # Store for the calculation history.
+        self._history = history if history is not None else ColumnarHistory()
+        self._memo = memo  # Optional result cache.
+        self._backend = backend  # Optional numeric backend.
+        self._aggregates = track_history(self._history)  # None: the store keeps them.
         self._observers: List[HistoryObserver] = []  # List of observers.
+        self._dispatcher: Optional[BatchDispatcher] = None  # Set by enable_async_dispatch().
 
     def add_observer(self, observer: HistoryObserver):
         """
@@ -48,27 +168,142 @@ class CalculatorWithObserver:
         Parameters:
         - calculation (Calculation): The calculation object that was added.
         """
+        if self._dispatcher is not None:
+            self._dispatcher.submit(calculation)  # Delivered later, in batches.
+            return
         for observer in self._observers:
             observer.update(calculation)  # Call the update method on the observer.
-            logging.debug("Notified observer about: %s", calculation)  # Log the notification.
 
-    def perform_operation(self, operation: TemplateOperation, a: float, b: float):
+    def enable_async_dispatch(self, max_queue: int = 10000, batch_size: int = 256,
+                              policy: str = "block") -> BatchDispatcher:
+        """
+        Switches observer notification to a background BatchDispatcher.
+        Parameters are passed to BatchDispatcher.
+        Returns:
+        - The dispatcher, e.g. to inspect its `dropped` counter.
+        """
+        self.disable_async_dispatch()
+        self._dispatcher = BatchDispatcher(self._observers, max_queue, batch_size, policy)
+        logging.debug("Async observer dispatch enabled (policy=%s).", policy)
+        return self._dispatcher
+
+    def disable_async_dispatch(self):
+        """
+        Delivers any queued calculations and returns to synchronous notification.
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+            self._dispatcher = None
+
+    def flush(self):
+        """
+        Blocks until observers have received every calculation performed so far.
+        Call it before shutting down when async dispatch is enabled.
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.flush()
+
+    def perform_operation(self, operation: TemplateOperation, a: float, b: float,
+                          backend=None, trusted: bool = False):
         """
         Performs the operation, stores it in history, and notifies observers.
         Parameters:
         - operation (TemplateOperation): The operation to perform.
         - a (float): The first operand.
         - b (float): The second operand.
+        - backend (NumericBackend): Number type for this call only; defaults to
+          the calculator's backend.
+        - trusted (bool): The operands are known to be numbers (e.g. from float());
+          built-in operations then skip validation via calculate_trusted.
         Returns:
         - The result of the operation.
         """
-        calculation = Calculation(operation, a, b)  # Create a new Calculation object.
+        if backend is None:
+            backend = self._backend
+        if backend is not None:
+            operation = backend.operation(operation)  # Swap in the backend's version.
+        if self._memo is not None:
+            result = self._memo.calculate(operation, a, b)  # Reuse a cached result if any.
+        elif trusted:
+            result = calculate_trusted(operation, a, b)  # Table dispatch, no validation.
+        else:
+            result = operation.calculate(a, b)  # Execute the calculation once.
+        calculation = Calculation(operation, a, b, result)  # Store the result with the operands.
         self._history.append(calculation)  # Add the calculation to the history.
+        if self._aggregates is not None:  # Else the history store counts it.
+            self._aggregates.add(calculation)  # O(1) update of the running statistics.
         self.notify_observers(calculation)  # Notify observers of the new calculation.
-        logging.debug("Performed operation: %s", calculation)  # Log the operation.
-        return operation.calculate(a, b)  # Execute the calculation and return the result.
+        hot_path_logger.debug("Performed operation: %s", calculation)  # Log the operation.
+        return result  # Return the result computed above.
+
+    def perform_reduction(self, operation: TemplateOperation, values, scan: bool = False,
+                          backend=None, **options):
+        """
+        Folds a stream of values with one operation and records a single history entry.
+        Parameters:
+        - operation (TemplateOperation): The operation to fold with, e.g. Addition() for a sum.
+        - values: Any iterable of at least two numbers; it is read once, lazily.
+        - scan (bool): Return every running result instead of only the final one.
+        - backend (NumericBackend): Number type for this call only.
+        - options: Passed to the operation, e.g. log_space=True for Multiplication.
+        The entry is the last step of the fold: (all values but the last) <operation> (last value).
+        Returns:
+        - The result, or with scan=True the running results (array('d'), or a list for exact backends).
+        """
+        if backend is None:
+            backend = self._backend
+        if backend is not None:
+            operation = backend.operation(operation)  # Swap in the backend's version.
+        reduction = operation.reduce(values, scan=scan, **options)  # One pass, one log line.
+        calculation = Calculation(operation, reduction.prefix, reduction.last, reduction.result)
+        self._history.append(calculation)  # One entry for the whole stream.
+        if self._aggregates is not None:
+            self._aggregates.add(calculation)
+        self.notify_observers(calculation)
+        hot_path_logger.debug("Performed reduction: %s", calculation)
+        return reduction.scan if scan else reduction.result
+
+    def summary(self):
+        """
+        Returns count, sum, mean, variance, min and max of the results, overall
+        and per operation, in O(1) regardless of the history size.
+        """
+        return history_summary(self._history, self._aggregates)
+
+    def clear_history(self):
+        """
+        Clears the history and resets the running statistics with it.
+        """
+        self._history.clear()  # History stores reset their own statistics.
+        if self._aggregates is not None:
+            self._aggregates.clear()
+
+    def export_history(self, path: str, fmt=None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+        """
+        Streams the history to a CSV, JSON Lines or binary columnar file.
+        Parameters:
+        - path (str): The output file.
+        - fmt (str): 'csv', 'jsonl' or 'binary'; defaults to the file extension.
+        - chunk_rows (int): Rows held in memory at a time.
+        Returns:
+        - The number of entries written.
+        """
+        return export_history(self._history, path, fmt, chunk_rows)
+
+    def import_history(self, path: str, fmt=None) -> int:
+        """
+        Appends the entries of an exported file to the history, in bulk.
+        The running statistics are updated chunk by chunk.
+        Returns:
+        - The number of entries imported.
+        """
+        def count(columns):
+            self._aggregates.add_columns(columns[0], columns[3])  # Codes and results.
+        return import_history(self._history, path, fmt,
+                              on_chunk=count if self._aggregates is not None else None)
 
 # Why use the Observer Pattern?
 # - Decouples the calculator from the observers, allowing for dynamic addition/removal of observers.
 # - Promotes a one-to-many dependency between objects
 # - when one object changes state, all dependents are notified.
+# - Batched background delivery keeps slow observers off the calculation path.
@@ -3,35 +3,72 @@ Factory pattern for creating operations
 - usased factory pattern to creates instances of operation classes
 - based on a given operation name at runtime
 - encapsulates object creation --> open/closed principle
+- operations are stateless, so one shared instance per operation lives in a registry
 '''
-import logging
-from typing import List  # Provides support for type hints.
+from typing import Dict, Iterable, List  # Provides support for type hints.
 
 from app.operations import TemplateOperation, Addition, Subtraction, Division, Multiplication
 
+# Module-level registry mapping lower-case names and aliases to shared operation instances.
+_registry: Dict[str, TemplateOperation] = {}
+
 class OperationFactory:
     """
     Factory class to create instances of operations based on the operation type.
     Implements the Factory Pattern.
     """
     @staticmethod
-    def create_operation(operation: str) -> TemplateOperation:
+    def create_operation(operation: str, case_sensitive: bool = False) -> TemplateOperation:
+        """
+        Returns the registered Operation instance for the operation string.
+        Parameters:
+        - operation (str): The operation name or alias (e.g., 'add', '+', 'plus').
+        - case_sensitive (bool): Only accept exact (lower-case) names; skips the
+          lower() fallback for callers that already normalize their input.
+        """
+        # Single dict hit for exact names; returns None if the key is not found.
+        found = _registry.get(operation)
+        if found is None and not case_sensitive:
+            found = _registry.get(operation.lower())  # Fallback for mixed-case input.
+        return found
+
+    @staticmethod
+    def register(name: str, operation, aliases: Iterable[str] = (),
+                 replace: bool = False) -> TemplateOperation:
         """
-        Returns an instance of the appropriate Operation subclass based on the operation string.
+        Registers an operation under a name and optional aliases.
+        Lets plugins add operations without editing the factory.
         Parameters:
-        - operation (str): The operation name (e.g., 'add', 'subtract').
+        - name (str): The primary operation name.
+        - operation: A TemplateOperation subclass or instance.
+        - aliases (Iterable[str]): Extra names or symbols for the same operation.
+        - replace (bool): Allow overriding names that are already registered.
+        Returns:
+        - The shared operation instance.
         """
-        # Dictionary mapping operation names to their corresponding class instances.
-        operations_map = {
-            "add": Addition(),
-            "subtract": Subtraction(),
-            "multiply": Multiplication(),
-            "divide": Division(),
-        }
-        # Log the operation creation request at DEBUG level.
-        logging.debug("Creating operation for: %s", operation)
-        # Retrieve the operation instance from the map.
-        return operations_map.get(operation.lower())  # Returns None if the key is not found.
+        instance = operation() if isinstance(operation, type) else operation
+        keys = [key.lower() for key in (name, *aliases)]
+        taken = [key for key in keys if key in _registry and _registry[key] is not instance]
+        if taken and not replace:
+            raise ValueError(f"Operation name already registered: {', '.join(taken)}")
+        for key in keys:
+            _registry[key] = instance
+        # No logging here: built-ins register at import time, before setup_logging()
+        # runs, and a module-level logging call would auto-configure a stderr handler.
+        return instance
+
+    @staticmethod
+    def operation_names() -> List[str]:
+        """
+        Returns every registered name and alias.
+        """
+        return list(_registry)
+
+# Built-in operations and their aliases.
+OperationFactory.register("add", Addition, ["+", "plus"])
+OperationFactory.register("subtract", Subtraction, ["-", "minus", "sub"])
+OperationFactory.register("multiply", Multiplication, ["*", "times", "mul"])
+OperationFactory.register("divide", Division, ["/", "div"])
 
 # Why use the Factory Pattern?
 # - It provides a way to create objects without specifying the exact class.
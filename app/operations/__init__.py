@@ -2,9 +2,46 @@
 Operation Classes that performs arithmetic operations
 - uses the command pattern to encapsulate each operation as an object
 - the template method pattern defines a framework subclass have to follow
+- reduce() folds a whole stream of values with one operation in a single pass
 '''
 from abc import ABC, abstractmethod  # For creating abstract base classes (ABCs).
+from array import array  # Compact typed buffers for batch results.
+from collections import namedtuple  # Already loaded at startup, unlike typing.NamedTuple.
+import functools
+import itertools
 import logging
+import math
+import operator  # C-level arithmetic functions used by the batch paths.
+
+from app.log_config import hot_path_logger
+
+# array.array typecodes that are guaranteed to hold numbers.
+NUMERIC_TYPECODES = frozenset("bBhHiIlLqQfd")
+
+def _divide(a: float, b: float) -> float:
+    """
+    Plain-function version of Division.execute, with the same error.
+    """
+    if b == 0:
+        logging.error("Attempted to divide by zero.")
+        raise ValueError("Division by zero is not allowed.")
+    return a / b
+
+# Operation code -> plain function (index 0 means "use the template method").
+# Filled in place, so suspend/resume_fast_dispatch never rebind the name.
+_FAST_FUNCTIONS = (None, operator.add, operator.sub, operator.mul, _divide)
+DISPATCH_TABLE = list(_FAST_FUNCTIONS)
+_suspended = 0  # Number of active suspend_fast_dispatch() calls.
+
+# Values summed per math.fsum call by the streaming reductions (bounds memory use).
+REDUCE_CHUNK_SIZE = 65536
+
+# Outcome of TemplateOperation.reduce. The last step, `prefix <operation> last = result`,
+# is an ordinary binary calculation, which is how calculators record a reduction in history.
+# - result: the reduction of every value; prefix: the reduction of every value but the last
+# - last: the last value; count: how many values were reduced
+# - scan: every running result, with reduce(scan=True), else None
+Reduction = namedtuple("Reduction", "result prefix last count scan", defaults=(None,))
 
 class TemplateOperation(ABC):
     """
@@ -12,6 +49,20 @@ class TemplateOperation(ABC):
     - Inherits from ABC to make it an abstract base class.
     - The Template Method Pattern defines the steps of an algorithm.
     """
+    code = 0  # Compact numeric code used by columnar history stores (0 = not fixed).
+    dispatch_code = 0  # Slot in DISPATCH_TABLE for calculate_trusted (0 = no fast path).
+    numeric_types = (int, float)  # Value types accepted by reduce().
+    type_names = "numbers"  # Used in the reduce() validation error message.
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Gives each subclass a dispatch slot only if it declares its own code.
+        An inherited code would let calculate_trusted skip an overridden execute.
+        """
+        super().__init_subclass__(**kwargs)
+        code = cls.__dict__.get("code", 0)
+        cls.dispatch_code = code if code < len(DISPATCH_TABLE) else 0
+
     def calculate(self, a: float, b: float) -> float:
         """
         Template method that defines the structure for performing an operation.
@@ -48,7 +99,99 @@ class TemplateOperation(ABC):
         Logs the result of the calculation.
         """
         # Log an informational message.
-        logging.info("Operation performed: %s and %s -> Result: %s", a, b, result)
+        hot_path_logger.info("Operation performed: %s and %s -> Result: %s", a, b, result)
+
+    def calculate_many(self, a_seq, b_seq, **options) -> array:
+        """
+        Batch version of the template method for many operand pairs.
+        Steps:
+        1. Validate both sequences in one pass.
+        2. Execute the operation over every pair.
+        3. Log a single summary line for the whole batch.
+        Parameters:
+        - a_seq: First operands (array.array, NumPy array, list, ...).
+        - b_seq: Second operands, same length as a_seq.
+        - options: Extra keyword options forwarded to execute_many.
+        Returns:
+        - An array('d') holding one result per pair.
+        """
+        self.validate_many(a_seq, b_seq)  # Step 1: Validate the inputs.
+        results = self.execute_many(a_seq, b_seq, **options)  # Step 2: Compute every pair.
+        # Step 3: Log once per batch instead of once per pair.
+        hot_path_logger.info(
+            "Batch operation performed: %s on %d pairs", self.__class__.__name__, len(results)
+        )
+        return results
+
+    def validate_many(self, a_seq, b_seq):
+        """
+        Validates two operand sequences for a batch calculation.
+        Raises a ValueError if the lengths differ or any element is not numeric.
+        Typed buffers (array.array, NumPy arrays) are accepted without per-element checks.
+        """
+        if len(a_seq) != len(b_seq):
+            logging.error("Invalid batch: %d and %d operands", len(a_seq), len(b_seq))
+            raise ValueError("Operand sequences must have the same length.")
+        for seq in (a_seq, b_seq):
+            if _is_numeric_buffer(seq):
+                continue  # The buffer type already guarantees numeric elements.
+            for value in seq:
+                if not isinstance(value, (int, float)):
+                    logging.error("Invalid batch input: %s (Inputs must be numbers)", value)
+                    raise ValueError("Both inputs must be numbers.")
+
+    def execute_many(self, a_seq, b_seq) -> array:
+        """
+        Performs the operation over every pair of operands.
+        Subclasses override this with a C-level operator for speed.
+        """
+        return array("d", map(self.execute, a_seq, b_seq))
+
+    def reduce(self, values, scan: bool = False, **options) -> Reduction:
+        """
+        Template method that folds a stream of values from the left,
+        e.g. ((v0 + v1) + v2) + ... for Addition.
+        Steps:
+        1. Validate each value as it is read (typed buffers are trusted).
+        2. Reduce the values with execute_reduce (or execute_accumulate for a scan).
+        3. Log a single summary line for the whole stream.
+        Parameters:
+        - values: Any iterable of at least two numbers (list, array, generator, ...); read once.
+        - scan (bool): Also keep every running result (like itertools.accumulate).
+        - options: Extra keyword options forwarded to execute_reduce / execute_accumulate.
+        Returns:
+        - A Reduction with the result, its last step and, with scan=True, the running results.
+        """
+        stream = _Stream(values, self)  # Step 1: Validate lazily, in the same pass.
+        if scan:  # Step 2: Reduce (or scan) every value.
+            running = self.execute_accumulate(stream.values(), **options)
+            prefix, result = running[-2], running[-1]
+        else:
+            running = None
+            prefix, result = self.execute_reduce(stream, **options)
+        # Step 3: Log once per stream instead of once per value.
+        hot_path_logger.info(
+            "Reduction performed: %s over %d values -> %s",
+            self.__class__.__name__, stream.count, result,
+        )
+        return Reduction(result, prefix, stream.last, stream.count, running)
+
+    def execute_reduce(self, stream) -> tuple:
+        """
+        Reduces a validated stream. stream.head() yields every value but the
+        last; stream.last is set once head() is exhausted.
+        Subclasses override this with a faster or numerically stabler algorithm.
+        Returns:
+        - (prefix, result): the reduction without and with the last value.
+        """
+        prefix = functools.reduce(self.execute, stream.head())
+        return prefix, self.execute(prefix, stream.last)
+
+    def execute_accumulate(self, values) -> array:
+        """
+        Returns an array('d') of every running result of the fold.
+        """
+        return array("d", itertools.accumulate(values, self.execute))
 
 # Concrete operation classes implementing specific arithmetic operations.
 # Each class represents a specific operation and extends the TemplateOperation base class.
@@ -58,39 +201,125 @@ class Addition(TemplateOperation):
     Class to represent the addition operation.
     Inherits from TemplateOperation.
     """
+    code = 1
+
     def execute(self, a: float, b: float) -> float:
         """
         Returns the sum of two numbers.
         """
         return a + b  # Perform addition.
 
+    def execute_many(self, a_seq, b_seq) -> array:
+        """
+        Returns the element-wise sums of two operand sequences.
+        """
+        return _elementwise(operator.add, a_seq, b_seq)
+
+    def execute_reduce(self, stream) -> tuple:
+        """
+        Sums with math.fsum (exactly rounded partial sums) instead of
+        adding left to right, so the error does not grow with the stream length.
+        """
+        partials = _sum_partials(stream.head())
+        return _fsum(partials), _fsum(partials + [stream.last])
+
+    def execute_accumulate(self, values) -> array:
+        """
+        Returns the running sums, each carrying a compensation term (Neumaier).
+        """
+        return _compensated_scan(values)
+
 class Subtraction(TemplateOperation):
     """
     Class to represent the subtraction operation.
     Inherits from TemplateOperation.
     """
+    code = 2
+
     def execute(self, a: float, b: float) -> float:
         """
         Returns the difference between two numbers.
         """
         return a - b  # Perform subtraction.
 
+    def execute_many(self, a_seq, b_seq) -> array:
+        """
+        Returns the element-wise differences of two operand sequences.
+        """
+        return _elementwise(operator.sub, a_seq, b_seq)
+
+    def execute_reduce(self, stream) -> tuple:
+        """
+        Computes v0 - v1 - v2 - ... as the stable sum of v0, -v1, -v2, ...
+        """
+        partials = _sum_partials(_negate_tail(stream.head()))
+        return _fsum(partials), _fsum(partials + [-stream.last])
+
+    def execute_accumulate(self, values) -> array:
+        """
+        Returns the running differences, with the same compensation as Addition.
+        """
+        return _compensated_scan(_negate_tail(values))
+
 class Multiplication(TemplateOperation):
     """
     Class to represent the multiplication operation.
     Inherits from TemplateOperation.
     """
+    code = 3
+
     def execute(self, a: float, b: float) -> float:
         """
         Returns the product of two numbers.
         """
         return a * b  # Perform multiplication.
 
+    def execute_many(self, a_seq, b_seq) -> array:
+        """
+        Returns the element-wise products of two operand sequences.
+        """
+        return _elementwise(operator.mul, a_seq, b_seq)
+
+    def execute_reduce(self, stream, log_space: bool = False) -> tuple:
+        """
+        Multiplies every value (math.prod).
+        Parameters:
+        - log_space (bool): Sum logarithms instead, so long products whose
+          partial products leave the float range (e.g. 1e200 * 1e200 * 1e-300)
+          still come out finite. Costs a few ulps of precision.
+        """
+        if not log_space:
+            prefix = math.prod(stream.head())
+            return prefix, prefix * stream.last
+        magnitude, negative, zero = _log_product(stream.head())
+        last_magnitude, last_negative, last_zero = _log_product((stream.last,))
+        return (
+            _from_log(magnitude, negative, zero),
+            _from_log(magnitude + last_magnitude, negative != last_negative, zero or last_zero),
+        )
+
+    def execute_accumulate(self, values, log_space: bool = False) -> array:
+        """
+        Returns the running products (optionally from running sums of logarithms).
+        """
+        if not log_space:
+            return array("d", itertools.accumulate(values, operator.mul))
+        results = array("d")
+        magnitude, negative, zero = 0.0, False, False
+        for value in values:
+            step, step_negative, step_zero = _log_product((value,))
+            magnitude += step
+            negative, zero = negative != step_negative, zero or step_zero
+            results.append(_from_log(magnitude, negative, zero))
+        return results
+
 class Division(TemplateOperation):
     """
     Class to represent the division operation.
     Inherits from TemplateOperation.
     """
+    code = 4
+
     def execute(self, a: float, b: float) -> float:
         """
         Returns the quotient of two numbers.
@@ -101,6 +330,259 @@ class Division(TemplateOperation):
             raise ValueError("Division by zero is not allowed.")  # Raise an exception.
         return a / b  # Perform division.
 
+    def execute_many(self, a_seq, b_seq, zero_division: str = "raise") -> array:
+        """
+        Returns the element-wise quotients of two operand sequences.
+        Parameters:
+        - zero_division (str): What to do with rows whose divisor is zero.
+          "raise" raises a ValueError naming the first bad row,
+          "nan" stores NaN for those rows and keeps going.
+        Use zero_division_mask() to find the rows that were filled with NaN.
+        """
+        if zero_division not in ("raise", "nan"):
+            raise ValueError(f"Unknown zero_division policy '{zero_division}'.")
+        if 0 not in b_seq:
+            return _elementwise(operator.truediv, a_seq, b_seq)  # Fast path: no zero divisors.
+        if zero_division == "raise":
+            row = list(b_seq).index(0)
+            logging.error("Attempted to divide by zero in batch row %d.", row)
+            raise ValueError(f"Division by zero is not allowed (row {row}).")
+        return array("d", map(_divide_or_nan, a_seq, b_seq))
+
+    @staticmethod
+    def zero_division_mask(b_seq) -> array:
+        """
+        Returns an array('B') with 1 for every row whose divisor is zero.
+        """
+        return array("B", [value == 0 for value in b_seq])
+
+def calculate_trusted(operation: TemplateOperation, a: float, b: float) -> float:
+    """
+    Low-overhead calculate for operands already known to be numbers
+    (e.g. the output of float()). Built-in operations go through
+    DISPATCH_TABLE with no validation or per-call log; anything else
+    falls back to operation.calculate. Results and errors are the same.
+    Parameters:
+    - operation (TemplateOperation): The operation to perform.
+    - a (float): The first operand.
+    - b (float): The second operand.
+    """
+    function = DISPATCH_TABLE[operation.dispatch_code]
+    if function is None:
+        return operation.calculate(a, b)
+    return function(a, b)
+
+def suspend_fast_dispatch():
+    """
+    Routes calculate_trusted through the template methods, so that wrappers
+    installed by metrics or profiling see every call. Calls nest.
+    """
+    global _suspended  # pylint: disable=global-statement
+    _suspended += 1
+    DISPATCH_TABLE[1:] = [None] * (len(DISPATCH_TABLE) - 1)
+
+def resume_fast_dispatch():
+    """
+    Undoes one suspend_fast_dispatch(); the table is restored after the last one.
+    """
+    global _suspended  # pylint: disable=global-statement
+    _suspended = max(_suspended - 1, 0)
+    if not _suspended:
+        DISPATCH_TABLE[:] = _FAST_FUNCTIONS
+
+class _Stream:
+    """
+    A single pass over reduce() input: validates values as they are read and
+    remembers how many there were and which one came last.
+    """
+    __slots__ = ("_values", "_operation", "count", "last")
+
+    def __init__(self, values, operation: TemplateOperation):
+        self._values = values
+        self._operation = operation
+        self.count = 0
+        self.last = None
+
+    def values(self):
+        """
+        Yields every value. Raises a ValueError for a non-number or fewer than two values.
+        """
+        if _is_numeric_buffer(self._values):
+            numeric_types = object  # The buffer type already guarantees numbers.
+        else:
+            numeric_types = self._operation.numeric_types
+        count, value = 0, None
+        for count, value in enumerate(self._values, 1):
+            if not isinstance(value, numeric_types):
+                logging.error("Invalid reduction input: %s (Inputs must be numbers)", value)
+                raise ValueError(f"All values must be {self._operation.type_names}.")
+            yield value
+        if count < 2:
+            logging.error("Reduction over %d values.", count)
+            raise ValueError("A reduction needs at least two values.")
+        self.count, self.last = count, value
+
+    def head(self):
+        """
+        Yields every value but the last, which is left in self.last.
+        """
+        values = self.values()
+        previous = next(values)  # Cannot stop early: values() raises instead.
+        for value in values:
+            yield previous
+            previous = value
+
+def _fsum(values) -> float:
+    """
+    math.fsum, falling back to plain addition when a partial sum overflows
+    or mixes infinities (the IEEE result, inf or nan, is then exact anyway).
+    Ints beyond the double range count as inf, like an overflowing float sum.
+    """
+    try:
+        return math.fsum(values)
+    except (OverflowError, ValueError):
+        try:
+            return float(sum(values))  # Huge ints that cancel still sum exactly.
+        except OverflowError:
+            return sum(map(as_double, values))
+
+def as_double(value) -> float:
+    """
+    float(value), with values beyond the double range (big ints, Fractions)
+    mapped to inf or -inf instead of raising an OverflowError.
+    """
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+def _sum_partials(values) -> list:
+    """
+    Sums a stream chunk by chunk with math.fsum, holding at most
+    REDUCE_CHUNK_SIZE values at a time. Each chunk leaves its sum and the
+    rounding error of that sum, so math.fsum over the returned partials
+    (plus any further values) is still rounded only once in practice.
+    """
+    values = iter(values)
+    partials = []
+    while chunk := list(itertools.islice(values, REDUCE_CHUNK_SIZE)):
+        total = _fsum(chunk)
+        partials.append(total)
+        if math.isfinite(total):
+            chunk.append(-total)
+            partials.append(_fsum(chunk))  # What rounding the chunk sum lost.
+    return partials
+
+def _stable_sum(values) -> float:
+    """
+    Returns the sum of a stream (see _sum_partials).
+    """
+    return _fsum(_sum_partials(values))
+
+def _compensated_scan(values) -> array:
+    """
+    Running sums with Neumaier compensation: each output is within about one
+    ulp of the exact prefix sum, however many values came before it.
+    """
+    results = array("d")
+    total = compensation = 0.0
+    for value in values:
+        try:
+            step = total + value
+        except OverflowError:  # An int beyond the double range.
+            value = as_double(value)
+            step = total + value
+        if abs(total) >= abs(value):
+            compensation += (total - step) + value  # Low bits of value that were lost.
+        else:
+            compensation += (value - step) + total  # Low bits of total that were lost.
+        total = step
+        results.append(total + compensation if math.isfinite(total) else total)
+    return results
+
+def _negate_tail(values):
+    """
+    Yields the first value unchanged and every other value negated.
+    """
+    values = iter(values)
+    yield next(values)
+    yield from map(operator.neg, values)
+
+def _log_product(values) -> tuple:
+    """
+    Returns (log of |product|, product is negative, product has a zero factor),
+    summing logarithms so no intermediate product can overflow or underflow.
+    """
+    negative = zero = False
+
+    def magnitudes():
+        nonlocal negative, zero
+        for value in values:
+            if value < 0:
+                negative = not negative
+            if value == 0:
+                zero = True
+            else:
+                yield math.log(abs(value))
+
+    return _stable_sum(magnitudes()), negative, zero
+
+def _from_log(magnitude: float, negative: bool, zero: bool) -> float:
+    """
+    Turns _log_product's output back into a float product.
+    """
+    if zero:
+        value = math.nan if math.isinf(magnitude) or math.isnan(magnitude) else 0.0  # 0 * inf is nan.
+    else:
+        try:
+            value = math.exp(magnitude)
+        except OverflowError:
+            value = math.inf
+    return -value if negative else value
+
+def _divide_or_nan(a: float, b: float) -> float:
+    """
+    Divides a by b, returning NaN instead of raising when b is zero.
+    """
+    return a / b if b != 0 else float("nan")
+
+def _elementwise(function, a_seq, b_seq) -> array:
+    """
+    Applies a C-level operator to every pair of operands. NumPy arrays go
+    through one call on the whole arrays (NumPy runs the matching ufunc);
+    other sequences are mapped element by element.
+    """
+    if hasattr(a_seq, "dtype") or hasattr(b_seq, "dtype"):
+        results = array("d")
+        results.frombytes(function(_as_float64(a_seq), _as_float64(b_seq)).tobytes())
+        return results
+    return array("d", map(function, a_seq, b_seq))
+
+def _as_float64(seq):
+    """
+    Returns a NumPy array as float64 (no copy if it already is), anything else unchanged.
+    Integer arrays are converted first, so sums cannot wrap around as int64 would.
+    """
+    return seq.astype("d", copy=False) if hasattr(seq, "dtype") else seq
+
+def _is_numeric_buffer(seq) -> bool:
+    """
+    Returns True if seq is a typed buffer whose elements are always numbers.
+    """
+    if isinstance(seq, array):
+        return seq.typecode in NUMERIC_TYPECODES
+    dtype = getattr(seq, "dtype", None)  # NumPy arrays, without importing NumPy.
+    return getattr(dtype, "kind", None) in ("b", "i", "u", "f")
+
+# Why fold a stream in one reduce() call?
+# - A million-value sum is one validation pass, one log line and one history entry,
+#   not a million Calculation objects and observer notifications.
+# - math.fsum keeps a sum exactly rounded where left-to-right addition drifts with length.
+
+# Why a dispatch table next to the template method?
+# - calculate() pays for three method lookups, two isinstance checks and a log call.
+# - Callers that already parsed numbers can index a table of plain C-level functions instead.
+
 # Why use the Template Method Pattern here?
 # - It defines the algorithm's skeleton in a method (`calculate`),
 # deferring some steps (`execute`) to subclasses.
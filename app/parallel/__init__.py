@@ -0,0 +1,180 @@
+'''
+Parallel execution of large calculation batches
+- splits a batch into chunks and runs them in a ProcessPoolExecutor
+- operands, results and error flags live in shared memory, so workers only
+  receive buffer names and chunk bounds (no per-item pickling)
+- results are merged back into the SingletonCalculator history in input order
+- rows that fail in a worker are reported by index, whatever the error
+'''
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import math
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+import os
+import pickle
+from typing import Dict, Optional, Tuple
+
+from app.calculation import Calculation
+from app.history import operation_code
+from app.operation_factory import OperationFactory
+from app.operations import Division
+from app.singleton_calc import SingletonCalculator
+
+# Error reported for rows flagged by a worker.
+DIVISION_BY_ZERO = "Division by zero is not allowed."
+
+def _run_chunk(names: Tuple[str, str, str, str], operation,
+               start: int, stop: int) -> Dict[int, str]:
+    """
+    Worker entry point: computes rows [start, stop) in place in shared memory.
+    Parameters:
+    - names: Shared memory names of the operand1, operand2, result and error buffers.
+    - operation: The operation, or its OperationFactory name (see _task_operation).
+    - start, stop (int): The chunk bounds.
+    Returns:
+    - {row: message} for rows that failed, other than divisions by zero
+      (those are flagged in the error buffer).
+    """
+    if isinstance(operation, str):
+        operation = OperationFactory.create_operation(operation)
+    blocks = [SharedMemory(name=name) for name in names]
+    views = []
+    try:
+        views = [block.buf.cast("d") for block in blocks[:3]] + [blocks[3].buf]
+        a_view, b_view, result_view, error_view = views
+        a_seq, b_seq = a_view[start:stop], b_view[start:stop]
+        views += [a_seq, b_seq]
+        if isinstance(operation, Division):
+            error_view[start:stop] = Division.zero_division_mask(b_seq).tobytes()
+            result_view[start:stop] = operation.execute_many(a_seq, b_seq, zero_division="nan")
+            return {}
+        try:
+            result_view[start:stop] = operation.execute_many(a_seq, b_seq)
+            return {}
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Some row failed (e.g. a plugin error): redo the chunk row by row to find it.
+            return _run_rows(operation, a_seq, b_seq, result_view, start)
+    finally:
+        for view in views:
+            view.release()  # Views must be released before the blocks are closed.
+        for block in blocks:
+            block.close()
+
+def _run_rows(operation, a_seq, b_seq, result_view, start: int) -> Dict[int, str]:
+    """
+    Computes a chunk one row at a time, storing NaN for the rows that fail.
+    Returns:
+    - {row: message} for the failed rows.
+    """
+    errors = {}
+    for row, a, b in zip(range(start, start + len(a_seq)), a_seq, b_seq):
+        try:
+            result_view[row] = operation.execute(a, b)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            result_view[row] = math.nan
+            errors[row] = str(error)
+    return errors
+
+def _task_operation(operation, operation_name: str, start_method: str):
+    """
+    Returns what is sent to workers to rebuild the operation: the instance
+    itself if it pickles (its class can be imported by name), else the
+    registered name, which only forked workers (they inherit the parent's
+    OperationFactory registry) can look up.
+    Raises a ValueError if spawned workers could not get the operation.
+    """
+    try:
+        pickle.dumps(operation)
+    except (pickle.PicklingError, AttributeError, TypeError) as error:
+        if start_method == "fork":
+            return operation_name
+        raise ValueError(
+            f"Operation '{operation_name}' cannot be sent to {start_method} worker processes; "
+            f"define its class at module level ({error})."
+        ) from None
+    return operation
+
+def parallel_calculate(operation_name: str, a_seq, b_seq, workers: Optional[int] = None,
+                       chunk_size: Optional[int] = None,
+                       record: bool = True) -> Tuple[array, Dict[int, str]]:
+    """
+    Calculates every (a, b) pair across a pool of worker processes.
+    Parameters:
+    - operation_name (str): An operation name or alias known to OperationFactory.
+    - a_seq, b_seq: Operand sequences of equal length.
+    - workers (int): Number of processes (defaults to the CPU count).
+    - chunk_size (int): Rows per task (defaults to an even split, four per worker).
+    - record (bool): Append successful rows to the SingletonCalculator history.
+    Returns:
+    - (results, errors): an array('d') with one entry per row (NaN where the
+      row failed) and a dict mapping failed row indexes to error messages.
+    Raises a ValueError for unknown operations, invalid inputs, or plugin
+    operations that spawned workers cannot import.
+    """
+    operation = OperationFactory.create_operation(operation_name)
+    if operation is None:
+        raise ValueError(f"Unknown operation '{operation_name}'.")
+    operation.validate_many(a_seq, b_seq)
+    count = len(a_seq)
+    if count == 0:
+        return array("d"), {}
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, -(-count // (workers * 4)))
+
+    context = multiprocessing.get_context()
+    task_operation = _task_operation(operation, operation_name, context.get_start_method())
+
+    blocks = [SharedMemory(create=True, size=8 * count) for _ in range(3)]
+    blocks.append(SharedMemory(create=True, size=count))
+    try:
+        for block, values in zip(blocks, (a_seq, b_seq)):
+            with block.buf.cast("d") as view:
+                view[:count] = array("d", values)
+        names = tuple(block.name for block in blocks)
+        errors = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(_run_chunk, names, task_operation,
+                            start, min(start + chunk_size, count))
+                for start in range(0, count, chunk_size)
+            ]
+            for future in futures:
+                errors.update(future.result())  # Re-raises anything a worker could not report.
+        with blocks[2].buf.cast("d") as view:
+            results = array("d", view[:count])
+        flags = bytes(blocks[3].buf[:count])
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    errors.update((index, DIVISION_BY_ZERO) for index, flag in enumerate(flags) if flag)
+    errors = dict(sorted(errors.items()))
+    logging.info("Parallel %s: %d rows, %d errors, %d workers",
+                 operation_name, count, len(errors), workers)
+    if record:
+        _record(operation, a_seq, b_seq, results, errors)
+    return results, errors
+
+def _record(operation, a_seq, b_seq, results, errors: Dict[int, str]):
+    """
+    Appends the successful rows to the SingletonCalculator history, in input order.
+    """
+    history = SingletonCalculator().get_history()
+    keep = [index for index in range(len(results)) if index not in errors]
+    if not keep:
+        return  # Every row failed: nothing reaches the store, its indexes or its statistics.
+    if hasattr(history, "extend_columns"):
+        history.extend_columns(
+            array("B", [operation_code(operation)]) * len(keep),
+            [a_seq[i] for i in keep], [b_seq[i] for i in keep], [results[i] for i in keep],
+        )
+        return
+    for index in keep:
+        history.append(Calculation(operation, a_seq[index], b_seq[index], results[index]))
+
+# Why shared memory?
+# - Workers read operands and write results in place; only buffer names and
+#   chunk bounds cross the process boundary, so pickling cost does not grow with the batch.
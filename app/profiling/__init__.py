@@ -0,0 +1,174 @@
+'''
+Profiling mode for the REPL and batch runs
+- PhaseTimer wraps the template steps (validate, execute, log) and the factory,
+  parse and observer-notify steps, and reports each timing to pluggable hooks
+- profile_run() runs any entry point under cProfile, writes the profile file and
+  prints a short top-N summary plus per-phase totals on exit
+'''
+import cProfile
+from contextlib import contextmanager
+import io
+import pstats
+import sys
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from app import batch
+from app.observer import CalculatorWithObserver
+from app.operation_factory import OperationFactory
+from app.operations import TemplateOperation, resume_fast_dispatch, suspend_fast_dispatch
+
+# Hook signature: hook(phase_name, seconds).
+PhaseHook = Callable[[str, float], None]
+
+# The PhaseTimer currently installed, if any (used by phase()).
+_active: Optional["PhaseTimer"] = None
+
+def _operation_classes():
+    """
+    Yields TemplateOperation and every (indirect) subclass.
+    """
+    pending = [TemplateOperation]
+    while pending:
+        cls = pending.pop()
+        yield cls
+        pending.extend(cls.__subclasses__())
+
+class PhaseTimer:
+    """
+    Times the calculator's phases and reports them to hook callbacks.
+    Phases: parse, factory, validate, execute, log, notify.
+    """
+    def __init__(self):
+        self.hooks: List[PhaseHook] = [self._accumulate]
+        self.totals: Dict[str, List[float]] = {}  # phase -> [calls, seconds]
+        self._originals: Dict = {}
+
+    def add_hook(self, hook: PhaseHook):
+        """
+        Registers a callback that receives (phase, seconds) for every timed step.
+        """
+        self.hooks.append(hook)
+
+    def _accumulate(self, phase_name: str, seconds: float):
+        """
+        Default hook: keeps per-phase call counts and total time.
+        """
+        total = self.totals.setdefault(phase_name, [0, 0.0])
+        total[0] += 1
+        total[1] += seconds
+
+    def report(self, phase_name: str, seconds: float):
+        """
+        Sends one timing to every hook.
+        """
+        for hook in self.hooks:
+            hook(phase_name, seconds)
+
+    def _wrap(self, owner, name: str, phase_name: str, static: bool = False):
+        """
+        Replaces owner.name with a timed version that reports to the hooks.
+        """
+        original = owner.__dict__[name]
+        function = original.__func__ if static else original
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.report(phase_name, perf_counter() - start)
+
+        self._originals[(owner, name)] = (original, timed)
+        setattr(owner, name, staticmethod(timed) if static else timed)
+
+    def install(self):
+        """
+        Wraps every phase and makes this timer the active one for phase().
+        """
+        global _active  # pylint: disable=global-statement
+        if self._originals:
+            return
+        suspend_fast_dispatch()  # Send calculate_trusted calls through the wrapped steps.
+        for cls in _operation_classes():
+            for name, phase_name in (("validate_inputs", "validate"), ("validate_many", "validate"),
+                                     ("execute", "execute"), ("execute_many", "execute"),
+                                     ("log_result", "log")):
+                if name in cls.__dict__ and not getattr(cls.__dict__[name],
+                                                        "__isabstractmethod__", False):
+                    self._wrap(cls, name, phase_name)
+        self._wrap(OperationFactory, "create_operation", "factory", static=True)
+        self._wrap(CalculatorWithObserver, "notify_observers", "notify")
+        self._wrap(batch, "parse_command", "parse")
+        _active = self
+
+    def uninstall(self):
+        """
+        Restores the original methods (unless something else replaced them since).
+        """
+        global _active  # pylint: disable=global-statement
+        if self._originals:
+            resume_fast_dispatch()
+        for (owner, name), (original, timed) in self._originals.items():
+            current = owner.__dict__[name]
+            if getattr(current, "__func__", current) is timed:
+                setattr(owner, name, original)
+        self._originals.clear()
+        if _active is self:
+            _active = None
+
+    def summary(self) -> str:
+        """
+        Returns the per-phase totals as a small table, slowest phase first.
+        """
+        lines = ["Phase       calls      total ms   mean us"]
+        for name, (calls, seconds) in sorted(self.totals.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<10} {calls:>6} {seconds * 1e3:>13.3f} {seconds / calls * 1e6:>9.2f}")
+        return "\n".join(lines)
+
+@contextmanager
+def phase(phase_name: str):
+    """
+    Times a block as a named phase when profiling is active; does nothing otherwise.
+    """
+    timer = _active
+    if timer is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timer.report(phase_name, perf_counter() - start)
+
+def profile_run(function: Callable, *args, output: str = "calculator.prof", top: int = 15,
+                stream=None, timer: Optional[PhaseTimer] = None, **kwargs):
+    """
+    Runs function(*args, **kwargs) under cProfile with phase timing enabled.
+    On exit (even on error) writes the profile to `output` and prints the top-N
+    functions by cumulative time and the per-phase summary.
+    Parameters:
+    - function (Callable): The entry point, e.g. main.calculator.
+    - output (str): File that receives the cProfile data (open with pstats or snakeviz).
+    - top (int): Number of functions listed in the summary.
+    - stream: Where to print the summary (stderr by default).
+    - timer (PhaseTimer): Optional timer, e.g. one with extra hooks.
+    Returns:
+    - Whatever the function returns.
+    """
+    stream = stream if stream is not None else sys.stderr
+    timer = timer if timer is not None else PhaseTimer()
+    profiler = cProfile.Profile()
+    timer.install()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        timer.uninstall()
+        profiler.dump_stats(output)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+        stream.write(f"Profile written to {output}\n{text.getvalue()}\n{timer.summary()}\n")
+
+# Why hooks on the template steps?
+# - The Template Method splits every calculation into the same steps, so timing
+#   each step shows whether validation, execution or logging dominates.
@@ -0,0 +1,171 @@
+'''
+Asyncio calculator service
+- line protocol over TCP or a Unix socket: "add 1 2" or a JSON object per line
+- many requests can be in flight per connection (pipelining)
+- queued requests are coalesced into batches and evaluated on a worker thread,
+  so observer notification and logging never run on the event loop
+- responses are streamed back in request order
+'''
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+from typing import List, Optional
+
+from app.batch import parse_command
+from app.observer import CalculatorWithObserver
+from app.operation_factory import OperationFactory
+
+class CalculatorServer:
+    """
+    Serves a CalculatorWithObserver over a newline-delimited protocol.
+    Text requests ("add 1 2") get "<result>" or "error: <message>" lines back;
+    JSON requests ({"op": "add", "a": 1, "b": 2, "id": 7}) get JSON objects
+    with "result" or "error" and the request's "id".
+    """
+    def __init__(self, calculator: Optional[CalculatorWithObserver] = None,
+                 batch_size: int = 256):
+        """
+        Parameters:
+        - calculator (CalculatorWithObserver): The calculator to serve (a new one by default).
+        - batch_size (int): Maximum number of requests evaluated together.
+        """
+        self.calculator = calculator if calculator is not None else CalculatorWithObserver()
+        self.batch_size = batch_size
+        # One worker thread keeps calculations (and history) in arrival order.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calc-server")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0,
+                    path: Optional[str] = None) -> asyncio.AbstractServer:
+        """
+        Starts listening on a TCP port, or on a Unix socket when `path` is given.
+        Returns:
+        - The asyncio server (use server.sockets to find an ephemeral port).
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        logging.info("Calculator server listening on %s", path or server.sockets[0].getsockname())
+        return server
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter):
+        """
+        Reads requests as fast as they arrive while a responder task evaluates
+        and answers them in batches.
+        """
+        pending: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * 4)  # Backpressure.
+        responder = asyncio.create_task(self._respond(pending, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await self._enqueue(pending, line.decode("utf-8", "replace"), responder)
+            await self._enqueue(pending, None, responder)  # End of requests.
+            await responder
+        finally:
+            responder.cancel()  # No-op once it finished; stops it if reading failed.
+            writer.close()
+            await writer.wait_closed()
+
+    @staticmethod
+    async def _enqueue(pending: asyncio.Queue, item: Optional[str], responder: asyncio.Task):
+        """
+        Queues a request line, waiting for room unless the responder has stopped
+        (it would never drain the queue). Re-raises the responder's failure.
+        """
+        if not pending.full():
+            pending.put_nowait(item)
+            return
+        put = asyncio.ensure_future(pending.put(item))
+        await asyncio.wait((put, responder), return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            responder.result()
+
+    async def _respond(self, pending: asyncio.Queue, writer: asyncio.StreamWriter):
+        """
+        Coalesces queued requests into batches and streams the responses back.
+        """
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            batch = [await pending.get()]
+            while len(batch) < self.batch_size and not pending.empty():
+                batch.append(pending.get_nowait())
+            finished = batch[-1] is None
+            requests = [line for line in batch if line is not None]
+            if requests:
+                responses = await loop.run_in_executor(self._executor, self.evaluate_batch, requests)
+                writer.write("".join(responses).encode("utf-8"))
+                await writer.drain()
+
+    def evaluate_batch(self, lines: List[str]) -> List[str]:
+        """
+        Evaluates a batch of request lines on the worker thread.
+        Returns:
+        - One response line per request, in order.
+        """
+        return [self.evaluate(line) for line in lines]
+
+    def evaluate(self, line: str) -> str:
+        """
+        Evaluates one request line and formats its response line.
+        """
+        text = line.strip()
+        if text.startswith("{"):
+            return self._evaluate_json(text)
+        try:
+            operation, num1, num2 = parse_command(text)
+            # parse_command returns floats, so the fast dispatch path is safe.
+            result = self.calculator.perform_operation(operation, num1, num2, trusted=True)
+            return f"{result}\n"
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            # Plugins may raise anything; one bad request must not stop the connection.
+            return f"error: {error}\n"
+
+    def _evaluate_json(self, text: str) -> str:
+        """
+        Evaluates a JSON request: {"op": ..., "a": ..., "b": ..., "id": ...}.
+        """
+        response = {}
+        try:
+            request = json.loads(text)
+            response["id"] = request.get("id")
+            operation = OperationFactory.create_operation(str(request["op"]))
+            if operation is None:
+                raise ValueError(f"unknown operation '{request['op']}'")
+            response["result"] = self.calculator.perform_operation(
+                operation, request["a"], request["b"]
+            )
+        except KeyError as error:
+            response["error"] = f"missing field {error}"
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            # JSONDecodeError, invalid operands, or whatever a plugin raises.
+            response["error"] = str(error)
+        return json.dumps(response) + "\n"
+
+    def close(self):
+        """
+        Stops the worker thread after the calculations in progress finish.
+        """
+        self._executor.shutdown(wait=True)
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, path: Optional[str] = None,
+                calculator: Optional[CalculatorWithObserver] = None):
+    """
+    Runs a CalculatorServer until cancelled.
+    """
+    service = CalculatorServer(calculator)
+    server = await service.start(host, port, path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+# Why batch on a worker thread?
+# - The event loop only moves bytes; calculations, observers and logging run
+#   off-loop, one batch per hop instead of one request per hop.
@@ -1,7 +1,13 @@
 import logging
+import threading
 
+from app.aggregates import history_summary, track_history
+from app.log_config import hot_path_logger
 from app.operation_factory import TemplateOperation
+from app.operations import calculate_trusted
 from app.calculation import Calculation
+from app.history import ColumnarHistory
+from app.history_io import DEFAULT_CHUNK_ROWS, export_history, import_history
 
 # ==============================================================================
 # SINGLETON PATTERN FOR ENSURING ONE CALCULATOR INSTANCE
@@ -13,38 +19,158 @@ from app.calculation import Calculation
 # Where: In scenarios where shared resources are needed.
 # When: Throughout the application's lifecycle.
 # How: By controlling instance creation using the __new__ method.
+# Threads: Instantiation is locked; use ShardedHistory for lock-free concurrent appends.
 
 class SingletonCalculator:
     """
     A calculator using the Singleton pattern to ensure only one instance exists.
     """
     _instance = None  # Class variable to hold the singleton instance.
+    _memo = None  # Optional MemoCache shared by every reference to the singleton.
+    _backend = None  # Optional NumericBackend; None keeps the plain float operations.
+
+    _lock = threading.Lock()  # Guards the first instantiation.
 
     def __new__(cls):
         """
         Overrides the __new__ method to control the creation of a new instance.
-        Ensures that only one instance is created.
+        Ensures that only one instance is created, even when several threads
+        make the first call at the same time (double-checked locking).
         """
-        if cls._instance is None:
-            cls._instance = super(SingletonCalculator, cls).__new__(cls)  # Call the superclass __new__ method.
-            cls._history = []  # Initialize the shared history.
-            logging.info("SingletonCalculator instance created.")  # Log the creation.
+        if cls._instance is None:  # Fast path: no lock once the instance exists.
+            with cls._lock:
+                if cls._instance is None:  # Re-check: another thread may have won the race.
+                    instance = super(SingletonCalculator, cls).__new__(cls)  # Call the superclass __new__ method.
+                    cls._history = ColumnarHistory()  # Initialize the shared history.
+                    cls._aggregates = track_history(cls._history)  # None: the store keeps them.
+                    cls._instance = instance  # Publish only once fully initialized.
+                    logging.info("SingletonCalculator instance created.")  # Log the creation.
         return cls._instance  # Return the singleton instance.
 
-    def perform_operation(self, operation: TemplateOperation, a: float, b: float) -> float:
+    def perform_operation(self, operation: TemplateOperation, a: float, b: float,
+                          backend=None, trusted: bool = False) -> float:
         """
         Performs the given operation and stores the calculation in history.
         Parameters:
         - operation (TemplateOperation): The operation to perform.
         - a (float): The first operand.
         - b (float): The second operand.
+        - backend (NumericBackend): Number type for this call only; defaults to
+          the one set with use_backend().
+        - trusted (bool): The operands are known to be numbers (e.g. from float());
+          built-in operations then skip validation via calculate_trusted.
         Returns:
         - The result of the operation.
         """
-        calculation = Calculation(operation, a, b)  # Create a new Calculation object.
+        if backend is None:
+            backend = self._backend
+        if backend is not None:
+            operation = backend.operation(operation)  # Swap in the backend's version.
+        if self._memo is not None:
+            result = self._memo.calculate(operation, a, b)  # Reuse a cached result if any.
+        elif trusted:
+            result = calculate_trusted(operation, a, b)  # Table dispatch, no validation.
+        else:
+            result = operation.calculate(a, b)  # Execute the calculation once.
+        calculation = Calculation(operation, a, b, result)  # Store the result with the operands.
         self._history.append(calculation)  # Add the calculation to the shared history.
-        logging.debug(f"SingletonCalculator: Performed operation -> {calculation}")  # Log the operation.
-        return operation.calculate(a, b)  # Execute the calculation and return the result.
+        if self._aggregates is not None:  # Else the history store counts it.
+            self._aggregates.add(calculation)  # O(1) update of the running statistics.
+        # Log the operation; formatted only if the record is actually emitted.
+        hot_path_logger.debug("SingletonCalculator: Performed operation -> %s", calculation)
+        return result  # Return the result computed above.
+
+    def perform_reduction(self, operation: TemplateOperation, values, scan: bool = False,
+                          backend=None, **options):
+        """
+        Folds a stream of values with one operation and records a single history entry.
+        Parameters:
+        - operation (TemplateOperation): The operation to fold with, e.g. Addition() for a sum.
+        - values: Any iterable of at least two numbers; it is read once, lazily.
+        - scan (bool): Return every running result instead of only the final one.
+        - backend (NumericBackend): Number type for this call only.
+        - options: Passed to the operation, e.g. log_space=True for Multiplication.
+        The entry is the last step of the fold: (all values but the last) <operation> (last value).
+        Returns:
+        - The result, or with scan=True the running results (array('d'), or a list for exact backends).
+        """
+        if backend is None:
+            backend = self._backend
+        if backend is not None:
+            operation = backend.operation(operation)  # Swap in the backend's version.
+        reduction = operation.reduce(values, scan=scan, **options)  # One pass, one log line.
+        calculation = Calculation(operation, reduction.prefix, reduction.last, reduction.result)
+        self._history.append(calculation)  # One entry for the whole stream.
+        if self._aggregates is not None:
+            self._aggregates.add(calculation)
+        hot_path_logger.debug("SingletonCalculator: Performed reduction -> %s", calculation)
+        return reduction.scan if scan else reduction.result
+
+    def use_history(self, history):
+        """
+        Replaces the shared history store with another backend.
+        Parameters:
+        - history: Any list-like store with append, indexing, iteration and clear().
+        """
+        type(self)._history = history  # Shared by every reference to the singleton.
+        type(self)._aggregates = track_history(history)  # Stores keep their own; lists need these.
+        logging.info("SingletonCalculator history backend set to %r.", history)
+
+    def use_memo(self, memo):
+        """
+        Enables (or, with None, disables) a result cache for perform_operation.
+        Parameters:
+        - memo (MemoCache): The cache to use.
+        """
+        type(self)._memo = memo
+
+    def use_backend(self, backend):
+        """
+        Selects the numeric backend (or, with None, plain floats) for every call.
+        Parameters:
+        - backend (NumericBackend): For example DecimalBackend() or FractionBackend().
+        """
+        type(self)._backend = backend
+        logging.info("SingletonCalculator numeric backend set to %r.", backend)
+
+    def summary(self):
+        """
+        Returns count, sum, mean, variance, min and max of the results, overall
+        and per operation, in O(1) regardless of the history size.
+        """
+        return history_summary(self._history, self._aggregates)
+
+    def clear_history(self):
+        """
+        Clears the shared history and resets the running statistics with it.
+        """
+        self._history.clear()  # History stores reset their own statistics.
+        if self._aggregates is not None:
+            self._aggregates.clear()
+
+    def export_history(self, path: str, fmt=None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+        """
+        Streams the history to a CSV, JSON Lines or binary columnar file.
+        Parameters:
+        - path (str): The output file.
+        - fmt (str): 'csv', 'jsonl' or 'binary'; defaults to the file extension.
+        - chunk_rows (int): Rows held in memory at a time.
+        Returns:
+        - The number of entries written.
+        """
+        return export_history(self._history, path, fmt, chunk_rows)
+
+    def import_history(self, path: str, fmt=None) -> int:
+        """
+        Appends the entries of an exported file to the history, in bulk.
+        The running statistics are updated chunk by chunk.
+        Returns:
+        - The number of entries imported.
+        """
+        def count(columns):
+            self._aggregates.add_columns(columns[0], columns[3])  # Codes and results.
+        return import_history(self._history, path, fmt,
+                              on_chunk=count if self._aggregates is not None else None)
 
     def get_history(self):
         """
@@ -52,7 +178,7 @@ class SingletonCalculator:
         Includes a breakpoint for debugging using pdb.
         """
        # pdb.set_trace()  # Pause execution here for debugging.
-        return self._history  # Return the shared history list.
+        return self._history  # Return the shared history store.
 
 # Why use the Singleton Pattern?
 # - To control access to a shared resource.
@@ -0,0 +1,278 @@
+"""
+Hot Path Benchmark Runner
+
+Measures the calculator's hot paths and reports nanoseconds per operation:
+- TemplateOperation.calculate and calculate_trusted for each operation
+- OperationFactory.create_operation
+- CalculatorWithObserver.perform_operation with 0, 1 and 10 observers
+- SingletonCalculator history append and iteration at several history sizes
+- SharedHistory (SQLite, batched commits) append
+- perform_reduction per value (sum, log-space product) vs. one perform_operation per value
+- IndexedHistory append, and a first page of `find` queries vs. a scan of a plain history
+- Calculation.__str__
+It also reports memory per history entry (columnar store vs. a plain list).
+
+Usage:
+    python -m benchmarks.hot_paths --save results.json
+    python -m benchmarks.hot_paths --compare results.json --threshold 0.2
+The compare mode exits with status 1 if any benchmark got slower than the
+baseline by more than the threshold (0.2 = 20%).
+"""
+
+import argparse
+from array import array
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List
+
+from app.calculation import Calculation
+from app.history import ColumnarHistory, SharedHistory
+from app.history_index import IndexedHistory, parse_query, query_history
+from app.observer import CalculatorWithObserver, HistoryObserver
+from app.operation_factory import OperationFactory
+from app.operations import Addition, Subtraction, Multiplication, Division, calculate_trusted
+from app.singleton_calc import SingletonCalculator
+
+# History sizes used by default; pass --sizes to go up to 10**7.
+DEFAULT_SIZES = [10 ** 3, 10 ** 4, 10 ** 5]
+
+
+def time_per_call(func: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """
+    Returns the best time per call, in nanoseconds, over `repeat` runs of `number` calls.
+    """
+    best = min(timeit.Timer(func).repeat(repeat=repeat, number=number))
+    return best / number * 1e9
+
+
+def bench_operations(number: int) -> Dict[str, float]:
+    """Benchmarks calculate() and the calculate_trusted() table dispatch for each operation."""
+    results = {}
+    for operation in (Addition(), Subtraction(), Multiplication(), Division()):
+        name = operation.__class__.__name__.lower()
+        results[f"calculate_{name}"] = time_per_call(
+            lambda op=operation: op.calculate(7.5, 2.5), number
+        )
+        results[f"calculate_trusted_{name}"] = time_per_call(
+            lambda op=operation: calculate_trusted(op, 7.5, 2.5), number
+        )
+    return results
+
+
+def bench_factory(number: int) -> Dict[str, float]:
+    """Benchmarks OperationFactory.create_operation."""
+    return {
+        "factory_create_operation": time_per_call(
+            lambda: OperationFactory.create_operation("multiply"), number
+        ),
+    }
+
+
+def bench_observers(number: int) -> Dict[str, float]:
+    """Benchmarks perform_operation with 0, 1 and 10 observers."""
+    results = {}
+    operation = Addition()
+    for count in (0, 1, 10):
+        calculator = CalculatorWithObserver()
+        for _ in range(count):
+            calculator.add_observer(HistoryObserver())
+        results[f"perform_operation_{count}_observers"] = time_per_call(
+            lambda calc=calculator: calc.perform_operation(operation, 1.0, 2.0), number
+        )
+    return results
+
+
+def bench_history(sizes: List[int]) -> Dict[str, float]:
+    """Benchmarks appending to and iterating over the singleton history."""
+    results = {}
+    calculator = SingletonCalculator()
+    original = calculator.get_history()
+    operation = Addition()
+    try:
+        for size in sizes:
+            history = ColumnarHistory()
+            calculator.use_history(history)
+            calculation = Calculation(operation, 1.0, 2.0, 3.0)
+            results[f"history_append_{size}"] = time_per_call(
+                lambda: history.append(calculation), size, repeat=1
+            )
+            results[f"history_iterate_{size}"] = time_per_call(
+                lambda: sum(1 for _ in calculator.get_history()), 1, repeat=3
+            ) / size
+    finally:
+        calculator.use_history(original)
+    with tempfile.TemporaryDirectory() as directory:
+        shared = SharedHistory(os.path.join(directory, "shared.db"))
+        calculation = Calculation(operation, 1.0, 2.0, 3.0)
+        try:
+            results["shared_history_append"] = time_per_call(
+                lambda: shared.append(calculation), max(sizes), repeat=1
+            )
+        finally:
+            shared.close()
+    return results
+
+
+def bench_reductions(sizes: List[int]) -> Dict[str, float]:
+    """Benchmarks folding a stream with perform_reduction against a perform_operation loop."""
+    results = {}
+    calculator = CalculatorWithObserver()
+    addition, multiplication = Addition(), Multiplication()
+
+    def fold(values):
+        total = values[0]
+        for value in values[1:]:
+            total = calculator.perform_operation(addition, total, value)
+        return total
+
+    for size in sizes:
+        values = [1.0 + i / size for i in range(size)]
+        results[f"reduce_sum_{size}"] = time_per_call(
+            lambda v=values: calculator.perform_reduction(addition, v), 1, repeat=3
+        ) / size
+        results[f"reduce_log_product_{size}"] = time_per_call(
+            lambda v=values: calculator.perform_reduction(multiplication, v, log_space=True),
+            1, repeat=3,
+        ) / size
+        results[f"fold_perform_operation_{size}"] = time_per_call(
+            lambda v=values: fold(v), 1, repeat=3
+        ) / size
+    return results
+
+
+def bench_queries(sizes: List[int]) -> Dict[str, float]:
+    """Benchmarks IndexedHistory appends and first-page queries against a plain history scan."""
+    results = {}
+    rng = random.Random(0)
+    queries = {"operation": "divide", "range": "result>9990", "combined": "divide result>100 result<101"}
+    for size in sizes:
+        codes = array("B", [rng.randrange(1, 5) for _ in range(size)])
+        operand1 = array("d", [rng.uniform(0, 100) for _ in range(size)])
+        operand2 = array("d", [rng.uniform(0, 100) for _ in range(size)])
+        products = array("d", [a * b for a, b in zip(operand1, operand2)])
+        indexed, plain = IndexedHistory(), ColumnarHistory()
+        for history in (indexed, plain):
+            history.extend_columns(codes, operand1, operand2, products)
+        calculation = Calculation(Division(), 1.0, 2.0, 0.5)
+        results[f"indexed_append_{size}"] = time_per_call(
+            lambda h=indexed: h.append(calculation), 1000, repeat=3
+        )
+        indexed.query(parse_query(queries["range"]))  # Sort the import into the index once.
+        for name, text in queries.items():
+            query = parse_query(text)
+            results[f"find_{name}_{size}"] = time_per_call(
+                lambda q=query: indexed.query(q).page(1), 10, repeat=3
+            )
+        query = parse_query(queries["combined"])
+        results[f"find_scan_{size}"] = time_per_call(
+            lambda q=query: query_history(plain, q).page(1), 1, repeat=3
+        )
+    return results
+
+
+def bench_str(number: int) -> Dict[str, float]:
+    """Benchmarks Calculation.__str__."""
+    calculation = Calculation(Division(), 7.5, 2.5, 3.0)
+    return {"calculation_str": time_per_call(lambda: str(calculation), number)}
+
+
+def memory_per_entry(entries: int = 100_000) -> Dict[str, float]:
+    """Measures bytes per history entry for the columnar store and a plain list."""
+    results = {}
+    operation = Addition()
+    for name, factory in (("columnar", ColumnarHistory), ("list", list)):
+        tracemalloc.start()
+        history = factory()
+        for i in range(entries):
+            history.append(Calculation(operation, float(i), 1.0, float(i) + 1.0))
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"bytes_per_entry_{name}"] = used / entries
+        del history
+    return results
+
+
+def run(sizes: List[int], number: int) -> Dict[str, Dict[str, float]]:
+    """
+    Runs every benchmark.
+    Returns:
+    - {"timings": {name: ns_per_op}, "memory": {name: bytes_per_entry}}
+    """
+    timings = {}
+    timings.update(bench_operations(number))
+    timings.update(bench_factory(number))
+    timings.update(bench_observers(number))
+    timings.update(bench_history(sizes))
+    timings.update(bench_reductions(sizes))
+    timings.update(bench_queries(sizes))
+    timings.update(bench_str(number))
+    return {"timings": timings, "memory": memory_per_entry(min(max(sizes), 100_000))}
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Returns the names of benchmarks slower than baseline * (1 + threshold).
+    """
+    regressions = []
+    for name, value in current["timings"].items():
+        old = baseline.get("timings", {}).get(name)
+        if old and value > old * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def report(results: Dict, baseline: Dict = None) -> str:
+    """
+    Formats the results (and the change against a baseline) as a table.
+    """
+    lines = []
+    for name, value in results["timings"].items():
+        line = f"{name:<36} {value:>12.1f} ns/op"
+        old = (baseline or {}).get("timings", {}).get(name)
+        if old:
+            line += f"  ({(value / old - 1) * 100:+.1f}%)"
+        lines.append(line)
+    for name, value in results["memory"].items():
+        lines.append(f"{name:<36} {value:>12.1f} bytes")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    """
+    Command-line entry point. Returns the process exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="History sizes for the append/iterate benchmarks.")
+    parser.add_argument("--number", type=int, default=100_000,
+                        help="Calls per timing run for the per-call benchmarks.")
+    parser.add_argument("--save", metavar="FILE", help="Write the results as JSON.")
+    parser.add_argument("--compare", metavar="FILE", help="Baseline JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown before a benchmark counts as a regression.")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.number)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+    print(report(results, baseline))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Startup Benchmark
+
+Measures how long the calculator takes to start, using `python -X importtime`:
+- oneshot: `main.py add 2 3`, the slim one-shot path
+- eager: importing every module main.py used to load up front
+For each it reports the best wall-clock time, the total import time, the
+number of modules imported, and the slowest imports.
+
+Usage:
+    python -m benchmarks.startup --runs 20 --top 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Directory holding main.py; commands run there so `app` is importable.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scenario name -> arguments after `python -X importtime`.
+SCENARIOS = {
+    "oneshot": ["main.py", "add", "2", "3"],
+    "eager": ["-c", "import app.metrics, app.numeric, app.profiling, app.server, "
+                    "app.singleton_calc, app.expression, app.aggregates, argparse, asyncio"],
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    Parses `-X importtime` output into (module, self_us, cumulative_us) tuples.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(arguments: List[str], runs: int) -> Dict:
+    """
+    Runs one scenario `runs` times and keeps the fastest run.
+    Returns:
+    - {"wall_ms", "import_ms", "modules", "slowest": [(module, self_us), ...]}
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", *arguments],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        wall_ms = (time.perf_counter() - start) * 1e3
+        if best is None or wall_ms < best[0]:
+            best = (wall_ms, parse_importtime(completed.stderr))
+    wall_ms, rows = best
+    return {
+        "wall_ms": wall_ms,
+        "import_ms": sum(self_us for _, self_us, _ in rows) / 1e3,
+        "modules": len(rows),
+        "slowest": sorted(((module, self_us) for module, self_us, _ in rows),
+                          key=lambda row: row[1], reverse=True),
+    }
+
+
+def report(results: Dict[str, Dict], top: int) -> str:
+    """
+    Formats the results as text, with the `top` slowest imports of each scenario.
+    """
+    lines = []
+    for name, result in results.items():
+        lines.append(f"{name:<10} wall {result['wall_ms']:8.1f} ms   imports "
+                     f"{result['import_ms']:7.1f} ms   modules {result['modules']:4d}")
+        for module, self_us in result["slowest"][:top]:
+            lines.append(f"    {module:<36} {self_us / 1e3:7.2f} ms")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    """
+    Command-line entry point. Returns the process exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10, help="Runs per scenario (best is kept).")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports shown per scenario.")
+    args = parser.parse_args(argv)
+    results = {name: measure(arguments, args.runs) for name, arguments in SCENARIOS.items()}
+    print(report(results, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,33 +7,175 @@ for users to perform calculations in real-time.
 
 Features:
 - Supports basic arithmetic operations: addition, subtraction, multiplication, and division.
-- Allows users to view and clear the calculation history.
+- Sums or multiplies any number of values in one step (`sum 1 2 3`, `product 2 3 4`).
+- Allows users to view, summarize, clear, export and import the calculation history.
+- Finds past calculations through history indexes (`find divide result>1000 since=10m`).
 - Utilizes logging to track operations and any errors that occur.
 - Implements observer pattern to monitor changes in calculation history.
+- Optionally persists the history to a memory-mapped file (--history-file).
+- Optionally shares the history with other calculator processes via SQLite (--shared-history).
+- Logging level, background (queued) logging and per-calculation logs are configurable.
+- Non-interactive batch mode reads commands from a file or stdin (--batch).
+- Network service mode answers pipelined requests over TCP (--serve).
+- Exact Decimal, Fraction or big-integer arithmetic instead of floats (--numeric).
+- One-shot mode for scripts: `python main.py add 2 3` prints the result and exits.
+
+Imports are deferred to the mode that needs them, so a one-shot run only
+loads app.operations (and logging) and never opens the log file unless a
+record is written.
 """
+# pylint: disable=import-outside-toplevel
+
+import sys
+
+# One-shot names and aliases -> app.operations class names. Kept here so the
+# one-shot path does not import OperationFactory; other names fall back to it.
+ONE_SHOT_OPERATIONS = {
+    "add": "Addition", "+": "Addition", "plus": "Addition",
+    "subtract": "Subtraction", "-": "Subtraction", "minus": "Subtraction", "sub": "Subtraction",
+    "multiply": "Multiplication", "*": "Multiplication", "times": "Multiplication",
+    "mul": "Multiplication",
+    "divide": "Division", "/": "Division", "div": "Division",
+}
+
+# REPL reduction commands -> the operation they fold with.
+REDUCTIONS = {"sum": "add", "product": "multiply"}
+
+# Matches shown per page by the REPL 'find' command.
+FIND_PAGE_SIZE = 20
+
+def one_shot(operation_name, num1_str, num2_str, log_options=None):
+    """
+    One-shot mode: performs a single calculation, prints the result and returns.
+    No history, observers or argument parser are set up.
+    Parameters:
+    - operation_name (str): Operation name or alias, e.g. 'add' or '+'.
+    - num1_str (str): The first operand.
+    - num2_str (str): The second operand.
+    - log_options (dict): Keyword arguments for setup_logging.
+    Returns:
+    - The exit status: 0 on success, 1 if the calculation failed, 2 for bad input.
+    """
+    from app.log_config import setup_logging
+    from app import operations
+
+    setup_logging(**(log_options or {}))  # The file is opened by the first record only.
+    class_name = ONE_SHOT_OPERATIONS.get(operation_name.lower())
+    if class_name is not None:
+        operation = getattr(operations, class_name)()
+    else:
+        # Plugins and other registered names need the full factory.
+        from app.operation_factory import OperationFactory
+        operation = OperationFactory.create_operation(operation_name)
+        if operation is None:
+            print(f"Error: unknown operation '{operation_name}'", file=sys.stderr)
+            return 2
+    try:
+        num1, num2 = float(num1_str), float(num2_str)
+    except ValueError:
+        print(f"Error: invalid number in '{num1_str} {num2_str}'", file=sys.stderr)
+        return 2
+    try:
+        result = operations.calculate_trusted(operation, num1, num2)  # Operands are floats.
+    except (ArithmeticError, ValueError) as e:  # E.g. a plugin's ZeroDivisionError.
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(result)
+    return 0
+
+def find(history, arguments):
+    """
+    Prints one page of the calculations matching a REPL query.
+    Parameters:
+    - history: The history store to search.
+    - arguments (str): The query (see app.history_index.parse_query), optionally
+      ending with after=N to resume past entry N (printed with each page).
+    """
+    import logging
+    from app.history_index import parse_query, query_history
 
-import logging
-from app.log_config import setup_logging
-from app.operation_factory import OperationFactory
-from app.observer import HistoryObserver, CalculatorWithObserver
-from app.singleton_calc import SingletonCalculator
+    words = arguments.split()
+    resume = words.pop()[6:] if words and words[-1].lower().startswith("after=") else None
+    try:
+        after = -1 if resume is None else int(resume)
+        if resume is not None and after < 0:
+            raise ValueError(f"invalid entry number {after}")
+        results = query_history(history, parse_query(" ".join(words)))
+        # Resumes past the previous page's last match instead of counting matches again.
+        matches, cursor = results.page_after(after, FIND_PAGE_SIZE)
+    except ValueError as e:
+        logging.error("Invalid query '%s': %s", arguments, e)  # Log the error.
+        print(f"Could not run the query: {e}")
+        return
+    if not matches:
+        print("No matching calculations.")
+        return
+    for calculation in matches:
+        print(calculation)
+    if cursor is not None:
+        print(f"More results: {' '.join(['find', *words, f'after={cursor}'])}")
 
-def calculator():
+def calculator(history_file=None, log_options=None, numeric="float", profiled=False,
+               shared_history=None):
     """
     Interactive REPL (Read-Eval-Print Loop) for performing calculator operations.
     Provides a command-line interface for users to interact with the calculator.
+    Parameters:
+    - history_file (str): Optional file that persists the history between runs.
+    - log_options (dict): Keyword arguments for setup_logging.
+    - numeric (str): Numeric backend name ('float', 'decimal', 'fraction', 'int').
+    - profiled (bool): Time the parse phase (set by --profile).
+    - shared_history (str): Optional SQLite file whose history other processes also append to.
+    Raises a ValueError if a history file is combined with a non-float backend.
     """
+    import logging
+    from contextlib import nullcontext
+    from app.aggregates import format_summary
+    from app.expression import evaluate
+    from app.log_config import setup_logging
+    from app.numeric import get_backend
+    from app.operation_factory import OperationFactory
+    from app.observer import HistoryObserver, CalculatorWithObserver
+    from app.singleton_calc import SingletonCalculator
+    if profiled:
+        from app.profiling import phase
+    else:
+        phase = lambda name: nullcontext()  # pylint: disable=unnecessary-lambda-assignment
+
     # Set up logging configuration
-    setup_logging()
+    setup_logging(**(log_options or {}))
+
+    # Pick the number type; the float backend keeps the built-in operations.
+    backend = get_backend(numeric)
+    if (history_file or shared_history) and backend.name != "float":
+        raise ValueError("File-backed histories store floats only; use the float backend.")
 
     # Create an instance of the singleton calculator.
     calc = SingletonCalculator()
 
+    # Keep the in-memory history indexed, so 'find' does not scan it.
+    if not history_file and not shared_history:
+        from app.history_index import IndexedHistory
+        calc.use_history(IndexedHistory())
+
+    # Reload (and keep writing to) a persistent history file if one was given.
+    if history_file:
+        from app.history import MappedHistory
+        calc.use_history(MappedHistory(history_file))
+
+    # Or share it with every other process that opens the same file.
+    if shared_history:
+        from app.history import SharedHistory
+        calc.use_history(SharedHistory(shared_history))
+
     # Create an observer to monitor calculation history.
     observer = HistoryObserver()
 
     # Create an instance of the calculator with observer support.
-    calc_with_observer = CalculatorWithObserver()
+    # It records into the singleton's history so 'list' shows REPL calculations.
+    calc_with_observer = CalculatorWithObserver(
+        history=calc.get_history(), backend=backend if backend.name != "float" else None
+    )
     calc_with_observer.add_observer(observer)
 
     # Display a welcome message and instructions.
@@ -51,7 +193,16 @@ def calculator():
             print("  subtract <num1> <num2>  : Subtract the second number from the first.")
             print("  multiply <num1> <num2>  : Multiply two numbers.")
             print("  divide <num1> <num2>    : Divide the first number by the second.")
+            print("  (aliases: + - * / plus minus sub times mul div)")
+            print("  sum <num> <num> ...     : Add any number of values (exactly rounded).")
+            print("  product <num> <num> ... : Multiply any number of values.")
+            print("  eval <expression>       : Evaluate a formula, e.g. eval (1 + 2) * 3 / 4.")
             print("  list                    : Show the calculation history.")
+            print("  summary                 : Show count, sum, mean, min and max of the results.")
+            print("  find <query> [after=N]  : Find calculations, e.g. find divide result>1000 since=10m.")
+            print("  export <file> [format]  : Save the history as csv, jsonl or binary (.bin).")
+            print("  import <file> [format]  : Load an exported history file.")
+            print("  stats [on|off]          : Show hot-path metrics, or turn collection on/off.")
             print("  clear                   : Clear the calculation history.")
             print("  exit                    : Exit the calculator.\n")
             continue
@@ -71,42 +222,235 @@ def calculator():
                     print(calc_item)  # Calls __str__ method of Calculation.
             continue
 
+        # Handle the 'summary' command; the statistics are kept up to date as we go.
+        if user_input.lower() == "summary":
+            print(format_summary(calc_with_observer.summary()))
+            continue
+
+        # Handle the 'export' and 'import' commands (format defaults to the file extension).
+        command, _, arguments = user_input.partition(" ")
+        if command.lower() in ("export", "import") and arguments.strip():
+            path, _, fmt = arguments.strip().partition(" ")
+            try:
+                if command.lower() == "export":
+                    count = calc_with_observer.export_history(path, fmt.strip() or None)
+                    print(f"Exported {count} calculations to {path}.")
+                else:
+                    count = calc_with_observer.import_history(path, fmt.strip() or None)
+                    print(f"Imported {count} calculations from {path}.")
+            except (OSError, TypeError, ValueError) as e:
+                logging.error("History %s failed: %s", command.lower(), e)  # Log the error.
+                print(f"Could not {command.lower()} history: {e}")
+            continue
+
+        # Handle the 'sum' and 'product' commands: one fold and one history entry for all values.
+        if command.lower() in REDUCTIONS and arguments.strip():
+            try:
+                operation = OperationFactory.create_operation(REDUCTIONS[command.lower()])
+                values = map(backend.parse, arguments.split())  # Parsed lazily, during the fold.
+                print(f"Result: {calc_with_observer.perform_reduction(operation, values)}")
+            except (ArithmeticError, ValueError) as e:  # Plugins may raise ArithmeticError.
+                logging.error("Invalid %s: %s", command.lower(), e)  # Log the error.
+                print(f"Could not compute the {command.lower()}: {e}")
+            continue
+
+        # Handle the 'find' command: an indexed query, read one page at a time.
+        if command.lower() == "find":
+            find(calc.get_history(), arguments)
+            continue
+
+        # Handle the 'stats' command to show or toggle hot-path metrics.
+        if user_input.lower().startswith("stats"):
+            from app import metrics
+            argument = user_input[5:].strip().lower()
+            if argument == "on":
+                metrics.enable()
+                print("Metrics collection enabled.")
+            elif argument == "off":
+                metrics.disable()
+                print("Metrics collection disabled.")
+            else:
+                if not metrics.is_enabled():
+                    print("Metrics collection is off (use 'stats on' or --metrics).")
+                print(metrics.format_snapshot(metrics.snapshot(calc.get_history())))
+            continue
+
         # Handle the 'clear' command to clear the history.
         if user_input.lower() == "clear":
-            # Clear the history using the singleton instance's method
-            calc.get_history().clear()  # Clear the history list.
+            # Clear the shared history and the running statistics that describe it.
+            calc_with_observer.clear_history()
             logging.info("History cleared.")  # Log the action.
             print("History cleared.")
             continue
 
+        # Handle the 'eval' command for infix expressions.
+        if user_input.lower().startswith("eval "):
+            try:
+                print(f"Result: {evaluate(user_input[5:])}")
+            except (ArithmeticError, ValueError) as e:
+                logging.error("Invalid expression: %s", e)  # Log the error.
+                print(f"Invalid expression: {e}")
+            continue
+
         # Attempt to parse and execute the user's command.
         try:
-            # Split the user input into components.
-            operation_str, num1_str, num2_str = user_input.split()  # May raise ValueError.
+            with phase("parse"):  # Timed only in --profile mode.
+                # Split the user input into components.
+                operation_str, num1_str, num2_str = user_input.split()  # May raise ValueError.
 
-            # Convert the operand strings to float.
-            num1, num2 = float(num1_str), float(num2_str)  # May raise ValueError.
+                # Convert the operand strings to the backend's number type.
+                num1, num2 = backend.parse(num1_str), backend.parse(num2_str)  # May raise ValueError.
 
             # Use the factory to create the appropriate operation object.
             operation = OperationFactory.create_operation(operation_str)
 
             if operation:
                 # Perform the operation using the calculator.
-                result = calc_with_observer.perform_operation(operation, num1, num2)
+                # The operands came from backend.parse, so validation can be skipped.
+                result = calc_with_observer.perform_operation(operation, num1, num2, trusted=True)
                 # Display the result to the user.
                 print(f"Result: {result}")
             else:
                 # Handle unknown operation names.
                 print(f"Unknown operation '{operation_str}'. Type 'help' for available commands.")
 
-        except ValueError as e:
-            # Handle errors such as incorrect input format or invalid numbers.
+        except (ArithmeticError, ValueError) as e:
+            # Handle errors such as incorrect input format, invalid numbers, or a
+            # plugin operation raising ZeroDivisionError/OverflowError.
             logging.error("Invalid input or error: %s", e)  # Log the error.
             print(
                 "Invalid input. Please enter a valid operation and two numbers. "
                 "Type 'help' for instructions."
             )
 
+def batch(path, log_options=None):
+    """
+    Non-interactive mode: runs every command in a file ('-' for stdin) and
+    prints one result or error line per command.
+    Parameters:
+    - path (str): The command file, or '-' to read from standard input.
+    - log_options (dict): Keyword arguments for setup_logging.
+    Returns:
+    - The number of lines that failed.
+    """
+    from app.batch import run_batch
+    from app.log_config import setup_logging
+
+    setup_logging(**(log_options or {}))
+    if path == "-":
+        _, errors = run_batch(sys.stdin, sys.stdout)
+    else:
+        with open(path, encoding="utf-8") as commands:
+            _, errors = run_batch(commands, sys.stdout)
+    sys.stdout.flush()
+    return errors
+
+def parse_args(argv=None):
+    """
+    Parses the command-line options of the calculator.
+    """
+    import argparse
+    from app.numeric import BACKENDS
+
+    parser = argparse.ArgumentParser(
+        description="OOP Calculator",
+        epilog="One-shot mode: main.py <operation> <num1> <num2>, e.g. main.py add 2 3.",
+    )
+    history = parser.add_mutually_exclusive_group()
+    history.add_argument(
+        "--history-file", help="Memory-mapped file that keeps the history between runs."
+    )
+    history.add_argument(
+        "--shared-history", metavar="FILE",
+        help="SQLite file whose history is shared with other calculator processes.",
+    )
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        help="Run the commands in FILE ('-' for stdin) without prompting.",
+    )
+    parser.add_argument(
+        "--serve", metavar="PORT", type=int,
+        help="Serve the calculator over TCP on PORT instead of starting the REPL.",
+    )
+    parser.add_argument(
+        "--metrics", action="store_true",
+        help="Collect hot-path metrics from the start (see the 'stats' command).",
+    )
+    parser.add_argument(
+        "--profile", metavar="FILE",
+        help="Run under cProfile with per-phase timings; write the profile to FILE.",
+    )
+    parser.add_argument(
+        "--numeric", default="float", choices=sorted(BACKENDS),
+        help="Number type for REPL calculations (exact decimal, fraction or int).",
+    )
+    parser.add_argument(
+        "--log-level", default="DEBUG", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Minimum level written to calculator.log.",
+    )
+    parser.add_argument(
+        "--queued-logging", action="store_true",
+        help="Write logs from a background thread with buffered file writes.",
+    )
+    parser.add_argument(
+        "--hot-path-logs", default="all", choices=["all", "sample", "off"],
+        help="Per-calculation logs: log all, sample them, or turn them off.",
+    )
+    args = parser.parse_args(argv)
+    for option, value in (("--history-file", args.history_file),
+                          ("--shared-history", args.shared_history)):
+        if value and args.numeric != "float":
+            parser.error(f"{option} stores floats only; it cannot be combined with --numeric.")
+    return args
+
+def log_options_from_args(args):
+    """
+    Converts parsed command-line options into setup_logging keyword arguments.
+    """
+    import logging
+
+    return {
+        "level": getattr(logging, args.log_level),
+        "queued": args.queued_logging,
+        "hot_path": args.hot_path_logs,
+    }
+
+def main(argv=None):
+    """
+    Command-line entry point. Returns the process exit status.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 3 and not argv[0].startswith("--"):
+        return one_shot(*argv)  # Slim path: no argparse, REPL or service imports.
+    args = parse_args(argv)
+    if args.metrics:
+        from app import metrics
+        metrics.enable()
+    if args.batch:
+        if args.profile:
+            from app.profiling import profile_run
+            failed = profile_run(batch, args.batch, log_options_from_args(args), output=args.profile)
+        else:
+            failed = batch(args.batch, log_options_from_args(args))
+        return 1 if failed else 0
+    if args.serve is not None:
+        import asyncio
+        from app.log_config import setup_logging
+        from app.server import serve
+        setup_logging(**log_options_from_args(args))
+        asyncio.run(serve(port=args.serve))
+    elif args.profile:
+        # Start the REPL under the profiler.
+        from app.profiling import profile_run
+        profile_run(calculator, history_file=args.history_file,
+                    log_options=log_options_from_args(args), numeric=args.numeric,
+                    profiled=True, shared_history=args.shared_history, output=args.profile)
+    else:
+        # Start the REPL.
+        calculator(history_file=args.history_file, log_options=log_options_from_args(args),
+                   numeric=args.numeric, shared_history=args.shared_history)
+    return 0
+
 if __name__ == "__main__":
     # This block ensures that the calculator runs only when the script is executed directly.
-    calculator()  # Call the main calculator function to start the REPL.
+    sys.exit(main())
@@ -0,0 +1,16 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import pytest
+
+from app import operation_factory
+
+
+@pytest.fixture(name="operation_registry")
+def fixture_operation_registry():
+    """Lets a test register plugin operations; the factory registry is restored afterwards."""
+    saved = dict(operation_factory._registry)  # pylint: disable=protected-access
+    yield operation_factory.OperationFactory
+    operation_factory._registry.clear()  # pylint: disable=protected-access
+    operation_factory._registry.update(saved)  # pylint: disable=protected-access
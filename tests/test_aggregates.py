@@ -0,0 +1,306 @@
+"""
+Test Module for the Incremental Aggregates
+
+This module tests RunningStats and HistoryAggregates against statistics
+computed from scratch, windowed removal for ring-buffer evictions, the
+aggregates each history store keeps for every writer (calculators, direct
+appends, imports, parallel batches, clears), and the summary() /
+clear_history() API on both calculators.
+"""
+
+from array import array
+from fractions import Fraction
+import math
+import random
+import statistics
+import pytest
+
+from app.aggregates import HistoryAggregates, RunningStats, format_summary, track_history
+from app.calculation import Calculation
+from app.history import (
+    BoundedHistory, ColumnarHistory, MappedHistory, SharedHistory, ShardedHistory, operation_code,
+)
+from app.history_index import IndexedHistory
+from app.numeric import get_backend
+from app.observer import CalculatorWithObserver
+from app.operations import Addition, Division, Multiplication
+from app.parallel import parallel_calculate
+from app.singleton_calc import SingletonCalculator
+
+RNG = random.Random(2024)  # Fixed seed: the same values on every run.
+
+
+def check(stats, values):
+    """Compares running statistics with ones computed from scratch."""
+    assert stats.count == len(values)
+    assert stats.total == pytest.approx(sum(values))
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.variance == pytest.approx(statistics.pvariance(values))
+    assert stats.minimum == min(values)
+    assert stats.maximum == max(values)
+
+@pytest.mark.parametrize("windowed", [False, True])
+def test_running_stats_match_statistics(windowed):
+    """Test Welford updates agree with the statistics module."""
+    values = [RNG.uniform(-1e3, 1e3) for _ in range(500)]
+    stats = RunningStats(windowed)
+    for value in values:
+        stats.add(value)
+    check(stats, values)
+
+def test_sliding_window():
+    """Test FIFO removal keeps every statistic exact over a moving window."""
+    values = [RNG.choice([1.0, 5.0, 5.0, -2.0, 9.0]) * RNG.random() for _ in range(300)]
+    stats = RunningStats(windowed=True)
+    for index, value in enumerate(values):
+        stats.add(value)
+        if index >= 20:
+            stats.remove_oldest(values[index - 20])
+        check(stats, values[max(index - 19, 0):index + 1])
+    for value in values[-20:]:
+        stats.remove_oldest(value)
+    assert stats.as_dict() == {
+        "count": 0, "sum": 0.0, "mean": None, "variance": 0.0, "stdev": 0.0,
+        "min": None, "max": None,
+    }
+
+def test_sliding_window_large_values():
+    """Test removals keep the mean accurate for large values (no n * mean cancellation)."""
+    rng = random.Random(0)
+    values = [1e12 + rng.uniform(-1, 1) for _ in range(3000)]
+    stats = RunningStats(windowed=True)
+    worst = 0.0
+    for index, value in enumerate(values):
+        stats.add(value)
+        if index >= 20:
+            stats.remove_oldest(values[index - 20])
+        worst = max(worst, abs(stats.mean - statistics.fmean(values[max(index - 19, 0):index + 1])))
+    assert worst < 5e-3  # Downdating through n * mean drifts to about 1e-2 here.
+
+def test_infinite_values_leave_the_window():
+    """Test inf and NaN values taint sum, mean and variance only while they are counted."""
+    stats = RunningStats(windowed=True)
+    for value in (1.0, math.inf, 3.0, 5.0):
+        stats.add(value)
+    assert (stats.total, stats.mean, stats.maximum) == (math.inf, math.inf, math.inf)
+    assert math.isnan(stats.variance)
+    stats.add(-math.inf)
+    stats.add(math.nan)
+    assert math.isnan(stats.mean) and stats.minimum == -math.inf
+    for value in (1.0, math.inf):
+        stats.remove_oldest(value)
+    assert math.isnan(stats.total) and stats.maximum == 5.0
+    stats.remove_oldest(3.0)
+    stats.remove_oldest(5.0)
+    stats.remove_oldest(-math.inf)
+    assert math.isnan(stats.mean) and math.isnan(stats.minimum) and math.isnan(stats.maximum)
+    stats.add(4.0)
+    stats.remove_oldest(math.nan)
+    check(stats, [4.0])
+    stats.remove_oldest(4.0)
+    plain = RunningStats()
+    for value in (2.0, -math.inf, 6.0):
+        plain.add(value)
+    assert (plain.mean, plain.minimum, plain.maximum) == (-math.inf, -math.inf, 6.0)
+    assert format_summary({"overall": plain.as_dict(), "operations": {}}).count("inf") == 3
+
+def test_remove_needs_windowed_stats():
+    """Test unwindowed stats refuse removals they cannot undo exactly."""
+    stats = RunningStats()
+    stats.add(1.0)
+    with pytest.raises(ValueError, match="windowed=True"):
+        stats.remove_oldest(1.0)
+
+def test_history_aggregates_by_operation():
+    """Test per-operation breakdowns and exact results converted to float."""
+    aggregates = HistoryAggregates()
+    aggregates.add(Calculation(Addition(), 1, 2, 3))
+    aggregates.add(Calculation(Addition(), 2, 2, 4))
+    aggregates.add(Calculation(Division(), 1, 3, Fraction(1, 3)))
+    summary = aggregates.summary()
+    assert summary["overall"]["count"] == 3
+    assert summary["operations"]["Addition"]["mean"] == 3.5
+    assert summary["operations"]["Division"]["max"] == pytest.approx(1 / 3)
+    text = format_summary(summary)
+    assert "all              count=3" in text and "addition" in text
+    aggregates.clear()
+    assert format_summary(aggregates.summary()) == "No calculations in history."
+
+def test_bounded_history_aggregates_follow_evictions():
+    """Test a BoundedHistory's own aggregates describe only the entries it keeps."""
+    history = BoundedHistory(max_entries=3)
+    evicted = []
+    history.eviction_hooks.append(evicted.append)
+    history.append(Calculation(Multiplication(), 10, 10, 100))
+    assert track_history(history) is None  # The store keeps its own.
+    aggregates = history.aggregates
+    for value in (1, 2, 3):
+        history.append(Calculation(Addition(), value, 0, value))
+    summary = aggregates.summary()
+    assert summary["overall"]["max"] == 3 and summary["overall"]["count"] == 3
+    assert "Multiplication" not in summary["operations"]
+    assert [calculation.result for calculation in evicted] == [100]
+    history.clear()
+    assert history.aggregates is aggregates and aggregates.overall.count == 0
+
+def test_calculators_share_a_bounded_history():
+    """Test two calculators on one ring buffer agree and never un-count each other's entries."""
+    singleton = SingletonCalculator()
+    original = singleton.get_history()
+    try:
+        singleton.use_history(BoundedHistory(max_entries=2))
+        observer = CalculatorWithObserver(history=singleton.get_history())
+        singleton.perform_operation(Addition(), 1, 1)
+        observer.perform_operation(Multiplication(), 2.0, 5.0)
+        singleton.perform_operation(Addition(), 3, 4)  # Evicts the singleton's first entry.
+        observer.perform_operation(Addition(), 1.0, 0.0)  # Evicts the observer's entry.
+        for calculator in (singleton, observer):
+            summary = calculator.summary()
+            assert summary["overall"]["count"] == 2 and summary["overall"]["sum"] == 8
+            assert list(summary["operations"]) == ["Addition"]
+    finally:
+        singleton.use_history(original)
+
+@pytest.mark.parametrize("make_history", [ColumnarHistory, IndexedHistory])
+def test_results_beyond_double_range(make_history):
+    """Test huge exact results count as inf or -inf and are stored whole, never half-recorded."""
+    history = make_history()
+    aggregates = history.aggregates
+    multiply = get_backend("int").operation("multiply")
+    history.append(Calculation(multiply, 10**200, 10**200, 10**400))
+    history.append(Calculation(multiply, -10**200, 10**200, -10**400))
+    history.append(Calculation(Addition(), Fraction(10**400), 1, Fraction(10**400 + 1)))
+    assert len(history) == 3 and history[0].get_result() == 10**400
+    overall = aggregates.overall
+    assert (overall.count, overall.minimum, overall.maximum) == (3, -math.inf, math.inf)
+    assert HistoryAggregates.from_history(history).overall.count == 3
+
+@pytest.mark.parametrize("make_history", [ColumnarHistory, IndexedHistory, ShardedHistory])
+def test_store_aggregates_see_every_writer(make_history):
+    """Test direct appends, column imports, parallel records and clears all update the summary."""
+    history = make_history()
+    calculator = CalculatorWithObserver(history=history)
+    history.append(Calculation(Addition(), 1, 1, 2))
+    assert calculator.summary()["overall"]["count"] == 1
+    history.append(Calculation(Division(), 1, 4, 0.25))
+    snapshot = getattr(history, "snapshot", lambda: history)()
+    snapshot.extend_columns(array("B", [operation_code(Addition())]), [2], [2], [4])
+    assert calculator.summary()["overall"]["sum"] == 6.25
+    history.clear()
+    assert calculator.summary()["overall"]["count"] == 0
+    history.append(Calculation(Multiplication(), 2, 3, 6))
+    assert calculator.summary()["operations"]["Multiplication"]["sum"] == 6
+
+def test_statistics_stay_lazy_until_summary(tmp_path):
+    """Test attaching calculators to a store does not build its statistics."""
+    history = MappedHistory(str(tmp_path / "history.bin"))
+    history.append(Calculation(Addition(), 1, 2, 3))
+    singleton = SingletonCalculator()
+    original = singleton.get_history()
+    try:
+        singleton.use_history(history)
+        calculator = CalculatorWithObserver(history=history)
+        assert history._aggregates is None  # pylint: disable=protected-access
+        assert calculator.summary()["overall"]["sum"] == 3
+        assert history._aggregates is not None  # pylint: disable=protected-access
+    finally:
+        singleton.use_history(original)
+        history.close()
+
+def test_parallel_records_are_counted():
+    """Test rows recorded by parallel_calculate show up in the singleton's summary."""
+    singleton = SingletonCalculator()
+    original = singleton.get_history()
+    try:
+        singleton.use_history(ColumnarHistory())
+        singleton.perform_operation(Addition(), 1, 1)
+        parallel_calculate("multiply", [1, 2, 3], [2, 2, 2], workers=1)
+        assert singleton.summary()["overall"]["sum"] == 14
+        singleton.get_history().clear()
+        assert singleton.summary()["overall"]["count"] == 0
+    finally:
+        singleton.use_history(original)
+
+def test_mapped_history_aggregates(tmp_path):
+    """Test a memory-mapped history counts its appends and resets on clear."""
+    history = MappedHistory(str(tmp_path / "history.bin"))
+    history.append(Calculation(Addition(), 1, 2, 3))
+    aggregates = history.aggregates
+    history.append(Calculation(Addition(), 2, 2, 4))
+    assert aggregates.overall.total == 7
+    history.clear()
+    assert aggregates.overall.count == 0
+    history.close()
+
+def test_shared_history_aggregates(tmp_path):
+    """Test shared history statistics include other processes' batches and their clears."""
+    path = str(tmp_path / "shared.db")
+    history, other = SharedHistory(path), SharedHistory(path)
+    try:
+        history.append(Calculation(Addition(), 1, 2, 3))
+        assert history.aggregates.overall.count == 1
+        other.append(Calculation(Multiplication(), 2, 5, 10))
+        other.flush()
+        assert history.aggregates.overall.total == 13
+        other.clear()
+        other.append(Calculation(Addition(), 1, 1, 2))
+        other.flush()
+        assert history.aggregates.summary()["overall"]["sum"] == 2
+    finally:
+        history.close()
+        other.close()
+
+def test_list_histories_are_counted_by_the_calculator(tmp_path):
+    """Test calculators keep the statistics of plain lists themselves."""
+    path = str(tmp_path / "history.csv")
+    source = ColumnarHistory()
+    source.append(Calculation(Addition(), 1, 2, 3))
+    CalculatorWithObserver(history=source).export_history(path)
+    singleton = SingletonCalculator()
+    original = singleton.get_history()
+    try:
+        for calculator in (CalculatorWithObserver(history=[]), singleton):
+            if calculator is singleton:
+                singleton.use_history([])
+            calculator.perform_reduction(Addition(), [1, 2, 3])
+            assert calculator.import_history(path) == 1
+            assert calculator.summary()["overall"]["sum"] == 9
+            calculator.clear_history()
+            assert calculator.summary()["overall"]["count"] == 0
+    finally:
+        singleton.use_history(original)
+
+def test_calculator_summary_and_clear():
+    """Test CalculatorWithObserver keeps its statistics in step with its history."""
+    history = ColumnarHistory()
+    history.append(Calculation(Addition(), 1, 1, 2))
+    calculator = CalculatorWithObserver(history=history)
+    calculator.perform_operation(Multiplication(), 2.0, 5.0)
+    with pytest.raises(ValueError):
+        calculator.perform_operation(Division(), 1.0, 0.0)
+    assert calculator.summary()["overall"]["sum"] == 12
+    calculator.clear_history()
+    assert not history
+    assert calculator.summary()["overall"]["count"] == 0
+
+def test_bounded_calculator_window():
+    """Test a calculator on a ring buffer reports the window, not all time."""
+    calculator = CalculatorWithObserver(history=BoundedHistory(max_entries=2))
+    for value in (5.0, 1.0, 3.0):
+        calculator.perform_operation(Addition(), value, 0.0)
+    overall = calculator.summary()["overall"]
+    assert (overall["count"], overall["min"], overall["max"]) == (2, 1.0, 3.0)
+
+def test_singleton_summary():
+    """Test the singleton's statistics follow use_history and clear_history."""
+    calculator = SingletonCalculator()
+    original = calculator.get_history()
+    try:
+        calculator.use_history(ColumnarHistory())
+        calculator.perform_operation(Addition(), 1, 2)
+        calculator.perform_operation(Addition(), 3, 4)
+        assert calculator.summary()["operations"]["Addition"]["sum"] == 10
+        calculator.clear_history()
+        assert calculator.summary()["overall"]["count"] == 0
+    finally:
+        calculator.use_history(original)
@@ -0,0 +1,75 @@
+"""
+Test Module for Batch Mode
+
+This module tests the streaming batch pipeline used by `main.py --batch`:
+parsing, chunking, grouped evaluation and in-place error reporting.
+"""
+
+import io
+import pytest
+
+from app.batch import chunked, parse_lines, run_batch
+from app.operations import TemplateOperation
+
+
+def test_run_batch_outputs_in_order():
+    """Test results come out in input order even when grouped by operation."""
+    lines = ["add 1 2\n", "multiply 3 4\n", "add 5 5\n", "/ 9 3\n", "SUBTRACT 1 2\n"]
+    out = io.StringIO()
+    assert run_batch(lines, out, chunk_size=2) == (5, 0)
+    assert out.getvalue() == "3.0\n12.0\n10.0\n3.0\n-1.0\n"
+
+def test_run_batch_reports_errors_in_place():
+    """Test bad lines produce an error line at their position and processing continues."""
+    lines = [
+        "add 1 2",
+        "",
+        "# comment",
+        "add 1",
+        "power 2 3",
+        "add one 2",
+        "divide 1 0",
+        "divide 4 2",
+    ]
+    out = io.StringIO()
+    assert run_batch(lines, out) == (2, 4)
+    assert out.getvalue().splitlines() == [
+        "3.0",
+        "Error (line 4): expected an operation and two numbers",
+        "Error (line 5): unknown operation 'power'",
+        "Error (line 6): invalid number",
+        "Error (line 7): Division by zero is not allowed.",
+        "2.0",
+    ]
+
+def test_run_batch_reports_plugin_errors_per_line(operation_registry):
+    """Test an operation that raises anything else still fails only its own lines."""
+    class Modulo(TemplateOperation):
+        """Plugin operation raising ZeroDivisionError."""
+        def execute(self, a, b):
+            return a % b
+
+    operation_registry.register("modulo", Modulo)
+    lines = ["add 1 2", "modulo 1 0", "modulo 7 4", "add 3 4"]
+    out = io.StringIO()
+    assert run_batch(lines, out) == (3, 1)
+    output = out.getvalue().splitlines()
+    assert output[0::2] == ["3.0", "3.0"] and output[3] == "7.0"
+    assert output[1].startswith("Error (line 2): float modulo")  # Wording varies by Python version.
+
+def test_parse_lines_is_lazy():
+    """Test the parser does not read ahead of what is consumed."""
+    def lines():
+        yield "add 1 2"
+        raise AssertionError("read too far")
+
+    parsed = parse_lines(lines())
+    assert next(parsed)[0] == 1
+
+@pytest.mark.parametrize("size, expected", [
+    (2, [[0, 1], [2, 3], [4]]),
+    (5, [[0, 1, 2, 3, 4]]),
+])
+def test_chunked(size, expected):
+    """Test chunking splits an iterable into bounded lists."""
+    assert list(chunked(range(5), size)) == expected
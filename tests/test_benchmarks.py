@@ -0,0 +1,57 @@
+"""
+Test Module for the Benchmark Runner
+
+This module runs the hot-path benchmarks at a tiny size and checks the
+JSON output and the regression check used by the compare mode, and runs
+the startup benchmark once per scenario.
+"""
+
+import json
+
+from benchmarks.hot_paths import compare, main, report, run
+from benchmarks.startup import SCENARIOS, measure, parse_importtime
+from benchmarks.startup import main as startup_main, report as report_startup
+
+
+def test_run_reports_every_hot_path():
+    """Test a tiny run produces timings for each hot path and memory per entry."""
+    results = run(sizes=[10], number=10)
+    assert {"calculate_division", "factory_create_operation",
+            "perform_operation_10_observers", "history_append_10",
+            "history_iterate_10", "shared_history_append", "reduce_sum_10",
+            "fold_perform_operation_10",
+            "calculation_str"} <= set(results["timings"])
+    assert results["memory"]["bytes_per_entry_columnar"] > 0
+    assert "ns/op" in report(results)
+
+def test_compare_flags_regressions():
+    """Test only benchmarks slower than the threshold are reported."""
+    baseline = {"timings": {"fast": 100.0, "slow": 100.0}}
+    current = {"timings": {"fast": 110.0, "slow": 150.0, "new": 1.0}}
+    assert compare(current, baseline, threshold=0.2) == ["slow"]
+    assert "(+50.0%)" in report({**current, "memory": {}}, baseline)
+
+def test_main_save_and_compare(tmp_path):
+    """Test --save writes JSON and --compare fails against a much faster baseline."""
+    saved = tmp_path / "results.json"
+    assert main(["--sizes", "10", "--number", "10", "--save", str(saved)]) == 0
+    results = json.loads(saved.read_text())
+    assert main(["--sizes", "10", "--number", "10", "--compare", str(saved),
+                 "--threshold", "100"]) == 0
+    faster = {"timings": {name: value / 1000 for name, value in results["timings"].items()}}
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(faster))
+    assert main(["--sizes", "10", "--number", "10", "--compare", str(baseline)]) == 1
+
+def test_startup_benchmark():
+    """Test the startup benchmark parses -X importtime output for each scenario."""
+    rows = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        340 |   app.operations\n"
+    )
+    assert rows == [("app.operations", 120, 340)]
+    results = {"oneshot": measure(SCENARIOS["oneshot"], runs=1)}
+    assert results["oneshot"]["modules"] > 0
+    assert "app.operations" in {module for module, _ in results["oneshot"]["slowest"]}
+    assert "oneshot" in report_startup(results, top=1)
+    assert startup_main(["--runs", "1", "--top", "0"]) == 0
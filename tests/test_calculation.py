@@ -42,3 +42,31 @@ def test_zero_division():
     calc_div_zero = Calculation(division_operation, 5, 0)
     with pytest.raises(ValueError, match="Division by zero is not allowed."):
         str(calc_div_zero)  # Trigger the __str__ method to perform the calculation
+
+def test_result_is_computed_once():
+    """Test the result is calculated on first use and cached afterwards."""
+    class CountingAddition(Addition):
+        """Addition that counts how often it is executed."""
+        calls = 0
+
+        def execute(self, a, b):
+            CountingAddition.calls += 1
+            return super().execute(a, b)
+
+    calc = Calculation(CountingAddition(), 1, 2)
+    assert calc.get_result() == 3
+    assert str(calc) == "1 countingaddition 2 = 3"
+    assert str(calc) == "1 countingaddition 2 = 3"
+    assert CountingAddition.calls == 1
+
+def test_stored_result_is_reused():
+    """Test a result passed at construction is used without recalculating."""
+    calc = Calculation(Division(), 5, 0, 7.0)  # Would raise if recalculated.
+    assert str(calc) == "5 division 0 = 7.0"
+
+def test_calculation_is_frozen():
+    """Test Calculation is immutable and uses slots."""
+    calc = Calculation(Addition(), 1, 2, 3)
+    with pytest.raises(AttributeError):
+        calc.operand1 = 5
+    assert not hasattr(calc, "__dict__")
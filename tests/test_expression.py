@@ -0,0 +1,67 @@
+"""
+Test Module for the Expression Engine
+
+This module tests parsing, precedence, compilation caching and evaluation
+with variable bindings in app.expression.
+"""
+
+import pytest
+
+from app.expression import CompiledExpression, compile_expression, evaluate
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("1 + 2 * 3", 7),
+    ("(1 + 2) * 3", 9),
+    ("10 - 4 - 3", 3),          # Left-associative subtraction.
+    ("8 / 4 / 2", 1),           # Left-associative division.
+    ("-2 * -(3)", 6),           # Unary minus.
+    ("+4 - +1", 3),             # Unary plus.
+    ("1e3 / .5", 2000),         # Exponents and leading-dot decimals.
+    ("((2))", 2),
+])
+def test_evaluate_constants(source, expected):
+    """Test precedence, associativity and parentheses."""
+    assert evaluate(source) == expected
+
+def test_variables_and_reuse():
+    """Test one compiled expression evaluated with many bindings."""
+    expression = compile_expression("(a + 2) * b")
+    assert expression.variables == frozenset({"a", "b"})
+    assert expression.evaluate(a=1, b=3) == 9
+    assert list(expression.evaluate_many([{"a": 0, "b": 1}, {"a": 2, "b": 2}])) == [2, 8]
+    assert repr(expression) == "CompiledExpression('(a + 2) * b')"
+
+def test_compiled_expressions_are_cached():
+    """Test repeated formulas reuse the same compiled object."""
+    assert compile_expression("x * 2") is compile_expression("x * 2")
+    assert isinstance(compile_expression("x * 2"), CompiledExpression)
+
+def test_division_by_zero():
+    """Test division by zero raises when evaluated, including constant sub-expressions."""
+    expression = compile_expression("1 / 0 + x")
+    with pytest.raises(ValueError, match="Division by zero is not allowed."):
+        expression.evaluate(x=1)
+    with pytest.raises(ValueError, match="Division by zero is not allowed."):
+        evaluate("x / y", x=1, y=0)
+
+@pytest.mark.parametrize("source, message", [
+    ("", "Empty expression."),
+    ("1 +", "Unexpected 'end of input'"),
+    ("(1 + 2", r"Missing '\)'"),
+    ("1 2", "Unexpected '2'"),
+    ("2 ^ 3", "Unexpected character '\\^'"),
+    (")", r"Unexpected '\)'"),
+])
+def test_syntax_errors(source, message):
+    """Test malformed expressions raise ValueError."""
+    with pytest.raises(ValueError, match=message):
+        CompiledExpression(source)
+
+def test_binding_errors():
+    """Test missing and non-numeric bindings raise ValueError."""
+    expression = compile_expression("a + b")
+    with pytest.raises(ValueError, match="Missing value for: b"):
+        expression.evaluate(a=1)
+    with pytest.raises(ValueError, match="Both inputs must be numbers."):
+        expression.evaluate(a=1, b="2")
@@ -0,0 +1,605 @@
+"""
+Test Module for the Columnar History Store
+
+This module contains tests for ColumnarHistory and BoundedHistory, checking
+that calculations round-trip through the typed arrays, that the list-like
+surface (append, indexing, slicing, iteration, clear) behaves like a plain
+list, that bounded stores evict and spill their oldest entries, and that
+memory-mapped files persist entries across reopen and read-only sharing, and
+that sharded histories merge concurrent appends from many threads in order,
+and that exact (Decimal, Fraction, big int) values are never rounded, and
+that shared SQLite histories combine batched appends from several processes.
+"""
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from fractions import Fraction
+import logging
+import multiprocessing
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+import weakref
+import pytest
+
+import app.history
+from app.calculation import Calculation
+from app.history import (
+    BoundedHistory, ColumnarHistory, ENTRY_SIZE, MAPPED_RECORD, MappedHistory, ShardedHistory,
+    SharedHistory, operation_code, operation_for_code, read_segment,
+)
+from app.operations import TemplateOperation, Addition, Subtraction, Multiplication, Division
+
+
+def make_history():
+    """Builds a history with one entry per built-in operation."""
+    history = ColumnarHistory()
+    history.append(Calculation(Addition(), 1, 2, 3))
+    history.append(Calculation(Subtraction(), 5, 3, 2))
+    history.append(Calculation(Multiplication(), 3, 4, 12))
+    history.append(Calculation(Division(), 8, 2, 4.0))
+    return history
+
+def test_append_and_index():
+    """Test entries are materialized back into equivalent Calculations."""
+    history = make_history()
+    assert len(history) == 4
+    assert str(history[0]) == "1.0 addition 2.0 = 3.0"
+    assert isinstance(history[-1].operation, Division)
+    assert history[-1].result == 4.0
+
+def test_index_out_of_range():
+    """Test indexing past either end raises IndexError."""
+    history = make_history()
+    with pytest.raises(IndexError):
+        history[4]  # pylint: disable=pointless-statement
+    with pytest.raises(IndexError):
+        history[-5]  # pylint: disable=pointless-statement
+
+def test_slice_and_iteration():
+    """Test slicing returns Calculations and iteration yields every entry in order."""
+    history = make_history()
+    assert [calc.result for calc in history[1:3]] == [2, 12]
+    assert [calc.result for calc in history] == [3, 2, 12, 4.0]
+
+def test_clear():
+    """Test clear empties the history."""
+    history = make_history()
+    history.clear()
+    assert not history
+    assert len(history) == 0
+    assert repr(history) == "ColumnarHistory(0 entries)"
+
+def test_result_computed_on_append():
+    """Test appending a calculation without a stored result computes it."""
+    history = ColumnarHistory()
+    history.append(Calculation(Addition(), 2, 2))
+    assert history[0].result == 4
+    assert history.nbytes == ENTRY_SIZE
+
+def test_custom_operation_code():
+    """Test operations without a fixed code get a dynamic one that round-trips."""
+    class Modulo(TemplateOperation):
+        """Custom operation used to test dynamic codes."""
+        def execute(self, a, b):
+            return a % b
+
+    code = operation_code(Modulo())
+    assert code >= 64
+    assert operation_code(Modulo()) == code
+    assert isinstance(operation_for_code(code), Modulo)
+
+def test_unknown_code():
+    """Test looking up a code that was never registered raises ValueError."""
+    with pytest.raises(ValueError, match="Unknown operation code 255."):
+        operation_for_code(255)
+
+def test_too_many_codes(monkeypatch):
+    """Test running out of one-byte codes raises ValueError."""
+    taken = {type(f"Op{i}", (), {"code": 0}): 64 + i for i in range(192)}
+    monkeypatch.setattr(app.history, "_code_by_class", taken)
+
+    class Extra(Addition):
+        """One operation type too many."""
+        code = 0
+
+    with pytest.raises(ValueError, match="Too many operation types"):
+        operation_code(Extra())
+
+def fill(history, count):
+    """Appends `count` additions numbered 0..count-1."""
+    for i in range(count):
+        history.append(Calculation(Addition(), i, 0, i))
+
+def test_bounded_keeps_most_recent():
+    """Test a bounded history keeps only the newest entries, oldest first."""
+    history = BoundedHistory(max_entries=3)
+    fill(history, 5)
+    assert len(history) == 3
+    assert [calc.result for calc in history] == [2, 3, 4]
+    assert history[-1].result == 4
+    assert [calc.result for calc in history[:2]] == [2, 3]
+    assert history.evicted == 2
+    assert repr(history) == "BoundedHistory(3/3 entries, 2 evicted)"
+
+def test_bounded_by_bytes():
+    """Test a byte budget is converted into an entry capacity."""
+    history = BoundedHistory(max_bytes=ENTRY_SIZE * 2 + 1)
+    assert history.capacity == 2
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({}, "needs max_entries or max_bytes"),
+    ({"max_entries": 0}, "at least one entry"),
+    ({"max_bytes": ENTRY_SIZE - 1}, "at least one entry"),
+])
+def test_bounded_invalid_capacity(kwargs, message):
+    """Test a bounded history needs a positive capacity."""
+    with pytest.raises(ValueError, match=message):
+        BoundedHistory(**kwargs)
+
+def test_bounded_warns_when_dropping(caplog):
+    """Test evictions without a spill file are logged once, not silently dropped."""
+    history = BoundedHistory(max_entries=1)
+    with caplog.at_level(logging.WARNING):
+        fill(history, 3)
+    assert caplog.text.count("oldest entries are being dropped") == 1
+    assert not list(history.spilled())
+
+def test_bounded_spill_to_segment(tmp_path):
+    """Test evicted entries are spilled to a segment file and can be read back."""
+    path = tmp_path / "history.seg"
+    history = BoundedHistory(max_entries=2, spill_path=str(path))
+    fill(history, 5)
+    assert [calc.result for calc in history.spilled()] == [0, 1, 2]
+    history.close()
+    history.close()  # Closing twice is harmless.
+    assert [str(calc) for calc in read_segment(str(path))][0] == "0.0 addition 0.0 = 0.0"
+
+def test_bounded_clear_keeps_spilled(tmp_path):
+    """Test clear empties memory but keeps the segment file."""
+    history = BoundedHistory(max_entries=1, spill_path=str(tmp_path / "history.seg"))
+    fill(history, 2)
+    history.clear()
+    assert len(history) == 0
+    fill(history, 1)
+    assert [calc.result for calc in history] == [0]
+    assert [calc.result for calc in history.spilled()] == [0]
+    history.close()
+
+def test_mapped_persists_across_reopen(tmp_path):
+    """Test a mapped history file keeps its entries after being reopened."""
+    path = str(tmp_path / "history.bin")
+    history = MappedHistory(path)
+    fill(history, 3)
+    history.close()
+
+    reopened = MappedHistory(path)
+    assert [calc.result for calc in reopened] == [0, 1, 2]
+    assert isinstance(reopened[1].operation, Addition)
+    assert reopened.timestamp(-1) >= reopened.timestamp(0) > 0
+    assert repr(reopened) == f"MappedHistory({path!r}, 3 entries, read-write)"
+    reopened.close()
+
+def test_mapped_grows(tmp_path, monkeypatch):
+    """Test the file grows and is remapped when its capacity is reached."""
+    monkeypatch.setattr(app.history, "_MAPPED_GROWTH", 2)
+    monkeypatch.setattr(app.history, "_SEGMENT_CHUNK", 2)
+    history = MappedHistory(str(tmp_path / "history.bin"))
+    fill(history, 7)
+    assert [calc.result for calc in history] == list(range(7))
+    assert history[-1].result == 6
+    history.close()
+
+def test_mapped_readonly_view(tmp_path, monkeypatch):
+    """Test a read-only view sees appends made by a writer, even after the file grows."""
+    monkeypatch.setattr(app.history, "_MAPPED_GROWTH", 2)
+    path = str(tmp_path / "history.bin")
+    writer = MappedHistory(path)
+    fill(writer, 1)
+    reader = MappedHistory(path, readonly=True)
+    assert len(reader) == 1
+    fill(writer, 5)
+    writer.flush()
+    assert len(reader) == 5 + 1
+    assert reader[5].result == 4
+    with pytest.raises(ValueError, match="read-only"):
+        reader.append(Calculation(Addition(), 1, 1, 2))
+    with pytest.raises(ValueError, match="read-only"):
+        reader.clear()
+    with pytest.raises(IndexError):
+        reader.timestamp(6)
+    reader.close()
+    writer.close()
+
+def test_mapped_clear(tmp_path):
+    """Test clear resets the record count and space is reused."""
+    history = MappedHistory(str(tmp_path / "history.bin"))
+    fill(history, 2)
+    history.clear()
+    assert len(history) == 0
+    fill(history, 1)
+    assert [calc.result for calc in history] == [0]
+    history.close()
+
+def test_mapped_rejects_other_files(tmp_path):
+    """Test opening a file that is not a history file raises ValueError."""
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError, match="is not a calculator history file"):
+        MappedHistory(str(path))
+
+def test_subclass_of_builtin_gets_own_code():
+    """Test subclassing a built-in operation does not take over the built-in's code."""
+    class LoggedAddition(Addition):
+        """Subclass inheriting Addition.code."""
+
+    assert operation_code(LoggedAddition()) != Addition.code
+    assert type(operation_for_code(Addition.code)) is Addition
+
+def test_sharded_merges_threads_in_order():
+    """Test appends from many threads are all kept and read back in append order."""
+    history = ShardedHistory()
+    barrier = threading.Barrier(8)
+
+    def worker(thread_id):
+        barrier.wait()
+        for i in range(200):
+            history.append(Calculation(Addition(), thread_id, i, thread_id * 1000 + i))
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(history) == 1600
+    per_thread = {}
+    for calc in history:
+        per_thread.setdefault(calc.operand1, []).append(calc.operand2)
+    assert all(values == list(range(200)) for values in per_thread.values())
+    assert repr(history) == "ShardedHistory(1600 entries, 8 shards)"
+
+class YieldingColumn(array):
+    """array('d') that lets other threads run in the middle of every write."""
+    def append(self, value):
+        time.sleep(0)
+        super().append(value)
+
+    def __setitem__(self, index, value):
+        time.sleep(0)
+        super().__setitem__(index, value)
+
+class YieldingRecord(struct.Struct):
+    """Record struct that lets other threads run before every write."""
+    def pack_into(self, *args):
+        time.sleep(0)
+        super().pack_into(*args)
+
+def slow_columnar(tmp_path, monkeypatch):  # pylint: disable=unused-argument
+    """A ColumnarHistory whose writes are interrupted between columns."""
+    history = ColumnarHistory()
+    history._operand2 = YieldingColumn("d")  # pylint: disable=protected-access
+    return history
+
+def slow_bounded(tmp_path, monkeypatch):  # pylint: disable=unused-argument
+    """A BoundedHistory whose writes are interrupted between columns."""
+    history = BoundedHistory(max_entries=1000)
+    history._operand2 = YieldingColumn("d", history._operand2)  # pylint: disable=protected-access
+    return history
+
+def slow_mapped(tmp_path, monkeypatch):
+    """A MappedHistory whose record writes are interrupted."""
+    monkeypatch.setattr(app.history, "MAPPED_RECORD", YieldingRecord(MAPPED_RECORD.format))
+    return MappedHistory(str(tmp_path / "history.bin"))
+
+@pytest.mark.parametrize("make", [slow_columnar, slow_bounded, slow_mapped])
+def test_concurrent_appends_keep_rows_whole(tmp_path, monkeypatch, make):
+    """Test appends from many threads never mix or lose rows of different calculations."""
+    history = make(tmp_path, monkeypatch)
+    barrier = threading.Barrier(4)
+
+    def worker(thread_id):
+        barrier.wait()
+        for i in range(200):
+            history.append(Calculation(Addition(), thread_id, i, thread_id * 1000 + i))
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(history) == 800
+    assert all(c.get_result() == c.operand1 * 1000 + c.operand2 for c in history)
+
+def test_sharded_snapshot_is_cached_and_indexable():
+    """Test snapshots are reused until new entries arrive."""
+    history = ShardedHistory()
+    fill(history, 3)
+    assert history.snapshot() is history.snapshot()
+    assert history[-1].result == 2
+    assert [calc.result for calc in history[:2]] == [0, 1]
+    fill(history, 1)
+    assert len(history.snapshot()) == 4
+
+def test_sharded_clear():
+    """Test clear drops all shards and the same thread can keep appending."""
+    history = ShardedHistory()
+    fill(history, 2)
+    history.clear()
+    assert len(history) == 0
+    assert not list(history)
+    fill(history, 2)
+    assert [calc.result for calc in history] == [0, 1]
+
+def test_sharded_merges_incrementally(monkeypatch):
+    """Test each read merges only the entries appended since the previous one."""
+    history = ShardedHistory()
+    merged_rows = []
+    merge = app.history._merge_shards  # pylint: disable=protected-access
+
+    def counting_merge(merged, shards, stops):
+        merged_rows.append(sum(stop - shard.merged for shard, stop in zip(shards, stops)))
+        merge(merged, shards, stops)
+
+    monkeypatch.setattr(app.history, "_merge_shards", counting_merge)
+    snapshot = history.snapshot()
+    for i in range(300):
+        history.append(Calculation(Addition(), i, 0, i))
+        assert history[-1].result == i
+    assert merged_rows == [1] * 300
+    assert history.snapshot() is snapshot and len(snapshot) == 300
+
+def test_sharded_snapshot_waits_for_earlier_appends():
+    """Test a snapshot never shows an entry while an earlier one is still being stored."""
+    history = ShardedHistory()
+    storing, release = threading.Event(), threading.Event()
+
+    class SlowCalculation(Calculation):
+        """Blocks inside the shard append until released."""
+        def get_result(self):
+            storing.set()
+            release.wait(5)
+            return super().get_result()
+
+    slow = threading.Thread(target=history.append, args=(SlowCalculation(Addition(), 1, 0, 1),))
+    slow.start()
+    storing.wait(5)
+    history.append(Calculation(Addition(), 2, 0, 2))  # Later sequence number, stored first.
+    seen = []
+    reader = threading.Thread(target=lambda: seen.extend(c.result for c in history))
+    reader.start()
+    reader.join(0.1)
+    assert reader.is_alive() and not seen  # Waiting for entry 1, not showing entry 2 alone.
+    release.set()
+    for thread in (slow, reader):
+        thread.join(5)
+    assert seen == [1, 2]
+
+def test_sharded_clear_retires_old_shards():
+    """Test appends after clear() never go to a shard from before it."""
+    history = ShardedHistory()
+    fill(history, 2)
+    old_shard = history._local.shard  # pylint: disable=protected-access
+    history.clear()
+    fill(history, 1)
+    assert len(old_shard.sequence) == 2
+    assert [calc.result for calc in history] == [0]
+    assert repr(history) == "ShardedHistory(1 entries, 1 shards)"
+
+def test_extend_columns():
+    """Test bulk column appends and their length check."""
+    history = ColumnarHistory()
+    history.extend_columns([Addition.code], [1.0], [2.0], [3.0])
+    assert str(history[0]) == "1.0 addition 2.0 = 3.0"
+    assert list(history.raw_rows()) == [(Addition.code, 1.0, 2.0, 3.0)]
+    with pytest.raises(ValueError, match="same length"):
+        history.extend_columns([1], [1.0], [], [2.0])
+
+def test_exact_values_kept_in_side_table():
+    """Test Decimal, Fraction and big int entries are stored without rounding."""
+    history = ColumnarHistory()
+    history.append(Calculation(Addition(), 1, 2, 3))
+    history.append(Calculation(Addition(), Decimal("0.1"), Decimal("0.2"), Decimal("0.3")))
+    history.append(Calculation(Division(), Fraction(1), Fraction(3), Fraction(1, 3)))
+    history.append(Calculation(Addition(), 2 ** 60, 1, 2 ** 60 + 1))
+    assert history.has_exact
+    assert history[1].result == Decimal("0.3")
+    assert [calc.result for calc in history] == [3, Decimal("0.3"), Fraction(1, 3), 2 ** 60 + 1]
+    history.clear()
+    assert not history.has_exact
+
+@pytest.mark.parametrize("make", [
+    lambda path: BoundedHistory(max_entries=4),
+    MappedHistory,
+])
+def test_double_only_stores_reject_exact_values(tmp_path, make):
+    """Test bounded and mapped stores refuse values a double would round."""
+    history = make(tmp_path / "history.bin")
+    history.append(Calculation(Addition(), 1, 2, 3))
+    with pytest.raises(TypeError, match="doubles only"):
+        history.append(Calculation(Addition(), Fraction(1, 3), 1, Fraction(4, 3)))
+    assert len(history) == 1
+
+def test_sharded_keeps_exact_values():
+    """Test snapshots merge whole entries when shards hold exact values."""
+    history = ShardedHistory()
+    fill(history, 2)
+    history.append(Calculation(Addition(), Decimal("0.1"), Decimal(1), Decimal("1.1")))
+    assert [calc.result for calc in history] == [0, 1, Decimal("1.1")]
+
+@pytest.fixture(name="shared")
+def fixture_shared(tmp_path):
+    """Opens a shared history whose flusher only runs when woken (or closed)."""
+    histories = []
+
+    def open_shared(**options):
+        options.setdefault("flush_interval", 60.0)
+        history = SharedHistory(str(tmp_path / "shared.db"), **options)
+        histories.append(history)
+        return history
+
+    yield open_shared
+    for history in histories:
+        history.close()
+
+def wait_for(condition, timeout=5.0):
+    """Polls until condition() is true (for background commits)."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def append_in_worker(path, start, count):
+    """multiprocessing target: appends `count` additions and commits them on close."""
+    history = SharedHistory(path)
+    for value in range(start, start + count):
+        history.append(Calculation(Addition(), float(value), 0.0, float(value)))
+    history.close()
+
+def append_without_close(history, start, count):
+    """multiprocessing target: appends to the history it was handed and never closes it."""
+    for value in range(start, start + count):
+        history.append(Calculation(Addition(), float(value), 0.0, float(value)))
+
+def test_shared_appends_are_batched(shared):
+    """Test appends are queued, committed together and read back in order."""
+    writer, reader = shared(), shared()
+    fill(writer, 5)
+    assert len(reader) == 0  # Still queued in the writer.
+    assert [calc.operand1 for calc in writer] == [0, 1, 2, 3, 4]  # Read-your-writes.
+    assert len(reader) == 5 and reader[-1].result == 4
+    assert "0 queued" in repr(writer)
+
+def test_shared_flushes_in_background(shared):
+    """Test a full batch is committed by the flusher thread without a read."""
+    writer, reader = shared(batch_size=3), shared()
+    fill(writer, 3)
+    wait_for(lambda: len(reader) == 3)
+
+def test_shared_snapshots(shared):
+    """Test snapshots are cached, incremental and never change after being returned."""
+    writer, reader = shared(), shared()
+    fill(writer, 2)
+    writer.flush()
+    first = reader.snapshot()
+    assert reader.snapshot() is first  # Nothing new: same object.
+    fill(writer, 3)
+    writer.flush()
+    second = reader.snapshot()
+    assert (len(first), len(second)) == (2, 5)
+    assert [calc.operand1 for calc in second] == [0, 1, 0, 1, 2]
+
+def test_shared_clear(shared):
+    """Test clear() empties the file and the queue for every process."""
+    writer, reader = shared(), shared()
+    fill(writer, 3)
+    writer.flush()
+    assert len(reader) == 3
+    writer.append(Calculation(Addition(), 9, 9, 18))
+    reader.clear()
+    writer.clear()
+    assert len(writer) == 0 and len(reader) == 0
+    fill(writer, 1)
+    writer.flush()
+    assert len(reader) == 1
+
+def test_shared_custom_operations_and_byte_order(shared, monkeypatch):
+    """Test operations are stored by name and columns are little-endian."""
+    class Modulo(TemplateOperation):
+        """Custom operation with a dynamic code."""
+        def execute(self, a, b):
+            return a % b
+
+    monkeypatch.setattr(app.history, "_SWAP", True)
+    writer = shared()
+    writer.append(Calculation(Modulo(), 7, 4, 3))
+    writer.append(Calculation(Division(), 1, 4, 0.25))
+    writer.flush()
+    assert [str(calc) for calc in shared()] == ["7.0 modulo 4.0 = 3.0", "1.0 division 4.0 = 0.25"]
+
+def test_shared_rejects_exact_values_and_closed_use(shared):
+    """Test exact values and appends after close() are refused."""
+    history = shared()
+    with pytest.raises(TypeError, match="doubles only"):
+        history.append(Calculation(Addition(), Fraction(1, 3), 1, Fraction(4, 3)))
+    history.close()
+    history.close()  # Idempotent.
+    with pytest.raises(ValueError, match="closed"):
+        history.append(Calculation(Addition(), 1, 2, 3))
+
+def test_shared_failed_commit_keeps_rows(shared, tmp_path, caplog):
+    """Test a failed commit rolls back, keeps the queue and is retried."""
+    history = shared(batch_size=1)
+    other = sqlite3.connect(str(tmp_path / "shared.db"))
+    other.execute("ALTER TABLE batches RENAME TO hidden")
+    other.commit()
+    with pytest.raises(sqlite3.OperationalError):
+        history.append(Calculation(Addition(), 1, 2, 3))  # Wakes the flusher, which fails...
+        wait_for(lambda: "Shared history commit failed." in caplog.text)
+        history.flush()  # ...and so does an explicit flush.
+    assert "1 queued" in repr(history)
+    other.execute("ALTER TABLE hidden RENAME TO batches")
+    other.commit()
+    other.close()
+    assert len(history) == 1
+
+def test_shared_across_processes(tmp_path):
+    """Test forked and spawned workers append to one history without losing entries."""
+    path = str(tmp_path / "shared.db")
+    history = SharedHistory(path, flush_interval=60.0)
+    history.append(Calculation(Addition(), -1.0, 0.0, -1.0))  # Queued in the parent only.
+    workers = [
+        multiprocessing.get_context(method).Process(
+            target=append_in_worker, args=(path, index * 1000, 500)
+        )
+        for index, method in enumerate(("fork", "fork", "spawn"))
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    entries = history.snapshot()
+    assert len(entries) == 1501  # The parent's queue was not committed twice.
+    assert sorted(calc.operand1 for calc in entries)[1:] == [
+        float(start + value) for start in (0, 1000, 2000) for value in range(500)
+    ]
+    reopened = pickle.loads(pickle.dumps(history))
+    assert len(reopened) == 1501
+    reopened.close()
+    history.close()
+
+def test_shared_commits_when_workers_exit(tmp_path):
+    """Test workers that never call close() still commit their queue when they exit."""
+    path = str(tmp_path / "shared.db")
+    history = SharedHistory(path, flush_interval=60.0)
+    workers = [
+        multiprocessing.get_context(method).Process(
+            target=append_without_close, args=(history, index * 1000, 100)
+        )
+        for index, method in enumerate(("fork", "forkserver"))
+    ]
+    for worker in workers:
+        worker.start()
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("fork")) as pool:
+        pool.submit(append_without_close, history, 2000, 100).result()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert len(history) == 300
+    history.close()
+
+def test_shared_fork_handler(shared):
+    """Test the fork handler reopens the store, and ignores closed or collected ones."""
+    history = shared()
+    fill(history, 2)
+    connection = history._connection  # pylint: disable=protected-access
+    app.history._restart_shared(weakref.ref(history))  # pylint: disable=protected-access
+    assert history._connection is not connection  # pylint: disable=protected-access
+    assert "0 queued" in repr(history)  # The parent's queue is not the child's.
+    history.close()
+    app.history._restart_shared(weakref.ref(history))  # pylint: disable=protected-access
+    assert history._closed  # pylint: disable=protected-access
@@ -0,0 +1,282 @@
+"""
+Test Module for the Indexed History Store
+
+This module contains tests for IndexedHistory and the query API, checking
+that every plan (scan, time, operation and value indexes) returns the same
+matches as a plain scan, that sorted indexes absorb appends and imports
+through their tail, that results are paged lazily, that exact values and
+NaN results are handled, and that the REPL query syntax is parsed strictly.
+"""
+
+from array import array
+from decimal import Decimal
+import math
+import random
+import time
+import pytest
+
+from app.calculation import Calculation
+from app.history import ColumnarHistory, MappedHistory, SharedHistory, operation_code
+from app.history_index import (
+    IndexedHistory, Query, parse_duration, parse_query, query_history,
+)
+from app.numeric import get_backend
+from app.operations import Addition, Subtraction, Multiplication, Division
+
+OPERATIONS = [Addition(), Subtraction(), Multiplication(), Division()]
+
+
+def fill(history, count, seed=1):
+    """Appends `count` random calculations and returns them."""
+    rng = random.Random(seed)
+    calculations = []
+    for _ in range(count):
+        operation = rng.choice(OPERATIONS)
+        a, b = rng.uniform(-100, 100), rng.uniform(1, 100)
+        calculation = Calculation(operation, a, b, operation.execute(a, b))
+        history.append(calculation)
+        calculations.append(calculation)
+    return calculations
+
+def scan(calculations, kind=None, low=-math.inf, high=math.inf):
+    """Reference answer: the result strings of matches, by brute force."""
+    return [str(c) for c in calculations
+            if (kind is None or type(c.operation) is kind) and low < c.get_result() < high]
+
+@pytest.mark.parametrize("text, kind, low, high, plan", [
+    ("", None, -math.inf, math.inf, "scan"),
+    ("divide", Division, -math.inf, math.inf, "operation index"),
+    ("result>50 result<50.5", None, 50, 50.5, "result index"),
+    ("multiply r>9000", Multiplication, 9000, math.inf, "result index"),
+    ("divide r>20 r<30", Division, 20, 30, "result index"),
+    ("add result>-1e9", Addition, -1e9, math.inf, "operation index"),
+])
+def test_query_plans_match_scan(text, kind, low, high, plan):
+    """Test each plan returns exactly the brute-force matches, in append order."""
+    history = IndexedHistory()
+    calculations = fill(history, 3000)
+    result = history.query(parse_query(text))
+    assert result.plan == plan
+    assert [str(c) for c in result] == scan(calculations, kind, low, high)
+
+def test_query_history_scans_plain_stores():
+    """Test query_history answers the same on an unindexed store."""
+    indexed, plain = IndexedHistory(), ColumnarHistory()
+    fill(indexed, 500)
+    fill(plain, 500)
+    query = parse_query("subtract a<0 b>=50")
+    expected = [str(c) for c in indexed.query(query)]
+    result = query_history(plain, query)
+    assert result.plan == "scan"
+    assert [str(c) for c in result] == expected
+    assert query_history(indexed, query).count() == len(expected) > 0
+
+def test_time_ranges(monkeypatch):
+    """Test since/until select entries by append time, even if the clock steps back."""
+    clock = iter([100.0, 200.0, 150.0, 300.0])  # The third append sees the clock go back.
+    monkeypatch.setattr(time, "time", lambda: next(clock))
+    history = IndexedHistory()
+    for value in (1, 2, 3, 4):
+        history.append(Calculation(Addition(), value, 0, value))
+    assert [history.timestamp(i) for i in range(4)] == [100.0, 200.0, 200.0, 300.0]
+    result = history.query(Query(since=150.0, until=250.0))
+    assert result.plan == "time index"
+    assert [c.operand1 for c in result] == [2, 3]
+    assert not list(history.query(Query(since=250.0, until=150.0)))
+    # A value index narrowed by the time range (tail entries and merged ones).
+    ranged = history.query(Query(conditions=[("result", "<", 4)], since=150.0))
+    assert [c.operand1 for c in ranged] == [2, 3]
+
+def test_time_ranges_on_mapped_history(tmp_path):
+    """Test the scan fallback uses a store's own timestamps."""
+    history = MappedHistory(str(tmp_path / "history.bin"))
+    history.append(Calculation(Addition(), 1, 2, 3))
+    assert len(query_history(history, parse_query("since=1h")).slice(0, 5)) == 1
+    assert not query_history(history, Query(until=0.0)).slice(0, 5)
+
+def test_time_ranges_need_timestamps():
+    """Test stores without timestamps reject since/until."""
+    with pytest.raises(ValueError, match="no timestamps"):
+        query_history(ColumnarHistory(), parse_query("since=10m"))
+
+def test_paging_is_lazy():
+    """Test pages are cut from the matches without checking past them."""
+    history = IndexedHistory()
+    fill(history, 200)
+    checked = []
+    result = history.query(Query())
+    check = result._check  # pylint: disable=protected-access
+    result._check = lambda index: checked.append(index) or check(index)  # pylint: disable=protected-access
+    assert [str(c) for c in result.page(2, size=10)] == [str(history[i]) for i in range(10, 20)]
+    assert len(checked) == 20
+    assert result.page(30, size=10) == []
+
+@pytest.mark.parametrize("text", ["", "since=1h", "divide", "r>-1e9 r<0"])
+def test_pages_resume_after_cursor(text):
+    """Test each page resumes past the previous cursor, checking no entry twice."""
+    history = IndexedHistory()
+    fill(history, 300)
+    result = history.query(parse_query(text))
+    expected = [str(c) for c in result]
+    checked = []
+    check = result._check  # pylint: disable=protected-access
+    result._check = lambda index: checked.append(index) or check(index)  # pylint: disable=protected-access
+    pages, cursor, calls = [], -1, 0
+    while cursor is not None:
+        matches, cursor = result.page_after(cursor, size=25)
+        pages.extend(str(c) for c in matches)
+        calls += 1
+    assert pages == expected
+    # Only the match looked ahead at for the cursor is checked again, by the next page.
+    assert len(checked) - len(set(checked)) < calls
+
+def test_query_history_reads_one_snapshot(tmp_path):
+    """Test shared stores are queried through a single snapshot."""
+    history = SharedHistory(str(tmp_path / "shared.db"))
+    fill(history, 50)
+    snapshots = []
+    snapshot = history.snapshot
+    history.snapshot = lambda: snapshots.append(1) or snapshot()
+    result = query_history(history, parse_query("add"))
+    matches, cursor = result.page_after(size=5)
+    assert len(matches) == 5 and cursor is not None
+    assert result.count() == sum(c.operation.__class__ is Addition for c in snapshot())
+    assert len(snapshots) == 1
+    history.close()
+
+def test_sorted_index_merges_imports_and_appends():
+    """Test imports are sorted in one pass, later appends merged into the run."""
+    history = IndexedHistory(indexed=("operand1", "result"))
+    count = 20000
+    codes = array("B", [operation_code(Addition())]) * count
+    values = array("d", range(count))
+    history.extend_columns(codes, values, values, array("d", [2.0 * v for v in values]))
+    assert history.query(parse_query("a>=19990")).count() == 10
+    index = history._sorted["operand1"]  # pylint: disable=protected-access
+    assert len(index.keys) == count and not index.tail
+    calculations = fill(history, 2000)
+    assert [str(c) for c in history.query(parse_query("r>-1e9 r<0"))] == scan(calculations, high=0)
+    assert len(index.keys) == count  # Only the queried field was merged.
+    assert history.query(parse_query("a<0")).count() == sum(c.operand1 < 0 for c in calculations)
+    assert len(index.keys) == count + 2000 and not index.tail
+    assert list(index.keys) == sorted(index.keys)
+
+def test_empty_extend_adds_no_timestamps():
+    """Test an empty column chunk leaves timestamps in step with the entries."""
+    history = IndexedHistory()
+    history.extend_columns(array("B"), [], [], [])
+    history.append(Calculation(Addition(), 1, 2, 3))
+    assert len(history._timestamps) == len(history) == 1  # pylint: disable=protected-access
+    assert history.query(parse_query("since=1h")).count() == 1
+
+def test_nan_results_never_match():
+    """Test NaN results are left out of sorted indexes and of every range."""
+    history = IndexedHistory()
+    for _ in range(1100):
+        history.append(Calculation(Addition(), math.inf, -math.inf, math.nan))
+    history.append(Calculation(Addition(), 1, 2, 3))
+    assert [str(c) for c in history.query(parse_query("result>=0"))] == ["1.0 addition 2.0 = 3.0"]
+    assert len(history._sorted["result"].keys) == 1  # pylint: disable=protected-access
+    assert history.query(parse_query("add")).count() == 1101
+
+def test_exact_values():
+    """Test entries from the exact-value side table are indexed by their value."""
+    history = IndexedHistory()
+    history.append(Calculation(Addition(), Decimal("0.1"), Decimal("0.2"), Decimal("0.3")))
+    history.append(Calculation(Addition(), 1, 2, 3))
+    assert history.value("result", 0) == 0.3
+    assert [c.get_result() for c in history.query(parse_query("r<1"))] == [Decimal("0.3")]
+    assert [c.get_result() for c in history.query(parse_query("add b>=0.2"))] == [
+        Decimal("0.3"), 3]
+    fill(history, 1100)
+    assert history.query(parse_query("r=0.3")).count() == 1
+
+def test_results_beyond_double_range():
+    """Test exact results past the double range are indexed and matched as inf or -inf."""
+    history = IndexedHistory()
+    history.append(Calculation(Multiplication(), 10**200, 10**200, 10**400))
+    history.append(Calculation(Multiplication(), -10**200, 10**200, -10**400))
+    fill(history, 1100)
+    assert [c.get_result() for c in history.query(parse_query("r>1e300"))] == [10**400]
+    plain = ColumnarHistory()
+    plain.append(history[1])
+    assert [c.get_result() for c in query_history(plain, parse_query("r<0"))] == [-10**400]
+
+def test_operation_subclasses_match():
+    """Test an operation query also finds entries of its subclasses (numeric backends)."""
+    decimal_add = get_backend("decimal").operation("add")
+    for history in (IndexedHistory(), ColumnarHistory()):
+        history.append(Calculation(decimal_add, Decimal(1), Decimal(2), Decimal(3)))
+        history.append(Calculation(Addition(), 4, 5, 9))
+        history.append(Calculation(Subtraction(), 1, 1, 0))
+        result = query_history(history, parse_query("add"))
+        assert [c.get_result() for c in result] == [Decimal(3), 9]
+        assert result.page_after(0, size=1) == ([history[1]], None)
+        assert [c.get_result() for c in query_history(history, parse_query("+ r<5"))] == [3]
+
+def test_operation_without_entries():
+    """Test querying an operation never appended yields nothing."""
+    history = IndexedHistory()
+    history.append(Calculation(Addition(), 1, 2, 3))
+    result = history.query(parse_query("divide"))
+    assert result.plan == "operation index"
+    assert not list(result)
+
+def test_clear():
+    """Test clear empties the entries and every index."""
+    history = IndexedHistory()
+    fill(history, 50)
+    history.clear()
+    assert len(history) == 0
+    assert not list(history.query(parse_query("add r>0")))
+    history.append(Calculation(Division(), 8, 2, 4.0))
+    assert [str(c) for c in history.query(parse_query("divide"))] == ["8.0 division 2.0 = 4.0"]
+    assert repr(history) == "IndexedHistory(1 entries, indexed on result)"
+
+def test_unknown_indexed_field():
+    """Test only known columns can be indexed."""
+    with pytest.raises(ValueError, match="Unknown history field"):
+        IndexedHistory(indexed=("result", "answer"))
+
+@pytest.mark.parametrize("conditions, expected", [
+    ([("result", ">", 1), ("result", ">=", 1)], (1, False, math.inf, True)),
+    ([("result", ">=", 1), ("result", ">", 0)], (1, True, math.inf, True)),
+    ([("result", "<", 5), ("result", "<=", 5)], (-math.inf, True, 5, False)),
+    ([("result", "=", 2)], (2, True, 2, True)),
+])
+def test_query_ranges(conditions, expected):
+    """Test conditions on a field fold into its tightest range."""
+    assert Query(conditions=conditions).ranges() == {"result": expected}
+
+@pytest.mark.parametrize("text, seconds", [
+    ("90s", 90), ("10m", 600), ("2H", 7200), ("1d", 86400), ("30", 30), ("0.5m", 30),
+])
+def test_parse_duration(text, seconds):
+    """Test durations with and without a unit."""
+    assert parse_duration(text) == seconds
+
+@pytest.mark.parametrize("text", ["", "m", "ten", "-5m", "nanm"])
+def test_parse_duration_errors(text):
+    """Test malformed or negative durations are rejected."""
+    with pytest.raises(ValueError, match="invalid duration"):
+        parse_duration(text)
+
+def test_parse_query():
+    """Test the REPL syntax: operation, aliases, comparators and time bounds."""
+    query = parse_query("/ A<=1 operand2>2 R=3 since=10m until=1m", now=1000.0)
+    assert isinstance(query.operation, Division)
+    assert query.conditions == [("operand1", "<=", 1.0), ("operand2", ">", 2.0),
+                                ("result", "=", 3.0)]
+    assert (query.since, query.until) == (400.0, 940.0)
+
+@pytest.mark.parametrize("text, message", [
+    ("modulo", "unknown operation or condition 'modulo'"),
+    ("r>1 add", "unknown operation or condition 'add'"),
+    ("answer>1", "unknown field 'answer'"),
+    ("r>one", "invalid number in 'r>one'"),
+    ("since=soon", "invalid duration 'soon'"),
+])
+def test_parse_query_errors(text, message):
+    """Test unreadable tokens are reported."""
+    with pytest.raises(ValueError, match=message):
+        parse_query(text)
@@ -0,0 +1,271 @@
+"""
+Test Module for Streaming History Export and Import
+
+This module round-trips histories through the CSV, JSON Lines and binary
+columnar formats (exact values included), checks chunked output, format
+detection, error reporting for malformed files, imports that fail without
+storing anything, and the export/import APIs of both calculators
+(including their running statistics).
+"""
+
+from decimal import Decimal
+from fractions import Fraction
+import math
+import weakref
+import pytest
+
+import app.history_io
+from app.calculation import Calculation
+from app.history import BoundedHistory, ColumnarHistory, code_for_name
+from app.history_io import (
+    BLOCK_HEADER, COLUMNAR_MAGIC, detect_format, export_history, import_history, iter_binary, iter_csv,
+    iter_jsonl,
+)
+from app.observer import CalculatorWithObserver
+from app.operations import Addition, Division, Multiplication, Subtraction
+from app.singleton_calc import SingletonCalculator
+
+
+def sample_history(history=None):
+    """Fills a history with one entry per operation, including non-finite results."""
+    history = history if history is not None else ColumnarHistory()
+    history.append(Calculation(Addition(), 1.5, 2.0, 3.5))
+    history.append(Calculation(Subtraction(), -0.0, 1e-300, -1e-300))
+    history.append(Calculation(Multiplication(), 1e308, 10.0, math.inf))
+    history.append(Calculation(Division(), 1.0, 3.0, 1 / 3))
+    history.append(Calculation(Subtraction(), math.inf, math.inf, math.nan))
+    return history
+
+def rows(history):
+    """Returns comparable (operation, a, b, result) rows, with NaN made equal."""
+    return [(type(c.operation), repr(c.operand1), repr(c.operand2), repr(c.result)) for c in history]
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl", ".bin"])
+@pytest.mark.parametrize("source", [ColumnarHistory, lambda: BoundedHistory(max_entries=10), list])
+def test_round_trip(tmp_path, suffix, source):
+    """Test every format restores the same entries, from any kind of history."""
+    history = sample_history(source())
+    path = tmp_path / f"history{suffix}"
+    assert export_history(history, str(path), chunk_rows=2) == 5
+    loaded = ColumnarHistory()
+    assert import_history(loaded, str(path), chunk_rows=2) == 5
+    assert rows(loaded) == rows(history)
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "binary"])
+def test_import_into_append_only_store(tmp_path, fmt):
+    """Test stores without extend_columns are loaded with append()."""
+    path = tmp_path / "history.out"
+    export_history(sample_history(), str(path), fmt)
+    loaded = BoundedHistory(max_entries=3)
+    assert import_history(loaded, str(path), fmt) == 5
+    assert rows(loaded) == rows(sample_history())[-3:]
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "binary"])
+def test_import_holds_one_chunk(tmp_path, fmt):
+    """Test an import keeps only the chunk being stored in memory, not the whole file."""
+    path = tmp_path / "history.out"
+    export_history(sample_history(), str(path), fmt, chunk_rows=2)
+    stored = []
+
+    def on_chunk(columns):
+        assert all(chunk() is None for chunk in stored)  # Earlier chunks were freed.
+        stored.append(weakref.ref(columns[1]))
+
+    assert import_history(ColumnarHistory(), str(path), fmt, chunk_rows=2, on_chunk=on_chunk) == 5
+    assert len(stored) == 3
+
+def test_chunks_are_bounded():
+    """Test exports are produced in chunks of at most chunk_rows rows."""
+    history = ColumnarHistory()
+    for i in range(10):
+        history.append(Calculation(Addition(), i, 0, i))
+    chunks = list(iter_csv(history, chunk_rows=4))
+    assert [chunk.count("\n") for chunk in chunks] == [1, 4, 4, 2]
+    assert len(list(iter_jsonl(history, chunk_rows=4))) == 3
+    binary = list(iter_binary(history, chunk_rows=4))
+    assert binary[0] == COLUMNAR_MAGIC and len(binary) == 4
+
+def test_byte_swapped_columns(tmp_path, monkeypatch):
+    """Test big-endian hosts write and read the same little-endian file."""
+    path = tmp_path / "history.bin"
+    export_history(sample_history(), str(path))
+    native = path.read_bytes()
+    monkeypatch.setattr(app.history_io, "_SWAP", True)
+    export_history(sample_history(), str(path))
+    assert path.read_bytes() != native  # Columns were swapped on write...
+    loaded = ColumnarHistory()
+    import_history(loaded, str(path))
+    assert rows(loaded) == rows(sample_history())  # ...and swapped back on read.
+
+def exact_history(decimal=True):
+    """Returns a history holding Decimal, Fraction and big-int entries next to a float one."""
+    history = ColumnarHistory()
+    if decimal:
+        history.append(Calculation(Addition(), Decimal("0.1"), Decimal("0.2"), Decimal("0.3")))
+    history.append(Calculation(Addition(), Fraction(1, 2), Fraction(1, 2), Fraction(1)))
+    history.append(Calculation(Addition(), 2 ** 60, 1, 2 ** 60 + 1))
+    history.append(Calculation(Division(), 1.0, 4.0, 0.25))
+    return history
+
+def exact_rows(history):
+    """Returns (operation, a, b, result) rows with each value's type, for exact comparisons."""
+    return [(type(c.operation), *((type(v), v) for v in (c.operand1, c.operand2, c.result)))
+            for c in history]
+
+def test_exact_values_round_trip_as_jsonl(tmp_path):
+    """Test Decimal, Fraction and big-int entries come back with their type and value."""
+    history = exact_history()
+    text = "".join(iter_jsonl(history))
+    assert '"result": "0.3"' in text and '"result": "1/1"' in text
+    assert f'"result": {2 ** 60 + 1}' in text
+    path = str(tmp_path / "history.jsonl")
+    export_history(history, path)
+    loaded = ColumnarHistory()
+    assert import_history(loaded, path, chunk_rows=3) == 4
+    assert exact_rows(loaded) == exact_rows(history)
+
+def test_exact_values_in_csv_and_binary(tmp_path):
+    """Test CSV keeps Fractions and big ints exact but refuses Decimals, binary refuses all."""
+    history = exact_history()
+    with pytest.raises(TypeError, match="export them as JSONL"):
+        "".join(iter_csv(history))
+    with pytest.raises(TypeError, match="doubles only"):
+        export_history(history, str(tmp_path / "history.bin"))
+    history = exact_history(decimal=False)
+    path = str(tmp_path / "history.csv")
+    export_history(history, path)
+    assert "addition,1/2,1/2,1/1\n" in (tmp_path / "history.csv").read_text(encoding="utf-8")
+    loaded = ColumnarHistory()
+    import_history(loaded, path)
+    assert exact_rows(loaded) == exact_rows(history)
+    big = [Calculation(Addition(), 2 ** 60, 0, 2 ** 60)]
+    export_history(big, str(tmp_path / "big.bin"))
+    loaded = ColumnarHistory()
+    import_history(loaded, str(tmp_path / "big.bin"))
+    assert loaded[0].result == 2 ** 60
+
+def test_exact_values_need_an_exact_store(tmp_path):
+    """Test exact entries are refused by double-only stores before anything is stored."""
+    path = str(tmp_path / "history.jsonl")
+    export_history(exact_history(), path)
+    loaded = BoundedHistory(max_entries=10)
+    with pytest.raises(TypeError, match="doubles only"):
+        import_history(loaded, path)
+    assert not loaded
+    plain = []
+    assert import_history(plain, path) == 4
+    assert exact_rows(plain) == exact_rows(exact_history())
+
+@pytest.mark.parametrize("fmt, line", [("csv", 7), ("jsonl", 6)])
+def test_failed_import_stores_nothing(tmp_path, fmt, line):
+    """Test a malformed row in a later chunk leaves the history unchanged."""
+    path = tmp_path / f"history.{fmt}"
+    export_history(sample_history(), str(path))
+    with open(path, "a", encoding="utf-8") as out:
+        out.write("addition,1,2\n" if fmt == "csv" else '{"operation": "addition"}\n')
+    history = ColumnarHistory()
+    history.append(Calculation(Addition(), 1.0, 1.0, 2.0))
+    with pytest.raises(ValueError, match=rf"Invalid history row \(line {line}\)"):
+        import_history(history, str(path), chunk_rows=2)
+    assert len(history) == 1
+
+def test_custom_operation_names(tmp_path):
+    """Test plugin operations are stored by name and decoded by this process."""
+    class Power(Multiplication):
+        """Custom operation with a dynamic code."""
+
+    history = ColumnarHistory()
+    history.append(Calculation(Power(), 2.0, 3.0, 8.0))
+    for suffix in (".csv", ".bin"):
+        path = tmp_path / f"history{suffix}"
+        export_history(history, str(path))
+        loaded = ColumnarHistory()
+        import_history(loaded, str(path))
+        assert type(loaded[0].operation) is Power
+    assert code_for_name("POWER") == code_for_name("power")
+
+def test_detect_format():
+    """Test formats come from the argument or the file extension."""
+    assert detect_format("a.CSV") == "csv"
+    assert detect_format("a.ndjson") == "jsonl"
+    assert detect_format("a.txt", "binary") == "binary"
+    with pytest.raises(ValueError, match="Cannot tell the format"):
+        detect_format("a.txt")
+    with pytest.raises(ValueError, match="Unknown history format 'xml'"):
+        detect_format("a.csv", "xml")
+
+@pytest.mark.parametrize("name, text, message", [
+    ("bad.csv", "operation,operand1,operand2,result\naddition,1,2,3\naddition,1,2\n",
+     r"Invalid history row \(line 3\)"),
+    ("bad.csv", "operation,operand1,operand2,result\naddition,1,x,3\n",
+     r"Invalid history row \(line 2\)"),
+    ("bad.csv", "operation,operand1,operand2,result\naddition,1,2,3\npower2,1,2,3\n",
+     r"Unknown operation 'power2' \(line 3\)"),
+    ("bad.csv", "op,a,b,r\n", "is not a calculator history CSV file"),
+    ("bad.jsonl", '{"operation": "addition", "operand1": 1, "operand2": 2, "result": 3}\n'
+                  '\n{"operation": "addition", "operand1": 1}\n', r"Invalid history row \(line 3\)"),
+    ("bad.jsonl", '{"operation": "nothing", "operand1": 1, "operand2": 2, "result": 3}\n',
+     r"Unknown operation 'nothing' \(line 1\)"),
+    ("bad.csv", "operation,operand1,operand2,result\naddition,1/0,2,3\n",
+     r"Invalid history row \(line 2\)"),
+    ("bad.jsonl", '{"operation": "addition", "operand1": "1/0", "operand2": 2, "result": 3}\n',
+     r"Invalid history row \(line 1\)"),
+    ("bad.jsonl", '{"operation": "addition", "operand1": "one", "operand2": 2, "result": 3}\n',
+     r"Invalid history row \(line 1\)"),
+    ("bad.jsonl", '{"operation": "addition", "operand1": null, "operand2": 2, "result": 3}\n',
+     r"Invalid history row \(line 1\)"),
+])
+def test_malformed_text_files(tmp_path, name, text, message):
+    """Test malformed rows are reported with their line number."""
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ValueError, match=message):
+        import_history(ColumnarHistory(), str(path))
+
+def test_jsonl_skips_blank_lines(tmp_path):
+    """Test blank lines in JSON Lines files are ignored."""
+    path = tmp_path / "history.jsonl"
+    path.write_text('\n\n{"operation": "division", "operand1": 1, "operand2": 4, "result": 0.25}\n\n',
+                    encoding="utf-8")
+    loaded = ColumnarHistory()
+    assert import_history(loaded, str(path), chunk_rows=2) == 1  # The first chunk is all blank.
+    assert loaded[0].result == 0.25
+
+def test_malformed_binary_files(tmp_path):
+    """Test foreign, truncated and unknown-operation binary files are rejected."""
+    path = tmp_path / "history.bin"
+    export_history(sample_history(), str(path))
+    data = path.read_bytes()
+    cases = [
+        (b"NOTAFILE", "is not a calculator binary history file"),
+        (data[:-1], "Truncated binary history file"),
+        (data + b"\x01", "Truncated binary history file"),
+        (data.replace(b"addition", b"additiox"), r"Unknown operation 'additiox' \(block 1\)"),
+        (COLUMNAR_MAGIC + BLOCK_HEADER.pack(1, 0) + b"\x01" + bytes(24),
+         r"Operation code 1 has no name \(block 1\)"),
+    ]
+    for content, message in cases:
+        path.write_bytes(content)
+        with pytest.raises(ValueError, match=message):
+            import_history(ColumnarHistory(), str(path))
+
+@pytest.mark.parametrize("make", [CalculatorWithObserver, SingletonCalculator])
+def test_calculator_export_import(tmp_path, make):
+    """Test the calculator APIs move entries and keep the statistics in step."""
+    calculator = make()
+    original = calculator.get_history() if make is SingletonCalculator else None
+    try:
+        if original is not None:
+            calculator.use_history(ColumnarHistory())
+        calculator.perform_operation(Addition(), 1.0, 2.0)
+        calculator.perform_operation(Division(), 1.0, 4.0)
+        path = str(tmp_path / "history.bin")
+        assert calculator.export_history(path) == 2
+        calculator.clear_history()
+        assert calculator.import_history(path) == 2
+        summary = calculator.summary()
+        assert summary["overall"]["sum"] == 3.25
+        assert summary["operations"]["Division"]["count"] == 1
+    finally:
+        if original is not None:
+            calculator.use_history(original)
@@ -0,0 +1,91 @@
+"""
+Test Module for the Logging Configuration
+
+This module tests the queued (background) logging mode, the buffered file
+handler and the hot-path logging controls in app.log_config.
+"""
+
+import logging
+import pytest
+
+from app.log_config import (
+    BufferedFileHandler, configure_hot_path, hot_path_logger, setup_logging, shutdown_logging
+)
+from app.operations import Addition, Division
+
+
+def make_record(level):
+    """Builds a bare log record at the given level."""
+    return logging.LogRecord("test", level, __file__, 1, "msg", None, None)
+
+@pytest.fixture(name="restore_hot_path")
+def fixture_restore_hot_path():
+    """Puts the hot-path logger back to logging everything after a test."""
+    yield
+    configure_hot_path("all")
+
+def test_queued_logging_writes_file(tmp_path):
+    """Test the queued mode writes records from the background listener."""
+    log_file = tmp_path / "queued.log"
+    root = logging.getLogger()
+    previous_level = root.level
+    try:
+        setup_logging(level=logging.INFO, queued=True, filename=str(log_file))
+        setup_logging(level=logging.INFO, queued=True, filename=str(log_file))  # No-op.
+        Addition().calculate(2, 3)
+    finally:
+        shutdown_logging()
+        shutdown_logging()  # Stopping twice is harmless.
+        root.setLevel(previous_level)
+    text = log_file.read_text()
+    assert text.count("Operation performed: 2 and 3 -> Result: 5") == 1
+    assert " - INFO - " in text
+
+def test_buffered_file_handler_flushes_in_groups(tmp_path):
+    """Test records are flushed every flush_every records, and errors right away."""
+    log_file = tmp_path / "buffered.log"
+    handler = BufferedFileHandler(str(log_file), flush_every=2, delay=True)
+    handler.emit(make_record(logging.INFO))
+    assert log_file.read_text() == ""
+    handler.emit(make_record(logging.INFO))
+    assert log_file.read_text().count("msg") == 2
+    handler.emit(make_record(logging.ERROR))
+    assert log_file.read_text().count("msg") == 3
+    handler.close()
+
+def test_buffered_file_handler_reports_errors(tmp_path, monkeypatch):
+    """Test write failures go through handleError instead of raising."""
+    handler = BufferedFileHandler(str(tmp_path / "broken.log"))
+    errors = []
+    monkeypatch.setattr(handler, "handleError", errors.append)
+    monkeypatch.setattr(handler, "format", lambda record: 1 / 0)
+    record = make_record(logging.INFO)
+    handler.emit(record)
+    assert errors == [record]
+    handler.close()
+
+@pytest.mark.usefixtures("restore_hot_path")
+def test_hot_path_off_keeps_errors(caplog):
+    """Test turning the hot path off drops result logs but keeps error logs."""
+    configure_hot_path("off")
+    with caplog.at_level(logging.DEBUG):
+        Addition().calculate(1, 1)
+        with pytest.raises(ValueError):
+            Division().calculate(1, 0)
+    assert "Operation performed" not in caplog.text
+    assert "Attempted to divide by zero." in caplog.text
+
+@pytest.mark.usefixtures("restore_hot_path")
+def test_hot_path_sampling(caplog):
+    """Test sampling keeps one in every N hot-path records."""
+    setup_logging(hot_path="sample", sample_every=3)
+    with caplog.at_level(logging.INFO):
+        for value in range(7):
+            Addition().calculate(value, 0)
+    assert caplog.text.count("Operation performed") == 3  # Records 0, 3 and 6.
+    assert len(hot_path_logger.filters) == 1
+
+def test_unknown_hot_path_mode():
+    """Test unknown hot-path modes are rejected."""
+    with pytest.raises(ValueError, match="Unknown hot path logging mode 'some'."):
+        configure_hot_path("some")
@@ -0,0 +1,141 @@
+"""
+Test Module for the Command-Line Entry Point
+
+This module tests the one-shot mode (`main.py add 2 3`) and the dispatch
+in main(): exit statuses, error messages, option validation and the batch
+mode, plus the REPL: arithmetic errors from backends and plugins, and the
+'find' command's paging.
+"""
+
+import pytest
+
+import main
+from app.calculation import Calculation
+from app.history_index import IndexedHistory
+from app.operations import Addition, TemplateOperation
+from app.singleton_calc import SingletonCalculator
+
+
+class Modulo(TemplateOperation):
+    """Plugin raising ZeroDivisionError instead of ValueError."""
+    def execute(self, a, b):
+        return a % b
+
+@pytest.fixture(name="repl")
+def fixture_repl(monkeypatch, tmp_path, capsys):
+    """Runs the REPL over scripted lines and returns its output lines after the welcome."""
+    calculator = SingletonCalculator()
+    original = calculator.get_history()
+    monkeypatch.chdir(tmp_path)
+
+    def run(lines, **options):
+        replies = iter([*lines, "exit"])
+        monkeypatch.setattr("builtins.input", lambda prompt: next(replies))
+        main.calculator(**options)
+        return capsys.readouterr().out.splitlines()[1:-1]
+    yield run
+    calculator.use_history(original)
+
+
+@pytest.mark.parametrize("argv, expected", [
+    (["add", "2", "3"], "5.0"),
+    (["-", "2", "3"], "-1.0"),
+    (["TIMES", "2", "3"], "6.0"),
+    (["divide", "1", "4"], "0.25"),
+])
+def test_one_shot(argv, expected, capsys):
+    """Test one-shot calculations print only the result."""
+    assert main.main(argv) == 0
+    assert capsys.readouterr().out.strip() == expected
+
+@pytest.mark.parametrize("argv, status, message", [
+    (["divide", "1", "0"], 1, "Error: Division by zero is not allowed."),
+    (["pow", "1", "2"], 2, "Error: unknown operation 'pow'"),
+    (["add", "x", "2"], 2, "Error: invalid number in 'x 2'"),
+])
+def test_one_shot_errors(argv, status, message, capsys):
+    """Test one-shot failures go to stderr with a non-zero exit status."""
+    assert main.main(argv) == status
+    assert capsys.readouterr().err.strip() == message
+
+def test_one_shot_plugin_arithmetic_error(operation_registry, capsys):
+    """Test a plugin raising ZeroDivisionError exits with status 1, not a traceback."""
+    operation_registry.register("modulo", Modulo)
+    assert main.main(["modulo", "1", "0"]) == 1
+    assert capsys.readouterr().err.startswith("Error: float modulo")
+
+def test_one_shot_registered_operation(capsys):
+    """Test names outside the built-in table fall back to OperationFactory."""
+    assert main.one_shot("mUl", "2", "4") == 0
+    assert capsys.readouterr().out.strip() == "8.0"
+
+@pytest.mark.parametrize("option", ["--history-file", "--shared-history"])
+def test_file_histories_need_float_backend(option, capsys):
+    """Test file-backed histories and exact backends are rejected as a usage error."""
+    with pytest.raises(SystemExit) as error:
+        main.main([option, "history.db", "--numeric", "decimal"])
+    assert error.value.code == 2
+    assert f"{option} stores floats only" in capsys.readouterr().err
+    with pytest.raises(ValueError, match="store floats only"):
+        main.calculator(history_file="history.bin", numeric="fraction")
+
+INVALID_INPUT = ("Invalid input. Please enter a valid operation and two numbers. "
+                 "Type 'help' for instructions.")
+
+@pytest.mark.parametrize("numeric, lines, expected", [
+    ("fraction", ["add 1/0 2", "sum 1 1/0", "add 1/2 1/3"],
+     [INVALID_INPUT, "Could not compute the sum: invalid number '1/0'", "Result: 5/6"]),
+    ("decimal", ["add Infinity -Infinity", "sum Infinity -Infinity", "product 0.1 3"],
+     [INVALID_INPUT, "Could not compute the sum: Invalid decimal operation (InvalidOperation).",
+      "Result: 0.3"]),
+])
+def test_repl_arithmetic_errors(repl, numeric, lines, expected):
+    """Test exact backends report ArithmeticError cases without leaving the REPL."""
+    assert repl(lines, numeric=numeric) == expected
+
+@pytest.mark.parametrize("numeric", ["decimal", "fraction", "int"])
+def test_repl_find_backend_entries(repl, numeric):
+    """Test 'find <operation>' matches entries made by an exact backend's operations."""
+    lines = repl(["add 1 2", "multiply 2 3", "find add", "find add r>2", "find multiply r<3"],
+                 numeric=numeric)
+    assert len(lines) == 5 and lines[2] == lines[3] and "addition" in lines[2]
+    assert lines[4] == "No matching calculations."
+
+def test_repl_plugin_arithmetic_errors(repl, operation_registry):
+    """Test a plugin raising ZeroDivisionError is reported like any invalid input."""
+    operation_registry.register("modulo", Modulo)
+    assert repl(["modulo 1 0", "modulo 7 4"]) == [INVALID_INPUT, "Result: 3.0"]
+
+def test_batch_mode(tmp_path, capsys):
+    """Test --batch runs a command file and reports failures in the exit status."""
+    commands = tmp_path / "commands.txt"
+    commands.write_text("add 1 2\ndivide 1 0\n", encoding="utf-8")
+    assert main.main(["--batch", str(commands)]) == 1
+    assert capsys.readouterr().out.startswith("3.0\n")
+
+def test_find_pages(capsys):
+    """Test 'find' prints one page of matches and the command for the next one."""
+    history = IndexedHistory()
+    for value in range(25):
+        history.append(Calculation(Addition(), value, 1, value + 1))
+    main.find(history, "add r>2")
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == main.FIND_PAGE_SIZE + 1
+    assert lines[0] == "2.0 addition 1.0 = 3.0"
+    assert lines[-1] == "More results: find add r>2 after=21"
+    main.find(history, "add r>2 after=21")
+    assert capsys.readouterr().out.splitlines() == [
+        f"{value}.0 addition 1.0 = {value + 1}.0" for value in range(22, 25)]
+
+@pytest.mark.parametrize("arguments, expected", [
+    ("divide", "No matching calculations."),
+    ("r>1 after=-5", "Could not run the query: invalid entry number -5"),
+    ("r>1 after=0", "No matching calculations."),
+    ("pow", "Could not run the query: unknown operation or condition 'pow'"),
+])
+def test_find_messages(arguments, expected, capsys):
+    """Test 'find' reports empty results and bad queries."""
+    history = IndexedHistory()
+    history.append(Calculation(Addition(), 1, 2, 3))
+    main.find(history, arguments)
+    assert capsys.readouterr().out.strip() == expected
@@ -0,0 +1,110 @@
+"""
+Test Module for the Memoization Cache
+
+This module tests MemoCache: hits and misses, LRU and TTL eviction,
+signed zeros and NaN keys, cached errors, and use from both calculators.
+"""
+
+import math
+import pytest
+
+from app.memo import MemoCache
+from app.observer import CalculatorWithObserver
+from app.operations import Addition, Division, Multiplication
+from app.singleton_calc import SingletonCalculator
+
+
+class CountingAddition(Addition):
+    """Addition that counts how often it is executed."""
+    def __init__(self):
+        self.calls = 0
+
+    def execute(self, a, b):
+        self.calls += 1
+        return super().execute(a, b)
+
+def test_hits_and_misses():
+    """Test repeated triples are served from the cache."""
+    cache, operation = MemoCache(), CountingAddition()
+    assert cache.calculate(operation, 1, 2) == 3
+    assert cache.calculate(operation, 1, 2) == 3
+    assert operation.calls == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+def test_key_includes_operation_and_types():
+    """Test different operations and operand types do not share entries."""
+    cache = MemoCache()
+    assert cache.calculate(Addition(), 2, 2) == 4
+    assert cache.calculate(Multiplication(), 2, 2) == 4
+    result = cache.calculate(Addition(), 2.0, 2.0)
+    assert isinstance(result, float)
+    assert len(cache) == 3
+
+def test_signed_zero_and_nan():
+    """Test -0.0 is not merged with 0.0 and NaN inputs are found again."""
+    cache = MemoCache()
+    assert math.copysign(1, cache.calculate(Addition(), 0.0, 0.0)) == 1
+    assert math.copysign(1, cache.calculate(Addition(), -0.0, -0.0)) == -1
+    nan = float("nan")
+    assert math.isnan(cache.calculate(Addition(), nan, 1.0))
+    assert math.isnan(cache.calculate(Addition(), float("nan"), 1.0))
+    assert cache.hits == 1
+
+def test_cached_error_is_reraised():
+    """Test a division by zero is cached and raised again on every hit."""
+    cache = MemoCache()
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Division by zero is not allowed."):
+            cache.calculate(Division(), 1, 0)
+    assert cache.stats()["hits"] == 1
+
+def test_unhashable_input_falls_back():
+    """Test unhashable operands skip the cache and fail validation as usual."""
+    with pytest.raises(ValueError, match="Both inputs must be numbers."):
+        MemoCache().calculate(Addition(), [], 1)
+
+def test_lru_eviction():
+    """Test the least recently used entry is evicted first."""
+    cache, operation = MemoCache(maxsize=2), CountingAddition()
+    cache.calculate(operation, 1, 1)
+    cache.calculate(operation, 2, 2)
+    cache.calculate(operation, 1, 1)  # Touch (1, 1) so (2, 2) is the oldest.
+    cache.calculate(operation, 3, 3)
+    assert cache.evictions == 1
+    cache.calculate(operation, 1, 1)
+    assert operation.calls == 3
+    cache.clear()
+    assert len(cache) == 0
+
+def test_ttl_expiry():
+    """Test entries older than the TTL are recalculated."""
+    now = [0.0]
+    cache, operation = MemoCache(ttl=10, clock=lambda: now[0]), CountingAddition()
+    cache.calculate(operation, 1, 1)
+    now[0] = 5
+    cache.calculate(operation, 1, 1)
+    now[0] = 20
+    cache.calculate(operation, 1, 1)
+    assert operation.calls == 2
+    assert cache.evictions == 1
+
+def test_invalid_maxsize():
+    """Test the cache needs room for at least one entry."""
+    with pytest.raises(ValueError, match="maxsize must be at least 1"):
+        MemoCache(maxsize=0)
+
+def test_calculators_use_memo():
+    """Test both calculators route calculations through a cache."""
+    cache, operation = MemoCache(), CountingAddition()
+    calculator = CalculatorWithObserver(memo=cache)
+    calculator.perform_operation(operation, 1, 2)
+    calculator.perform_operation(operation, 1, 2)
+
+    singleton = SingletonCalculator()
+    singleton.use_memo(cache)
+    try:
+        assert singleton.perform_operation(operation, 1, 2) == 3
+    finally:
+        singleton.use_memo(None)
+    assert operation.calls == 1
+    assert cache.hits == 2
@@ -0,0 +1,98 @@
+"""
+Test Module for Hot-Path Metrics
+
+This module tests the fixed-memory latency histogram and the instrumentation
+that enable() installs around operations, the factory, observer dispatch and
+history appends.
+"""
+
+import pytest
+
+from app import metrics
+from app.history import BoundedHistory
+from app.metrics import LatencyHistogram, format_snapshot
+from app.observer import CalculatorWithObserver, HistoryObserver
+from app.operation_factory import OperationFactory
+from app.operations import DISPATCH_TABLE, Addition, Division, TemplateOperation, calculate_trusted
+
+
+@pytest.fixture(name="enabled")
+def fixture_enabled():
+    """Enables fresh metrics for a test and restores the original methods afterwards."""
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+def test_histogram_percentiles():
+    """Test percentiles land within the histogram's relative error."""
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(value * 1000)
+    data = histogram.snapshot()
+    assert data["count"] == 1000
+    assert data["min"] == 1000 and data["max"] == 1_000_000
+    assert abs(data["p50"] - 500_000) / 500_000 < 0.07
+    assert abs(data["p99"] - 990_000) / 990_000 < 0.07
+    assert data["mean"] == pytest.approx(500_500)
+
+def test_histogram_small_values_and_empty():
+    """Test values below the sub-bucket count are exact and empty histograms report zeros."""
+    histogram = LatencyHistogram()
+    assert histogram.snapshot()["p50"] == 0
+    for value in (3, 3, 7):
+        histogram.record(value)
+    assert histogram.percentile(50) == 3
+    assert histogram.percentile(100) == 7
+
+def test_enable_collects_hot_path_metrics(enabled):  # pylint: disable=unused-argument
+    """Test operations, lookups, errors, observers and appends are all measured."""
+    calculator = CalculatorWithObserver(history=BoundedHistory(max_entries=10))
+    calculator.add_observer(HistoryObserver())
+    operation = OperationFactory.create_operation("add")
+    assert OperationFactory.create_operation("nope") is None
+    calculator.perform_operation(operation, 1, 2)
+    with pytest.raises(ValueError):
+        Division().calculate(1, 0)
+
+    data = metrics.snapshot(calculator._history)  # pylint: disable=protected-access
+    assert data["operations"]["Addition"]["count"] == 1
+    assert data["operations"]["Division"]["count"] == 1
+    assert data["errors"] == {"Division by zero is not allowed.": 1}
+    assert data["factory"]["count"] == 2 and data["factory"]["misses"] == 1
+    assert data["observers"]["count"] == 1
+    assert data["history"] == {"appends": 1, "size": 1}
+    text = format_snapshot(data)
+    assert "Addition" in text and "Division by zero is not allowed.: 1" in text
+
+def test_disable_restores_originals():
+    """Test disable() puts the original methods back and enable() is idempotent."""
+    original = TemplateOperation.calculate
+    metrics.enable()
+    metrics.enable()
+    assert metrics.is_enabled()
+    assert TemplateOperation.calculate is not original
+    metrics.disable()
+    assert not metrics.is_enabled()
+    assert TemplateOperation.calculate is original
+    assert Addition().calculate(1, 1) == 2
+    metrics.disable()  # Disabling twice is a no-op.
+
+def test_trusted_calls_are_timed():
+    """Test the table dispatch path is routed through the timed calculate."""
+    metrics.reset()
+    metrics.enable()
+    try:
+        assert calculate_trusted(Addition(), 1.0, 2.0) == 3.0
+        assert metrics.snapshot()["operations"]["Addition"]["count"] == 1
+    finally:
+        metrics.disable()
+    assert DISPATCH_TABLE[Addition.code] is not None
+
+def test_format_empty_snapshot():
+    """Test the REPL text for a snapshot with no data."""
+    metrics.reset()
+    text = format_snapshot(metrics.snapshot())
+    assert "Operations:\n  (none)" in text
+    assert "History: appends=0 size=None" in text
@@ -0,0 +1,193 @@
+"""
+Test Module for the Numeric Backends
+
+This module tests the float, Decimal, Fraction and big-integer backends:
+operand parsing, exact results, per-calculator and per-call selection,
+validation and division errors, batch paths, and memo cache keys.
+"""
+
+from decimal import Context, Decimal, ROUND_DOWN
+from fractions import Fraction
+import math
+import pytest
+
+from app.memo import MemoCache
+from app.numeric import (
+    BACKENDS, DecimalBackend, FloatBackend, FractionBackend, IntegerBackend, get_backend,
+)
+from app.observer import CalculatorWithObserver
+from app.operation_factory import OperationFactory
+from app.operations import Addition, Division, Multiplication, Subtraction
+from app.singleton_calc import SingletonCalculator
+
+
+@pytest.mark.parametrize("backend, name, a, b, expected", [
+    (DecimalBackend(), "add", "0.1", "0.2", Decimal("0.3")),
+    (DecimalBackend(), "subtract", "1.00", "0.25", Decimal("0.75")),
+    (DecimalBackend(), "multiply", "1.1", "1.1", Decimal("1.21")),
+    (DecimalBackend(Context(prec=3)), "divide", "1", "3", Decimal("0.333")),
+    (FractionBackend(), "add", "1/3", "1/6", Fraction(1, 2)),
+    (FractionBackend(), "subtract", "0.1", "1/10", Fraction(0)),
+    (FractionBackend(), "multiply", "2/3", "3", Fraction(2)),
+    (FractionBackend(), "divide", "1", "3", Fraction(1, 3)),
+    (IntegerBackend(), "add", "9007199254740993", "1", 9007199254740994),
+    (IntegerBackend(), "subtract", "1", "3", -2),
+    (IntegerBackend(), "multiply", str(10 ** 30), "7", 7 * 10 ** 30),
+    (IntegerBackend(), "divide", str(10 ** 30), "10", 10 ** 29),
+    (FloatBackend(), "add", "0.1", "0.2", 0.1 + 0.2),
+])
+def test_backend_results(backend, name, a, b, expected):
+    """Test each backend computes exact results for parsed operands."""
+    result = backend.operation(name).calculate(backend.parse(a), backend.parse(b))
+    assert result == expected
+    assert type(result) is type(expected)
+
+def test_float_backend_returns_builtins_unchanged():
+    """Test the float backend adds nothing to the default path."""
+    operation = OperationFactory.create_operation("add")
+    assert FloatBackend().operation(operation) is operation
+    decimal_add = DecimalBackend().operation("add")
+    assert type(FloatBackend().operation(decimal_add)) is Addition
+
+def test_operation_mapping():
+    """Test operations map across backends and unknown ones are rejected."""
+    backend = FractionBackend()
+    assert backend.operation(Subtraction()) is backend.operation("-")
+    assert backend.operation(DecimalBackend().operation("*")) is backend.operation("mul")
+    with pytest.raises(ValueError, match="Unknown operation 'pow'"):
+        backend.operation("pow")
+
+    class Power(Multiplication):
+        """Custom operation the backends know nothing about."""
+
+    with pytest.raises(ValueError, match="Power is not supported by the fraction backend"):
+        backend.operation(Power())
+
+def test_decimal_contexts_are_separate():
+    """Test operations from another context are re-bound to this backend's context."""
+    short = DecimalBackend(Context(prec=2, rounding=ROUND_DOWN))
+    long = DecimalBackend(Context(prec=10))
+    operation = long.operation(short.operation("divide"))
+    assert operation.context is long.context
+    assert operation.calculate(Decimal(2), Decimal(3)) == Decimal("0.6666666667")
+    assert repr(short) == "DecimalBackend(prec=2, rounding=ROUND_DOWN)"
+
+@pytest.mark.parametrize("backend, text", [
+    (DecimalBackend(), "abc"),
+    (FractionBackend(), "1/x"),
+    (FractionBackend(), "1/0"),
+    (IntegerBackend(), "1.5"),
+])
+def test_parse_errors(backend, text):
+    """Test invalid operands raise ValueError for every backend."""
+    with pytest.raises(ValueError):
+        backend.parse(text)
+
+@pytest.mark.parametrize("backend, a, message", [
+    (DecimalBackend(), 0.1, "int or Decimal"),
+    (FractionBackend(), Decimal(1), "int or Fraction"),
+    (IntegerBackend(), 1.0, "must be int"),
+])
+def test_rejects_other_number_types(backend, a, message):
+    """Test floats (and foreign exact types) are not mixed in silently."""
+    with pytest.raises(ValueError, match=message):
+        backend.operation("add").calculate(a, 1)
+
+@pytest.mark.parametrize("backend", [DecimalBackend(), FractionBackend(), IntegerBackend()])
+def test_division_by_zero(backend):
+    """Test every exact backend rejects zero divisors like Division does."""
+    with pytest.raises(ValueError, match="Division by zero is not allowed."):
+        backend.operation("divide").calculate(1, 0)
+
+@pytest.mark.parametrize("name, a, b", [
+    ("add", "Infinity", "-Infinity"),
+    ("subtract", "Infinity", "Infinity"),
+    ("multiply", "Infinity", "0"),
+    ("divide", "Infinity", "Infinity"),
+])
+def test_decimal_signals_raise_value_error(name, a, b):
+    """Test signals trapped by the decimal context surface as ValueError, not ArithmeticError."""
+    backend = DecimalBackend()
+    with pytest.raises(ValueError, match=r"Invalid decimal operation \(InvalidOperation\)"):
+        backend.operation(name).calculate(backend.parse(a), backend.parse(b))
+
+def test_inexact_integer_division():
+    """Test the int backend refuses to truncate."""
+    with pytest.raises(ValueError, match="not divisible by 3; use the fraction backend"):
+        IntegerBackend().operation("/").calculate(10, 3)
+
+def test_batch_paths():
+    """Test calculate_many keeps exact results and handles zero divisors."""
+    backend = FractionBackend()
+    assert backend.operation("add").calculate_many([1, Fraction(1, 2)], [1, 1]) == [2, Fraction(3, 2)]
+    divide = backend.operation("divide")
+    assert divide.calculate_many([1, 2], [3, 4]) == [Fraction(1, 3), Fraction(1, 2)]
+    with pytest.raises(ValueError, match=r"\(row 1\)"):
+        divide.calculate_many([1, 2], [3, 0])
+    results = divide.calculate_many([1, 2], [3, 0], zero_division="nan")
+    assert results[0] == Fraction(1, 3) and math.isnan(results[1])
+    with pytest.raises(ValueError, match="Unknown zero_division policy"):
+        divide.calculate_many([1], [1], zero_division="skip")
+    with pytest.raises(ValueError, match="same length"):
+        divide.calculate_many([1], [])
+    with pytest.raises(ValueError, match="int or Fraction"):
+        divide.calculate_many([1.5], [1])
+
+def test_get_backend():
+    """Test backends are created by name, with options."""
+    assert set(BACKENDS) == {"float", "decimal", "fraction", "int"}
+    assert get_backend("Decimal", context=Context(prec=5)).context.prec == 5
+    assert repr(get_backend("int")) == "IntegerBackend()"
+    with pytest.raises(ValueError, match="Unknown numeric backend 'complex'"):
+        get_backend("complex")
+
+def test_calculator_backend_and_per_call_override():
+    """Test a calculator-wide backend, and a per-call backend on top of it."""
+    calculator = CalculatorWithObserver(backend=FractionBackend())
+    assert calculator.perform_operation(Division(), 1, 3) == Fraction(1, 3)
+    decimal = DecimalBackend(Context(prec=4))
+    assert calculator.perform_operation(Division(), 1, 3, backend=decimal) == Decimal("0.3333")
+    history = calculator._history  # pylint: disable=protected-access
+    assert [calc.result for calc in history] == [Fraction(1, 3), Decimal("0.3333")]
+
+def test_singleton_use_backend():
+    """Test the singleton's backend can be set and reset."""
+    calculator = SingletonCalculator()
+    try:
+        calculator.use_backend(DecimalBackend())
+        assert calculator.perform_operation(Addition(), Decimal("0.1"), Decimal("0.2")) == Decimal("0.3")
+        assert calculator.get_history()[-1].result == Decimal("0.3")
+    finally:
+        calculator.use_backend(None)
+    assert calculator.perform_operation(Addition(), 0.1, 0.2) == 0.1 + 0.2
+
+def test_memo_keys_decimal_contexts_and_exponents():
+    """Test memo entries are not shared across contexts or Decimal exponents."""
+    cache = MemoCache()
+    short, long = DecimalBackend(Context(prec=2)), DecimalBackend(Context(prec=6))
+    assert cache.calculate(short.operation("/"), Decimal(1), Decimal(3)) == Decimal("0.33")
+    assert cache.calculate(long.operation("/"), Decimal(1), Decimal(3)) == Decimal("0.333333")
+    add = long.operation("+")
+    assert str(cache.calculate(add, Decimal("1.0"), Decimal(0))) == "1.0"
+    assert str(cache.calculate(add, Decimal("1.00"), Decimal(0))) == "1.00"
+
+def test_exact_reductions():
+    """Test exact backends fold without float conversion and return list scans."""
+    decimal_sum = DecimalBackend().operation("add").reduce([Decimal("0.1")] * 10)
+    assert decimal_sum.result == Decimal("1.0") and decimal_sum.prefix == Decimal("0.9")
+    scan = FractionBackend().operation("divide").reduce([1, 3, 7], scan=True).scan
+    assert scan == [1, Fraction(1, 3), Fraction(1, 21)]
+    assert IntegerBackend().operation("multiply").reduce(range(1, 31)).result == math.factorial(30)
+    with pytest.raises(ValueError, match="All values must be int or Fraction."):
+        FractionBackend().operation("add").reduce([1, 0.5])
+
+def test_perform_reduction_with_backend():
+    """Test perform_reduction swaps in the backend's operation."""
+    history = []
+    calculator = CalculatorWithObserver(history=history, backend=FractionBackend())
+    assert calculator.perform_reduction(Addition(), [Fraction(1, 3)] * 3) == 1
+    assert calculator.perform_reduction(Addition(), [1, 2], backend=IntegerBackend()) == 3
+    assert [type(entry.operation).__name__ for entry in history] == [
+        "FractionAddition", "IntegerAddition",
+    ]
+    assert history[0].operand1 == Fraction(2, 3)
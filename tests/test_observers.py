@@ -3,13 +3,17 @@ Test Module for Calculator with Observer
 
 This module contains tests for the CalculatorWithObserver class, specifically 
 focusing on the observer pattern implementation. It ensures that observers are 
-notified of new calculations and that appropriate logging occurs.
+notified of new calculations, synchronously or through the batched background
+dispatcher, and that appropriate logging occurs.
 """
 
 import logging
+import threading
+import pytest
 from app.log_config import setup_logging  # Adjust the import according to your structure
+from app.history import BoundedHistory
 from app.observer import CalculatorWithObserver, HistoryObserver
-from app.operations import Addition  # Assuming Addition is the operation you want to test
+from app.operations import Addition, Multiplication
 
 # Setup logging before tests
 setup_logging()
@@ -32,3 +36,121 @@ def test_update_logging(caplog):
     assert len(caplog.records) == 1
     assert "Observer: New calculation added" in caplog.text
     assert caplog.records[0].levelname == "INFO"
+
+def test_shared_history():
+    """Test the calculator records into a history store passed to it."""
+    history = []
+    calculator = CalculatorWithObserver(history=history)
+    calculator.perform_operation(Addition(), 1, 2)
+    assert history[0].result == 3
+
+def test_bounded_history():
+    """Test the calculator can run with a bounded history store."""
+    history = BoundedHistory(max_entries=2)
+    calculator = CalculatorWithObserver(history=history)
+    for value in range(5):
+        calculator.perform_operation(Addition(), value, 1)
+    assert [calc.result for calc in calculator._history] == [4, 5]  # pylint: disable=protected-access
+
+class RecordingObserver(HistoryObserver):
+    """Observer that records every batch it receives."""
+    def __init__(self):
+        self.batches = []
+
+    def update_batch(self, calculations):
+        self.batches.append([calc.result for calc in calculations])
+
+class PlainObserver:  # pylint: disable=too-few-public-methods
+    """Duck-typed observer without an update_batch method."""
+    def __init__(self):
+        self.results = []
+
+    def update(self, calculation):
+        """Record the result of each calculation."""
+        self.results.append(calculation.result)
+
+def test_async_dispatch_delivers_in_order():
+    """Test queued calculations reach batch and per-item observers, in order."""
+    calculator = CalculatorWithObserver()
+    batch_observer, plain_observer = RecordingObserver(), PlainObserver()
+    calculator.add_observer(batch_observer)
+    calculator.add_observer(plain_observer)
+    calculator.enable_async_dispatch(batch_size=4)
+
+    for value in range(10):
+        calculator.perform_operation(Addition(), value, 0)
+    calculator.flush()
+
+    assert [r for batch in batch_observer.batches for r in batch] == list(range(10))
+    assert all(len(batch) <= 4 for batch in batch_observer.batches)
+    assert plain_observer.results == list(range(10))
+    calculator.disable_async_dispatch()
+    calculator.disable_async_dispatch()  # Disabling twice is harmless.
+
+def test_async_dispatch_default_update_batch(caplog):
+    """Test HistoryObserver.update_batch falls back to update for each item."""
+    calculator = CalculatorWithObserver()
+    calculator.add_observer(HistoryObserver())
+    calculator.enable_async_dispatch()
+    with caplog.at_level(logging.INFO):
+        calculator.perform_operation(Addition(), 1, 1)
+        calculator.perform_operation(Addition(), 2, 2)
+        calculator.disable_async_dispatch()  # Delivers what is left before stopping.
+    assert caplog.text.count("Observer: New calculation added") == 2
+
+def test_async_dispatch_drop_policy():
+    """Test the drop policy discards calculations when the queue is full."""
+    release = threading.Event()
+
+    class SlowObserver(HistoryObserver):
+        """Observer that blocks until released."""
+        def update_batch(self, calculations):
+            release.wait()
+
+    calculator = CalculatorWithObserver()
+    calculator.add_observer(SlowObserver())
+    dispatcher = calculator.enable_async_dispatch(max_queue=1, batch_size=1, policy="drop")
+    for value in range(3):
+        calculator.perform_operation(Addition(), value, 0)
+    assert dispatcher.dropped >= 1
+    release.set()
+    calculator.flush()
+    calculator.disable_async_dispatch()
+
+def test_async_dispatch_observer_error(caplog):
+    """Test a failing observer is logged and does not stop delivery to others."""
+    class BrokenObserver(HistoryObserver):
+        """Observer that always fails."""
+        def update_batch(self, calculations):
+            raise RuntimeError("boom")
+
+    calculator = CalculatorWithObserver()
+    recorder = RecordingObserver()
+    calculator.add_observer(BrokenObserver())
+    calculator.add_observer(recorder)
+    calculator.enable_async_dispatch()
+    with caplog.at_level(logging.ERROR):
+        calculator.perform_operation(Addition(), 1, 2)
+        calculator.flush()
+    calculator.disable_async_dispatch()
+    assert "failed to handle a batch" in caplog.text
+    assert recorder.batches == [[3]]
+
+def test_async_dispatch_invalid_policy():
+    """Test unknown backpressure policies are rejected."""
+    with pytest.raises(ValueError, match="Unknown dispatch policy 'wait'."):
+        CalculatorWithObserver().enable_async_dispatch(policy="wait")
+
+def test_flush_without_dispatcher():
+    """Test flush is a no-op in synchronous mode."""
+    CalculatorWithObserver().flush()
+
+def test_perform_reduction_notifies_once(caplog):
+    """Test a reduction notifies observers once, with its last step."""
+    calculator = CalculatorWithObserver()
+    calculator.add_observer(HistoryObserver())
+    with caplog.at_level(logging.INFO):
+        result = calculator.perform_reduction(Multiplication(), [2.0, 3.0, 4.0], log_space=True)
+    assert result == pytest.approx(24.0)
+    assert caplog.text.count("New calculation added") == 1
+    assert calculator.summary()["overall"]["count"] == 1
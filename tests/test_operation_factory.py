@@ -3,7 +3,7 @@
 import pytest
 from app.log_config import setup_logging
 from app.operation_factory import OperationFactory
-from app.operations import Addition, Subtraction, Multiplication, Division
+from app.operations import TemplateOperation, Addition, Subtraction, Multiplication, Division
 
 # Set up logging configuration for testing
 setup_logging()
@@ -29,3 +29,59 @@ def test_create_operations(operation_name, expected_class):
         assert isinstance(operation, expected_class), (
             f"Expected an instance of {expected_class.__name__} for operation '{operation_name}'"
         )
+
+@pytest.mark.parametrize("alias, expected_class", [
+    ("+", Addition),
+    ("plus", Addition),
+    ("-", Subtraction),
+    ("minus", Subtraction),
+    ("*", Multiplication),
+    ("Times", Multiplication),
+    ("/", Division),
+    ("div", Division),
+    ("sub", Subtraction),
+    ("mul", Multiplication),
+])
+def test_aliases(alias, expected_class):
+    """Test operations can be looked up by symbol or alias."""
+    assert isinstance(OperationFactory.create_operation(alias), expected_class)
+
+def test_shared_instances():
+    """Test the factory returns the same stateless instance on every call."""
+    assert OperationFactory.create_operation("add") is OperationFactory.create_operation("+")
+
+def test_case_sensitive_lookup():
+    """Test the case-sensitive fast path only accepts exact names."""
+    assert isinstance(OperationFactory.create_operation("add", case_sensitive=True), Addition)
+    assert OperationFactory.create_operation("ADD", case_sensitive=True) is None
+
+def test_register_plugin_operation(operation_registry):
+    """Test plugins can register new operations with aliases."""
+    class Modulo(TemplateOperation):
+        """Plugin operation."""
+        def execute(self, a, b):
+            return a % b
+
+    instance = operation_registry.register("Modulo", Modulo, ["%"])
+    assert OperationFactory.create_operation("modulo") is instance
+    assert OperationFactory.create_operation("%").calculate(7, 3) == 1
+    assert "%" in OperationFactory.operation_names()
+    # Registering the same instance again is allowed.
+    assert OperationFactory.register("modulo", instance) is instance
+
+def test_plugin_registration_is_undone():
+    """Test the registry fixture removed the plugin registered above."""
+    assert OperationFactory.create_operation("modulo") is None
+    assert "%" not in OperationFactory.operation_names()
+
+def test_register_conflict():
+    """Test registering a taken name needs replace=True."""
+    with pytest.raises(ValueError, match=r"Operation name already registered: \+"):
+        OperationFactory.register("sum", Addition(), ["+"])
+
+    original = OperationFactory.create_operation("+")
+    replacement = OperationFactory.register("+", Addition(), replace=True)
+    try:
+        assert OperationFactory.create_operation("+") is replacement
+    finally:
+        OperationFactory.register("+", original, replace=True)
@@ -7,11 +7,17 @@ functions correctly and that logging is handled properly, especially for
 invalid inputs and errors.
 """
 
+from array import array
 import logging
+import math
+import operator
 import pytest
 
 from app.log_config import setup_logging  # Import your logging configuration
-from app.operations import Addition, Subtraction, Multiplication, Division
+from app.operations import (
+    DISPATCH_TABLE, REDUCE_CHUNK_SIZE, TemplateOperation, Addition, Subtraction, Multiplication,
+    Division, calculate_trusted, resume_fast_dispatch, suspend_fast_dispatch,
+)
 
 # Set up logging configuration
 setup_logging()
@@ -109,3 +115,278 @@ def test_logging_invalid_input(caplog):
         with pytest.raises(ValueError):
             addition.calculate("string", 1)
     assert "Invalid input: string, 1 (Inputs must be numbers)" in caplog.text
+
+# Parameterized tests for batch calculations
+@pytest.mark.parametrize("operation, a_seq, b_seq, expected", [
+    (Addition(), array("d", [1, 0, -1]), array("d", [2, 0, 1]), [3, 0, 0]),
+    (Subtraction(), array("i", [3, 1]), array("i", [2, 2]), [1, -1]),
+    (Multiplication(), [2, 0, -2], [3, 5, 3], [6, 0, -6]),
+    (Division(), [6, 0, -6], [2, 1, 2], [3, 0, -3]),
+])
+def test_calculate_many(operation, a_seq, b_seq, expected):
+    """Test batch calculations return one result per pair in an array('d')."""
+    results = operation.calculate_many(a_seq, b_seq)
+    assert results.typecode == "d"
+    assert list(results) == expected
+
+def test_calculate_many_default_execute():
+    """Test the base execute_many falls back to execute for custom operations."""
+    class Power(TemplateOperation):
+        """Custom operation without a batch override."""
+        def execute(self, a, b):
+            return a ** b
+
+    assert list(Power().calculate_many([2, 3], [3, 2])) == [8, 9]
+
+def test_calculate_many_division_by_zero():
+    """Test batch division raises on the first zero divisor by default."""
+    with pytest.raises(ValueError, match=r"Division by zero is not allowed \(row 1\)."):
+        Division().calculate_many([1, 2, 3], [1, 0, 0])
+
+def test_calculate_many_division_nan_policy():
+    """Test batch division fills NaN for zero divisors with the 'nan' policy."""
+    b_seq = array("d", [2, 0, 4])
+    results = Division().calculate_many([4, 1, 8], b_seq, zero_division="nan")
+    assert results[0] == 2 and results[2] == 2
+    assert math.isnan(results[1])
+    assert list(Division.zero_division_mask(b_seq)) == [0, 1, 0]
+
+def test_calculate_many_unknown_policy():
+    """Test batch division rejects unknown zero-division policies."""
+    with pytest.raises(ValueError, match="Unknown zero_division policy 'skip'."):
+        Division().calculate_many([1], [1], zero_division="skip")
+
+def test_calculate_many_length_mismatch():
+    """Test batch calculations reject sequences of different lengths."""
+    with pytest.raises(ValueError, match="Operand sequences must have the same length."):
+        Addition().calculate_many([1, 2], [1])
+
+@pytest.mark.parametrize("a_seq, b_seq", [
+    ([1, "string"], [1, 2]),
+    (array("d", [1]), [None]),
+    (array("u", "x"), [1]),
+])
+def test_calculate_many_invalid_inputs(a_seq, b_seq):
+    """Test batch calculations reject non-numeric elements."""
+    with pytest.raises(ValueError, match="Both inputs must be numbers."):
+        Addition().calculate_many(a_seq, b_seq)
+
+class FakeDtype:  # pylint: disable=too-few-public-methods
+    """Stand-in for a NumPy dtype."""
+    def __init__(self, kind):
+        self.kind = kind
+
+class FakeNumpyArray:
+    """Stand-in for a NumPy array: whole-array operators, no element iteration."""
+    calls = 0  # Whole-array operator calls, across instances.
+
+    def __init__(self, values, kind="f"):
+        self.values = array("d", values)
+        self.dtype = FakeDtype(kind)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self.values
+
+    def __iter__(self):
+        raise AssertionError("NumPy arrays should not be iterated element by element.")
+
+    def astype(self, typecode, copy=True):
+        """Converts to float64, like ndarray.astype('d', copy=False)."""
+        assert typecode == "d" and not copy
+        return self if self.dtype.kind == "f" else FakeNumpyArray(self.values)
+
+    def tobytes(self):
+        """Returns the raw float64 buffer."""
+        return self.values.tobytes()
+
+    def _apply(self, function, other, reflected=False):
+        FakeNumpyArray.calls += 1
+        other = other.values if isinstance(other, FakeNumpyArray) else other
+        pairs = zip(other, self.values) if reflected else zip(self.values, other)
+        return FakeNumpyArray([function(a, b) for a, b in pairs])
+
+    def __add__(self, other):
+        return self._apply(operator.add, other)
+
+    def __radd__(self, other):
+        return self._apply(operator.add, other, reflected=True)
+
+    def __sub__(self, other):
+        return self._apply(operator.sub, other)
+
+    def __mul__(self, other):
+        return self._apply(operator.mul, other)
+
+    def __truediv__(self, other):
+        return self._apply(operator.truediv, other)
+
+@pytest.mark.parametrize("operation, expected", [
+    (Addition(), [4.0, 6.0]),
+    (Subtraction(), [-1.0, -1.0]),
+    (Multiplication(), [3.75, 8.75]),
+    (Division(), [0.6, 0.7142857142857143]),
+])
+def test_calculate_many_numpy_uses_whole_array_operators(operation, expected):
+    """Test NumPy inputs skip per-element validation and run one vectorized call."""
+    FakeNumpyArray.calls = 0
+    a_seq, b_seq = FakeNumpyArray([1.5, 2.5]), FakeNumpyArray([2.5, 3.5])
+    assert list(operation.calculate_many(a_seq, b_seq)) == expected
+    assert FakeNumpyArray.calls == 1
+
+def test_calculate_many_numpy_mixed_with_list():
+    """Test a NumPy array combines with a plain list, integer dtypes as float64."""
+    assert list(Addition().calculate_many([1, 2], FakeNumpyArray([3, 4], kind="i"))) == [4.0, 6.0]
+
+def test_calculate_many_logging(caplog):
+    """Test batch calculations log a single summary line."""
+    with caplog.at_level(logging.INFO):
+        Addition().calculate_many([1, 2, 3], [4, 5, 6])
+    assert len(caplog.records) == 1
+    assert "Batch operation performed: Addition on 3 pairs" in caplog.text
+
+@pytest.mark.parametrize("operation, a, b", [
+    (Addition(), 7.5, 2.5),
+    (Subtraction(), -1.0, 1e300),
+    (Multiplication(), 0.1, 3.0),
+    (Division(), 1.0, 3.0),
+    (Division(), -0.0, 2.0),
+])
+def test_calculate_trusted_matches_template(operation, a, b):
+    """Test the dispatch table gives the same results as calculate()."""
+    assert repr(calculate_trusted(operation, a, b)) == repr(operation.calculate(a, b))
+
+def test_calculate_trusted_division_by_zero(caplog):
+    """Test the fast path raises and logs the same error as Division."""
+    with pytest.raises(ValueError, match="Division by zero is not allowed."):
+        calculate_trusted(Division(), 1.0, 0.0)
+    assert "Attempted to divide by zero." in caplog.text
+
+def test_calculate_trusted_subclass_falls_back():
+    """Test subclasses without their own code keep their overridden execute."""
+    class Doubled(Addition):
+        """Addition that doubles its result."""
+        def execute(self, a, b):
+            return 2 * super().execute(a, b)
+
+    class Custom(Addition):
+        """Subclass with a code outside the dispatch table."""
+        code = 200
+
+    assert Doubled.dispatch_code == 0 and Custom.dispatch_code == 0
+    assert calculate_trusted(Doubled(), 1.0, 2.0) == 6.0
+    assert [cls.dispatch_code for cls in (Addition, Subtraction, Multiplication, Division)] == [1, 2, 3, 4]
+
+def test_suspend_fast_dispatch_nests():
+    """Test the table comes back only after the last resume."""
+    suspend_fast_dispatch()
+    suspend_fast_dispatch()
+    try:
+        resume_fast_dispatch()
+        assert DISPATCH_TABLE[Addition.code] is None
+        assert calculate_trusted(Addition(), 1.0, 2.0) == 3.0
+    finally:
+        resume_fast_dispatch()
+    assert DISPATCH_TABLE[Addition.code] is not None
+
+# Parameterized tests for reduce(): the result, the last step and the running results
+@pytest.mark.parametrize("operation, values, prefix, result, scan", [
+    (Addition(), [1, 2, 3, 4], 6.0, 10.0, [1, 3, 6, 10]),
+    (Subtraction(), [10, 1, 2, 3], 7.0, 4.0, [10, 9, 7, 4]),
+    (Multiplication(), [2, 3, 4], 6, 24, [2, 6, 24]),
+    (Division(), [100, 2, 5], 50.0, 10.0, [100, 50, 10]),
+    (Addition(), array("d", [0.5, 0.25]), 0.5, 0.75, [0.5, 0.75]),
+])
+def test_reduce(operation, values, prefix, result, scan):
+    """Test reduce() folds from the left and reports its last step."""
+    reduction = operation.reduce(values)
+    assert (reduction.prefix, reduction.last, reduction.result) == (prefix, values[-1], result)
+    assert reduction.count == len(values) and reduction.scan is None
+    scanned = operation.reduce(iter(values), scan=True)
+    assert list(scanned.scan) == scan and scanned.result == result
+
+def test_reduce_default_execute():
+    """Test operations without their own reduction fold with execute()."""
+    class Maximum(Addition):
+        """Keeps the larger operand."""
+        def execute(self, a, b):
+            return max(a, b)
+
+        execute_reduce = TemplateOperation.execute_reduce
+        execute_accumulate = TemplateOperation.execute_accumulate
+
+    reduction = Maximum().reduce([3, 9, 4], scan=True)
+    assert reduction.result == 9 and list(reduction.scan) == [3, 9, 9]
+    assert Maximum().reduce([3, 9, 4]).prefix == 9
+
+def test_reduce_sum_is_exactly_rounded():
+    """Test long sums do not drift the way left-to-right addition does."""
+    values = [0.1] * 200_000  # Several REDUCE_CHUNK_SIZE chunks.
+    assert Addition().reduce(values).result == 20000.0
+    assert sum(values) != 20000.0  # The naive fold is visibly off.
+    scan = Addition().reduce(values, scan=True).scan
+    assert scan[-1] == 20000.0 and scan[9] == 1.0
+    cancelling = [1e16, 1.0, -1e16] * (REDUCE_CHUNK_SIZE // 2)
+    assert Subtraction().reduce([0.0] + cancelling).result == -(REDUCE_CHUNK_SIZE // 2)
+
+@pytest.mark.parametrize("values, expected", [
+    ([1e308, 1e308, -1e308], math.inf),  # Partial sum overflows: IEEE result.
+    ([math.inf, 1.0], math.inf),
+    ([math.inf, -math.inf], math.nan),
+    ([10 ** 400, 1], math.inf),  # Ints too large for a double count as inf.
+    ([1.0, -10 ** 400], -math.inf),
+])
+def test_reduce_sum_non_finite(values, expected):
+    """Test overflowing and infinite sums fall back to IEEE addition."""
+    result = Addition().reduce(values).result
+    assert result == expected or (math.isnan(expected) and math.isnan(result))
+    running = Addition().reduce(values, scan=True).scan[-1]
+    assert running == expected or (math.isnan(expected) and math.isnan(running))
+
+def test_reduce_sum_cancelling_huge_ints():
+    """Test ints beyond the double range still cancel exactly in a reduced sum."""
+    assert Addition().reduce([10 ** 400, -10 ** 400, 2]).result == 2.0
+
+@pytest.mark.parametrize("values, expected", [
+    ([1e200, 1e200, 1e-300, 1e-300, 1e200], 1.0),  # math.prod gives inf here.
+    ([-2.0, 3.0, 0.5], -3.0),
+    ([2.0, 0.0, 5.0], 0.0),
+    ([1e300, 1e300, 1e300], math.inf),
+    ([0.0, math.inf], math.nan),
+    ([2.0, math.inf, 0.0], math.nan),
+])
+def test_reduce_log_space_product(values, expected):
+    """Test log-space products survive intermediate overflow and handle zeros."""
+    result = Multiplication().reduce(values, log_space=True).result
+    scan = Multiplication().reduce(values, scan=True, log_space=True).scan
+    if math.isnan(expected):
+        assert math.isnan(result) and math.isnan(scan[-1])
+    else:
+        assert result == pytest.approx(expected, rel=1e-12)
+        assert scan[-1] == pytest.approx(expected, rel=1e-12)
+
+@pytest.mark.parametrize("values, message", [
+    ([], "at least two values"),
+    ([1.0], "at least two values"),
+    ([1.0, "2"], "All values must be numbers."),
+])
+def test_reduce_invalid_inputs(values, message, caplog):
+    """Test empty, single-value and non-numeric streams are rejected and logged."""
+    for scan in (False, True):
+        with pytest.raises(ValueError, match=message):
+            Addition().reduce(values, scan=scan)
+    assert "Reduction" in caplog.text or "Invalid reduction input" in caplog.text
+
+def test_reduce_division_by_zero():
+    """Test a zero divisor anywhere in the stream raises."""
+    with pytest.raises(ValueError, match="Division by zero"):
+        Division().reduce([1.0, 2.0, 0.0, 4.0])
+
+def test_reduce_logging(caplog):
+    """Test a reduction logs one summary line, not one per value."""
+    with caplog.at_level(logging.INFO):
+        Addition().reduce(range(1000))
+    assert len(caplog.records) == 1
+    assert "Reduction performed: Addition over 1000 values -> 499500" in caplog.text
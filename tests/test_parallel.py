@@ -0,0 +1,148 @@
+"""
+Test Module for Parallel Execution
+
+This module tests parallel_calculate: results in input order, per-row
+errors (division by zero and plugin failures), merging into the
+SingletonCalculator history, handing operations to workers, and input
+validation.
+"""
+
+from array import array
+import math
+from multiprocessing.shared_memory import SharedMemory
+import pytest
+
+from app.history_index import IndexedHistory, parse_query, query_history
+from app.operations import Division, TemplateOperation
+from app.parallel import _run_chunk, _task_operation, parallel_calculate
+from app.singleton_calc import SingletonCalculator
+
+
+class Modulo(TemplateOperation):
+    """Module-level plugin, so workers started with spawn can import it."""
+    def execute(self, a: float, b: float) -> float:
+        return a % b
+
+class FailingDivision(Division):
+    """Division whose batch path fails outside the per-row error handling."""
+    def execute_many(self, a_seq, b_seq, zero_division="raise"):
+        raise RuntimeError("batch failed")
+
+
+@pytest.fixture(name="calculator")
+def fixture_calculator():
+    """Singleton calculator with an empty history."""
+    calculator = SingletonCalculator()
+    calculator.get_history().clear()
+    yield calculator
+    calculator.get_history().clear()
+
+def test_results_in_input_order(calculator):
+    """Test chunks computed in several processes come back in input order."""
+    a_seq = array("d", range(100))
+    results, errors = parallel_calculate("add", a_seq, [1] * 100, workers=2, chunk_size=7)
+    assert list(results) == [value + 1 for value in range(100)]
+    assert not errors
+    history = calculator.get_history()
+    assert len(history) == 100
+    assert history[42].result == 43
+
+def test_division_errors_by_index(calculator):
+    """Test division by zero is reported per row and those rows are not recorded."""
+    results, errors = parallel_calculate("/", [4, 1, 9, 2], [2, 0, 3, 0], workers=2)
+    assert errors == {1: "Division by zero is not allowed.", 3: "Division by zero is not allowed."}
+    assert results[0] == 2 and results[2] == 3
+    assert math.isnan(results[1])
+    assert [calc.result for calc in calculator.get_history()] == [2, 3]
+
+def test_all_rows_failing_records_nothing(calculator):
+    """Test a batch where every row fails leaves the history and its indexes untouched."""
+    original = calculator.get_history()
+    calculator.use_history(IndexedHistory())
+    try:
+        _, errors = parallel_calculate("divide", [1.0, 2.0], [0.0, 0.0], workers=1)
+        assert len(errors) == 2
+        calculator.perform_operation(Division(), 1.0, 2.0)
+        history = calculator.get_history()
+        assert [str(c) for c in query_history(history, parse_query("since=1h"))] == [
+            "1.0 division 2.0 = 0.5"]
+    finally:
+        calculator.use_history(original)
+
+def test_record_into_list_history(calculator):
+    """Test rows are appended one by one to histories without column support."""
+    original = calculator.get_history()
+    calculator.use_history([])
+    try:
+        parallel_calculate("multiply", [2, 3], [5, 5], workers=1)
+        assert [calc.result for calc in calculator.get_history()] == [10, 15]
+    finally:
+        calculator.use_history(original)
+
+def test_no_record_and_empty_batch(calculator):
+    """Test record=False leaves the history alone and empty batches short-circuit."""
+    parallel_calculate("subtract", [5], [3], workers=1, record=False)
+    assert parallel_calculate("subtract", [], []) == (array("d"), {})
+    assert len(calculator.get_history()) == 0
+
+def test_invalid_batches():
+    """Test unknown operations and mismatched inputs are rejected before any work starts."""
+    with pytest.raises(ValueError, match="Unknown operation 'power'."):
+        parallel_calculate("power", [1], [1])
+    with pytest.raises(ValueError, match="same length"):
+        parallel_calculate("add", [1, 2], [1])
+
+def test_run_chunk_in_process():
+    """Test the worker entry point fills its slice of the shared buffers."""
+    blocks = [SharedMemory(create=True, size=8 * 4) for _ in range(3)]
+    blocks.append(SharedMemory(create=True, size=4))
+    try:
+        for block, values in zip(blocks, ([8, 6, 4, 2], [2, 0, 2, 1])):
+            with block.buf.cast("d") as view:
+                view[:4] = array("d", values)
+        names = tuple(block.name for block in blocks)
+        assert _run_chunk(names, "divide", 1, 3) == {}
+        assert _run_chunk(names, "add", 3, 4) == {}
+        with blocks[2].buf.cast("d") as view:
+            assert math.isnan(view[1]) and view[2] == 2 and view[3] == 3
+        errors = _run_chunk(names, Modulo(), 0, 2)
+        assert list(errors) == [1] and errors[1].startswith("float modulo")
+        with blocks[2].buf.cast("d") as view:
+            assert view[0] == 0 and math.isnan(view[1])
+        assert bytes(blocks[3].buf[:4]) == b"\x00\x01\x00\x00"
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def test_plugin_errors_by_index(calculator, operation_registry):
+    """Test any error raised by a worker row is reported by index, not for the whole batch."""
+    operation_registry.register("modulo", Modulo)
+    results, errors = parallel_calculate("modulo", [7, 1, 9, 5], [4, 0, 2, 3], workers=2)
+    assert list(errors) == [1]
+    assert errors[1].startswith("float modulo")
+    assert [results[0], results[2], results[3]] == [3, 1, 2] and math.isnan(results[1])
+    assert [calc.result for calc in calculator.get_history()] == [3, 1, 2]
+
+def test_task_operation():
+    """Test workers get picklable operations directly and local classes only under fork."""
+    class LocalModulo(Modulo):
+        """Defined in a function, so it cannot be pickled."""
+    assert isinstance(_task_operation(Modulo(), "modulo", "spawn"), Modulo)
+    assert _task_operation(LocalModulo(), "modulo", "fork") == "modulo"
+    with pytest.raises(ValueError, match="cannot be sent to spawn worker processes"):
+        _task_operation(LocalModulo(), "modulo", "spawn")
+
+def test_run_chunk_releases_views_on_failure():
+    """Test a worker failure propagates instead of a BufferError from closing the blocks."""
+    blocks = [SharedMemory(create=True, size=8) for _ in range(3)]
+    blocks.append(SharedMemory(create=True, size=1))
+    try:
+        names = tuple(block.name for block in blocks)
+        with pytest.raises(RuntimeError, match="batch failed"):
+            _run_chunk(names, FailingDivision(), 0, 1)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
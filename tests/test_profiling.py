@@ -0,0 +1,86 @@
+"""
+Test Module for Profiling Mode
+
+This module tests PhaseTimer's hooks on the template steps and the
+profile_run() wrapper that writes a cProfile file and a summary.
+"""
+
+import io
+import pstats
+import pytest
+
+from app import batch
+from app.observer import CalculatorWithObserver
+from app.operation_factory import OperationFactory
+from app.operations import DISPATCH_TABLE, Addition, Division, TemplateOperation
+from app.profiling import PhaseTimer, phase, profile_run
+
+
+def workload():
+    """Runs each phase at least once."""
+    calculator = CalculatorWithObserver()
+    operation, num1, num2 = batch.parse_command("add 1 2")
+    calculator.perform_operation(operation, num1, num2)
+    Division().calculate_many([4], [2])
+    with phase("custom"):
+        OperationFactory.create_operation("divide")
+    return "done"
+
+def test_phase_timer_hooks():
+    """Test every phase reaches the hooks and the originals come back afterwards."""
+    seen = []
+    timer = PhaseTimer()
+    timer.add_hook(lambda name, seconds: seen.append(name))
+    original_execute = Addition.__dict__["execute"]
+    timer.install()
+    timer.install()  # Installing twice is a no-op.
+    try:
+        assert DISPATCH_TABLE[Addition.code] is None  # Trusted calls use the wrapped steps.
+        workload()
+    finally:
+        timer.uninstall()
+    timer.uninstall()  # Uninstalling twice is a no-op.
+    assert DISPATCH_TABLE[Addition.code] is not None
+    assert {"parse", "factory", "validate", "execute", "log", "notify", "custom"} <= set(seen)
+    assert timer.totals["execute"][0] >= 2
+    assert Addition.__dict__["execute"] is original_execute
+    assert "Phase" in timer.summary()
+
+def test_phase_is_noop_without_timer():
+    """Test phase() just runs the block when profiling is off."""
+    with phase("parse"):
+        value = 1
+    assert value == 1
+
+def test_uninstall_keeps_later_replacements():
+    """Test uninstall does not clobber a method someone else replaced meanwhile."""
+    timer = PhaseTimer()
+    timer.install()
+    def replacement(self, a, b, result):  # pylint: disable=unused-argument
+        """Stand-in log_result installed by someone else."""
+
+    original = TemplateOperation.__dict__["log_result"]
+    TemplateOperation.log_result = replacement
+    timer.uninstall()
+    try:
+        assert TemplateOperation.__dict__["log_result"] is replacement
+    finally:
+        TemplateOperation.log_result = original
+
+def test_profile_run_writes_profile(tmp_path):
+    """Test profile_run returns the result and writes a readable profile and summary."""
+    output = tmp_path / "run.prof"
+    stream = io.StringIO()
+    assert profile_run(workload, output=str(output), top=5, stream=stream) == "done"
+    assert pstats.Stats(str(output)).total_calls > 0
+    text = stream.getvalue()
+    assert f"Profile written to {output}" in text
+    assert "execute" in text
+
+def test_profile_run_on_error(tmp_path):
+    """Test the profile and summary are still written when the run fails."""
+    output = tmp_path / "failed.prof"
+    stream = io.StringIO()
+    with pytest.raises(ValueError):
+        profile_run(Division().calculate, 1, 0, output=str(output), stream=stream)
+    assert output.exists()
@@ -0,0 +1,126 @@
+"""
+Test Module for the Asyncio Calculator Server
+
+This module starts CalculatorServer on local sockets and checks pipelined
+text and JSON requests, in-order streamed responses and error replies,
+including for plugins that raise arbitrary exceptions, and that a failing
+responder closes the connection instead of stalling it.
+"""
+
+import asyncio
+import json
+
+from app.history import ColumnarHistory
+from app.observer import CalculatorWithObserver
+from app.operations import TemplateOperation
+from app.server import CalculatorServer, serve
+
+
+async def pipeline(service, requests, **start_kwargs):
+    """Starts a server, pipelines all requests on one connection and returns the replies."""
+    server = await service.start(**start_kwargs)
+    async with server:
+        if "path" in start_kwargs:
+            reader, writer = await asyncio.open_unix_connection(start_kwargs["path"])
+        else:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write("".join(line + "\n" for line in requests).encode())
+        await writer.drain()
+        writer.write_eof()
+        data = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+    return data.decode().splitlines()
+
+def test_text_requests_are_pipelined_in_order():
+    """Test many in-flight text requests are answered in order, batched."""
+    history = ColumnarHistory()
+    service = CalculatorServer(CalculatorWithObserver(history=history), batch_size=8)
+    requests = [f"add {i} 1" for i in range(50)]
+    replies = asyncio.run(pipeline(service, requests))
+    service.close()
+    assert replies == [f"{i + 1.0}" for i in range(50)]
+    assert len(history) == 50
+
+def test_text_errors():
+    """Test malformed text requests get error lines without closing the connection."""
+    service = CalculatorServer()
+    replies = asyncio.run(pipeline(service, ["add 1", "divide 1 0", "* 2 3"]))
+    service.close()
+    assert replies == [
+        "error: expected an operation and two numbers",
+        "error: Division by zero is not allowed.",
+        "6.0",
+    ]
+
+def test_json_requests(tmp_path):
+    """Test the JSON variant over a Unix socket, including error replies."""
+    service = CalculatorServer()
+    requests = [
+        json.dumps({"op": "divide", "a": 9, "b": 3, "id": 1}),
+        json.dumps({"op": "power", "a": 1, "b": 1, "id": 2}),
+        json.dumps({"op": "add", "a": 1, "id": 3}),
+        "{not json",
+    ]
+    replies = asyncio.run(pipeline(service, requests, path=str(tmp_path / "calc.sock")))
+    service.close()
+    assert [json.loads(reply) for reply in replies[:3]] == [
+        {"id": 1, "result": 3.0},
+        {"id": 2, "error": "unknown operation 'power'"},
+        {"id": 3, "error": "missing field 'b'"},
+    ]
+    assert "error" in json.loads(replies[3])
+
+def test_plugin_errors_are_replies(operation_registry):
+    """Test any exception raised by a request becomes its error reply."""
+    class Modulo(TemplateOperation):
+        """Plugin raising ZeroDivisionError, not ValueError."""
+        def execute(self, a, b):
+            return a % b
+    operation_registry.register("modulo", Modulo)
+    service = CalculatorServer()
+    requests = ["modulo 1 0", json.dumps({"op": "modulo", "a": 1, "b": 0}),
+                json.dumps({"op": "modulo", "a": [1], "b": 2}), "modulo 7 4"]
+    replies = asyncio.run(pipeline(service, requests))
+    service.close()
+    assert replies[0].startswith("error: float modulo")
+    assert "modulo" in json.loads(replies[1])["error"]
+    assert "error" in json.loads(replies[2]) and replies[3] == "3.0"
+
+def test_failed_responder_closes_connection(monkeypatch):
+    """Test the reader stops queueing once the responder fails, even with a full queue."""
+    service = CalculatorServer(batch_size=1)
+
+    def fail(lines):
+        raise RuntimeError("responder failed")
+    monkeypatch.setattr(service, "evaluate_batch", fail)
+    requests = [f"add {i} 1" for i in range(50)]
+    replies = asyncio.run(asyncio.wait_for(pipeline(service, requests), timeout=10))
+    service.close()
+    assert not replies
+
+def test_serve_runs_until_cancelled(tmp_path):
+    """Test serve() listens until its task is cancelled."""
+    path = str(tmp_path / "serve.sock")
+
+    async def scenario():
+        task = asyncio.create_task(serve(path=path))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                continue
+        writer.write(b"add 2 2\n")
+        reply = await reader.readline()
+        writer.close()
+        await writer.wait_closed()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return reply
+
+    assert asyncio.run(scenario()) == b"4.0\n"
@@ -6,8 +6,11 @@ its ability to perform operations while maintaining a history of calculations.
 It ensures that the history is correctly updated after each operation.
 """
 
+import threading
 import pytest
-from app.operations import Addition, Subtraction
+from app.history import SharedHistory
+from app.numeric import IntegerBackend
+from app.operations import Addition, Subtraction, Division
 from app.singleton_calc import SingletonCalculator
 
 
@@ -30,3 +33,87 @@ def test_history(operation, a, b):
     assert history[0].operand1 == a
     assert history[0].operand2 == b
     assert history[0].operation.__class__.__name__.lower() == operation.__class__.__name__.lower()
+
+def test_history_stores_result():
+    """Test the result is stored with the calculation instead of being recomputed."""
+    calculator = SingletonCalculator()
+    calculator.get_history().clear()
+
+    assert calculator.perform_operation(Addition(), 2, 3) == 5
+    assert calculator.get_history()[0].result == 5
+
+def test_failed_operation_not_recorded():
+    """Test a calculation that raises is not added to the history."""
+    calculator = SingletonCalculator()
+    calculator.get_history().clear()
+
+    with pytest.raises(ValueError, match="Division by zero is not allowed."):
+        calculator.perform_operation(Division(), 1, 0)
+    assert len(calculator.get_history()) == 0
+
+def test_use_history():
+    """Test the history backend can be swapped for another store."""
+    calculator = SingletonCalculator()
+    original = calculator.get_history()
+    replacement = []
+    try:
+        calculator.use_history(replacement)
+        calculator.perform_operation(Addition(), 1, 1)
+        assert SingletonCalculator().get_history() is replacement
+        assert replacement[0].result == 2
+    finally:
+        calculator.use_history(original)
+
+def test_concurrent_first_instantiation(monkeypatch):
+    """Test threads racing on the first call all get the same instance."""
+    monkeypatch.setattr(SingletonCalculator, "_instance", None)
+    monkeypatch.setattr(SingletonCalculator, "_history", SingletonCalculator._history)
+    barrier = threading.Barrier(16)
+    instances = []
+
+    def create():
+        barrier.wait()
+        instances.append(SingletonCalculator())
+
+    threads = [threading.Thread(target=create) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(instance) for instance in instances}) == 1
+
+def test_trusted_operation():
+    """Test trusted calls are recorded like validated ones."""
+    calculator = SingletonCalculator()
+    assert calculator.perform_operation(Division(), 1.0, 4.0, trusted=True) == 0.25
+    assert calculator.get_history()[-1].result == 0.25
+    with pytest.raises(ValueError, match="Division by zero"):
+        calculator.perform_operation(Division(), 1.0, 0.0, trusted=True)
+
+def test_perform_reduction():
+    """Test a reduction is recorded as one entry holding its last step."""
+    calculator = SingletonCalculator()
+    before = len(calculator.get_history())
+    assert calculator.perform_reduction(Addition(), (float(i) for i in range(1, 101))) == 5050.0
+    assert calculator.perform_reduction(Subtraction(), [10, 1, 2], scan=True).tolist() == [10, 9, 7]
+    history = calculator.get_history()
+    assert len(history) == before + 2
+    assert str(history[-2]) == "4950.0 addition 100.0 = 5050.0"
+    assert calculator.summary()["operations"]["Addition"]["max"] >= 5050.0
+    assert calculator.perform_reduction(Addition(), [1, 2, 3], backend=IntegerBackend()) == 6
+
+def test_shared_history(tmp_path):
+    """Test another process's view of a shared history sees the singleton's calculations."""
+    calculator = SingletonCalculator()
+    original = calculator.get_history()
+    path = str(tmp_path / "shared.db")
+    shared, other = SharedHistory(path), SharedHistory(path)
+    try:
+        calculator.use_history(shared)
+        calculator.perform_operation(Division(), 1.0, 8.0)
+        assert [calc.result for calc in calculator.get_history()] == [0.125]
+        assert other[-1].result == 0.125
+    finally:
+        calculator.use_history(original)
+        shared.close()
+        other.close()